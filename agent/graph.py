@@ -1,14 +1,22 @@
-from typing import Dict, List, Literal, cast
+import threading
+from typing import Any, Callable, Dict, List, Literal, Sequence, Tuple, cast
 from langchain_core.messages import AIMessage
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.language_models import BaseChatModel
 from langchain.chat_models import init_chat_model
-from agent.utils.config import Configuration
+from agent.utils.airports import load_airport_index_in_background
+from agent.utils.config import METRICS_PORT, Configuration
+from agent.utils.context import prepare_context
+from agent.utils.log import configure_logging
+from agent.utils.metrics import record_token_usage, start_metrics_server, timed
+from agent.utils.prompt_cache import log_cache_usage, model_input
+from agent.utils.render import pending_render, render_reply
 from agent.state import State
 from langgraph.graph import StateGraph
-from langgraph.constants import START
+from langgraph.constants import END, START
 from langgraph.prebuilt import ToolNode
 
+from agent.tools.flight_tools import FLIGHT_SHORTLIST_SIZE
 from agent.tools.tools import AGENT_TOOLS
 
 
@@ -18,26 +26,49 @@ def load_chat_model(fully_specified_name: str) -> BaseChatModel:
     return init_chat_model(model, model_provider=provider)
 
 
+# (model name, tool names) -> chat model with tools bound; shared by all steps and threads
+_BOUND_MODELS: Dict[Tuple[str, Tuple[str, ...]], Runnable] = {}
+_BOUND_MODELS_LOCK = threading.Lock()
+
+
+def load_bound_model(
+    fully_specified_name: str, tools: Sequence[Callable[..., Any]]
+) -> Runnable:
+    """Return the chat model with tools bound, building it once per model and tool set."""
+    key = (
+        fully_specified_name,
+        tuple(getattr(t, "name", None) or t.__name__ for t in tools),
+    )
+    model = _BOUND_MODELS.get(key)
+    if model is None:
+        with _BOUND_MODELS_LOCK:
+            model = _BOUND_MODELS.get(key)
+            if model is None:
+                model = load_chat_model(fully_specified_name).bind_tools(tools)
+                _BOUND_MODELS[key] = model
+    return model
+
+
 async def booking_agent(
     state: State,
     config: RunnableConfig,
-) -> Dict[str, List[AIMessage]]:
+) -> Dict[str, Any]:
     """Booking Agent which helps users find hotels using Apify Booking Scraper."""
 
     configuration = Configuration.from_runnable_config(config)
 
-    model = load_chat_model(configuration.model).bind_tools(AGENT_TOOLS)
+    model = load_bound_model(configuration.model, AGENT_TOOLS)
 
-    response = cast(
-        AIMessage,
-        await model.ainvoke(
-            [
-                {"role": "system", "content": configuration.system_prompt},
-                *state["messages"],
-            ],
-            config,
-        ),
-    )
+    # Zamijenjeni rezultati postaju reference, stariji turnovi idu u sažetak
+    with timed("context"):
+        messages, context, context_update = prepare_context(state, configuration.system_prompt)
+        # Statični system prompt (i alati) uvijek prvi, da ga provider može cacheirati
+        messages = model_input(configuration.model, configuration.system_prompt, context, messages)
+
+    with timed("llm", model=configuration.model):
+        response = cast(AIMessage, await model.ainvoke(messages, config))
+    record_token_usage(configuration.model, response.usage_metadata)
+    log_cache_usage(configuration.model, response.usage_metadata)
 
     if state["is_last_step"] and response.tool_calls:
         return {
@@ -46,10 +77,11 @@ async def booking_agent(
                     id=response.id,
                     content="Sorry, I could not find an answer to your question in the specified number of steps.",
                 )
-            ]
+            ],
+            **context_update,
         }
 
-    return {"messages": [response]}
+    return {"messages": [response], **context_update}
 
 
 def route_model_output(state: State) -> Literal["__end__", "tools"]:
@@ -60,14 +92,40 @@ def route_model_output(state: State) -> Literal["__end__", "tools"]:
     return "tools" if last_message.tool_calls else "__end__"
 
 
+def render_results(state: State) -> Dict[str, List[AIMessage]]:
+    """Answer with flight/hotel cards rendered from State, without a model call."""
+    with timed("format", source="render"):
+        artifact = pending_render(state["messages"])
+        content = render_reply(state, artifact, FLIGHT_SHORTLIST_SIZE)
+    return {"messages": [AIMessage(content=content)]}
+
+
+def route_tool_output(
+    state: State, config: RunnableConfig
+) -> Literal["render_results", "booking_agent"]:
+    """Render search results directly; anything else goes back to the model."""
+    if Configuration.from_runnable_config(config).render_results and pending_render(
+        state["messages"]
+    ):
+        return "render_results"
+    return "booking_agent"
+
+
 builder = StateGraph(State, config_schema=Configuration)
 
 builder.add_node("booking_agent", booking_agent)
 builder.add_node("tools", ToolNode(AGENT_TOOLS))
+builder.add_node("render_results", render_results)
 
 builder.add_edge(START, "booking_agent")
 builder.add_conditional_edges("booking_agent", route_model_output)
-builder.add_edge("tools", "booking_agent")
+builder.add_conditional_edges("tools", route_tool_output)
+builder.add_edge("render_results", END)
 
+configure_logging()
+load_airport_index_in_background()
 graph = builder.compile()
 graph.name = "booking-agent"
+
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
@@ -30,3 +30,15 @@ class Hotel(BaseModel):
     image: Optional[str]  # Main image
     images: Optional[List[str]]  # All images
     booking_url: str
+
+
+# Raw Booking Scraper item fields the hotel tool reads, requested from the Apify dataset API
+HOTEL_DATASET_FIELDS = [
+    "name",
+    "price",
+    "reviewScore",
+    "rating",
+    "reviews",
+    "location",
+    "url",
+]
@@ -1,6 +1,35 @@
 # agent/models/flights.py
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, HttpUrl, Field
+from typing import List, NamedTuple, Optional, Dict, Any, Tuple, Union
+from typing_extensions import Annotated
+import orjson
+from pydantic import (
+    BaseModel,
+    HttpUrl,
+    Field,
+    PlainSerializer,
+    TypeAdapter,
+    ValidationError,
+    ValidationInfo,
+    ValidatorFunctionWrapHandler,
+    WrapValidator,
+)
+
+
+def _skip_url_validation_when_trusted(
+    value: Any, handler: ValidatorFunctionWrapHandler, info: ValidationInfo
+) -> Any:
+    """In trusted mode (context={"trusted": True}) keep URL strings as they are."""
+    if isinstance(value, str) and info.context and info.context.get("trusted"):
+        return value
+    return handler(value)
+
+
+# HttpUrl that trusted batch parsing can skip; always serialized as a plain string
+FlightUrl = Annotated[
+    HttpUrl,
+    WrapValidator(_skip_url_validation_when_trusted),
+    PlainSerializer(str, return_type=str),
+]
 
 
 class ParentPlace(BaseModel):
@@ -29,7 +58,7 @@ class CarrierBase(BaseModel):
     id: Optional[int] = None
     name: Optional[str] = None
     alternateId: Optional[str] = None
-    logoUrl: Optional[HttpUrl] = None
+    logoUrl: Optional[FlightUrl] = None
 
 
 class SegmentCarrier(CarrierBase):
@@ -119,7 +148,7 @@ class SegmentIdItem(BaseModel):
     segmentIds: Optional[List[str]] = None
     bookingProposition: Optional[str] = None
     agentId: Optional[str] = None
-    url: Optional[HttpUrl] = None
+    url: Optional[FlightUrl] = None
 
 
 class PricingOption(BaseModel):
@@ -136,7 +165,7 @@ class FlightData(BaseModel):
     price: Optional[Price] = None
     vendor: Optional[str] = None
     firstCarrier: Optional[str] = None
-    url: Optional[HttpUrl] = None
+    url: Optional[FlightUrl] = None
     eco: Optional[Eco] = None
     fareAttributes: Optional[Dict[str, Any]] = Field(default_factory=dict)
     farePolicy: Optional[FarePolicy] = None
@@ -153,3 +182,108 @@ class FlightData(BaseModel):
 
 class Root(BaseModel):
     data: Optional[List[FlightData]] = None
+
+
+class LegSummary(NamedTuple):
+    """The parts of a Leg shown to the user."""
+
+    origin: Optional[str] = None  # displayCode, e.g. ZAG
+    destination: Optional[str] = None
+    departure: Optional[str] = None
+    arrival: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    stops: Optional[int] = None
+
+    @classmethod
+    def from_leg(cls, leg: Leg) -> "LegSummary":
+        return cls(
+            origin=leg.origin.displayCode if leg.origin else None,
+            destination=leg.destination.displayCode if leg.destination else None,
+            departure=leg.departure,
+            arrival=leg.arrival,
+            duration_minutes=leg.durationInMinutes,
+            stops=leg.stopCount,
+        )
+
+
+class FlightSummary(NamedTuple):
+    """Compact, tuple-backed projection of FlightData kept in graph state.
+
+    The full FlightData stays out of band in the flight search cache
+    (State.flights_ref) and is loaded only when the user selects a flight.
+    """
+
+    id: Optional[str] = None
+    price: Optional[float] = None
+    price_formatted: Optional[str] = None
+    carrier: Optional[str] = None
+    legs: Tuple[LegSummary, ...] = ()
+    link: Optional[str] = None
+    change_allowed: Optional[bool] = None
+    cancellation_allowed: Optional[bool] = None
+    self_transfer: Optional[bool] = None
+
+    @classmethod
+    def from_flight(cls, flight: FlightData) -> "FlightSummary":
+        link = flight.url
+        policy = flight.farePolicy
+        return cls(
+            id=flight.id,
+            price=flight.price.raw if flight.price else None,
+            price_formatted=flight.price.formatted if flight.price else None,
+            carrier=flight.firstCarrier,
+            legs=tuple(LegSummary.from_leg(leg) for leg in flight.legs or ()),
+            link=str(link) if link else None,
+            change_allowed=policy.isChangeAllowed if policy else None,
+            cancellation_allowed=policy.isCancellationAllowed if policy else None,
+            self_transfer=flight.isSelfTransfer,
+        )
+
+
+# Top-level FlightData fields requested from the Apify dataset API (after unwinding
+# 'data'); everything else, notably the bulky pricingOptions, stays server-side.
+# Trade-off: cached (and selected) flights carry no per-agent pricing options, and
+# the booking link is the itinerary's own url.
+FLIGHT_DATASET_FIELDS = [
+    "id",
+    "price",
+    "vendor",
+    "firstCarrier",
+    "url",
+    "farePolicy",
+    "isSelfTransfer",
+    "legs",
+    "score",
+]
+FLIGHT_DATASET_UNWIND = ["data"]
+
+FLIGHT_LIST_ADAPTER = TypeAdapter(List[FlightData])
+
+
+def parse_flights(
+    data: Union[bytes, str, List[Any]], trusted: bool = False
+) -> Tuple[List[FlightData], Dict[int, str]]:
+    """Validate a JSON array of flights in one pass, isolating per-item errors.
+
+    ``data`` is either raw JSON bytes/str or an already decoded list. Returns the
+    valid flights (input order kept) and a map of rejected index -> error text.
+    With ``trusted=True`` URL fields are not validated.
+    """
+    context = {"trusted": trusted}
+    try:
+        if isinstance(data, (bytes, str)):
+            return FLIGHT_LIST_ADAPTER.validate_json(data, context=context), {}
+        return FLIGHT_LIST_ADAPTER.validate_python(data, context=context), {}
+    except ValidationError as e:
+        errors: Dict[int, List[str]] = {}
+        for err in e.errors(include_url=False):
+            loc = err["loc"]
+            if not loc or not isinstance(loc[0], int):
+                raise  # Not a list of flights at all
+            field = ".".join(str(part) for part in loc[1:])
+            errors.setdefault(loc[0], []).append(f"{field}: {err['msg']}")
+
+    items = orjson.loads(data) if isinstance(data, (bytes, str)) else data
+    valid = [item for i, item in enumerate(items) if i not in errors]
+    flights = FLIGHT_LIST_ADAPTER.validate_python(valid, context=context)
+    return flights, {i: "; ".join(msgs) for i, msgs in errors.items()}
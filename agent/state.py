@@ -4,7 +4,7 @@ from langgraph.prebuilt.chat_agent_executor import AgentState
 
 # Importiraj modele koje si definirao (pretpostavimo da su u agent/models/booking.py i agent/models/flights.py)
 from agent.models.booking import Hotel
-from agent.models.flights import FlightData  # Importiraj FlightData model
+from agent.models.flights import FlightData, FlightSummary
 
 
 class State(AgentState):
@@ -23,15 +23,29 @@ class State(AgentState):
     min_score: Optional[str]
     property_type: Optional[str]
     max_price: Optional[str]
+    hotel_sort_by: Optional[str]  # rating | price | reviews
+    hotels_ref: Optional[str]  # ključ svih hotela zadnje pretrage u cacheu
     user_query: Optional[str]  # Dodajemo ovo za općeniti upit
 
     # --- New Flight Fields ---
     origin_location: Optional[str] = None  # Mjesto polaska leta
+    # {"codes": destination_location kako ga je upisao set_flight_details, "city": grad za hotele}
+    resolved_destination: Optional[Dict[str, str]] = None
     # destination_location se može dijeliti, ali ako želiš odvojeno: flight_destination_location: Optional[str] = None
     departure_date: Optional[str] = None  # Datum polaska leta
     return_date: Optional[str] = None  # Datum povratka (opcionalno za round-trip)
     # travelers se može dijeliti, ali ako želiš odvojeno: flight_passengers: Optional[int] = None
-    flights: Optional[List[FlightData]] = None  # Lista pronađenih letova
+    # Sažeci pronađenih letova; puni FlightData ostaju u cacheu pretrage pod flights_ref
+    flights: Optional[List[FlightSummary]] = None
+    flights_ref: Optional[str] = None
+    # Preferencije za rangiranje letova ("6-12" = polazak između 6 i 12 h)
+    departure_hours: Optional[str] = None
+    flexible_fare: Optional[bool] = None
     selected_flight: Optional[FlightData] = None  # Kada user izabere let
 
+    # --- Context management (agent/utils/context.py) ---
+    # Sažetak starijih turnova koji se više ne šalju modelu, do poruke s ovim id-em
+    context_summary: Optional[str] = None
+    context_summary_until: Optional[str] = None
+
     # Možda dodati i druge filtere za letove ako je potrebno (npr. direct_flights_only)
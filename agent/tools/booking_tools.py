@@ -1,80 +1,323 @@
-from typing import Any, Callable, List
+from typing import Any, Callable, Dict, List, Optional
+import orjson
 from typing_extensions import Annotated
 from langgraph.prebuilt import InjectedState
 from langchain_core.tools.base import InjectedToolCallId
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool, tool
 from langgraph.types import Command
 from langchain_core.messages import ToolMessage
-from apify_client import ApifyClient
 
+from agent.models.booking import HOTEL_DATASET_FIELDS
 from agent.tools.flight_tools import (
     return_flights,
     search_flights_with_apify,
     set_flight_details,
 )
+from agent.utils.apify import (
+    ApifySearchError,
+    arun_actor,
+    get_apify_async_client,
+    get_apify_client,
+    run_actor,
+)
+from agent.utils.cache import HOTEL_SEARCH_CACHE, make_cache_key
+from agent.utils.config import APIFY_API_KEY, HOTEL_RESULTS_LIMIT, SPECULATIVE_SEARCH
+from agent.utils.hotel_index import get_hotel_index, to_float
+from agent.utils.log import get_logger
+from agent.utils.metrics import timed
+from agent.utils.render import render_artifact
+from agent.utils.speculative import HOTEL_SPECULATION
 
+logger = get_logger(__name__)
+
+HOTELS_ACTOR_ID = "voyager/booking-scraper"
+# Hotels put into state / shown to the user
+HOTEL_SHORTLIST_SIZE = 4
+
+
+def _hotel_destination(state: dict) -> str:
+    """City to search hotels in.
+
+    Airport codes that set_flight_details wrote ("LHR, LGW") map back to the
+    city it resolved; any other destination is used as given ("Rab", "Bol").
+    """
+    destination = state["destination_location"]
+    resolved = state.get("resolved_destination") or {}
+    if resolved.get("codes") == destination:
+        return resolved["city"]
+    return destination
 
-@tool
-def search_hotels_with_apify(
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    state: Annotated[dict, InjectedState],
-):
-    """Search hotels on Booking.com using Apify Booking Scraper based on user input."""
 
-    client = ApifyClient("apify_api_NII4yuxkyarmhgvEwLsxXgIJAHjYbw3HyvbX")
+def _build_hotel_run_input(state: dict) -> dict:
+    """Build the Booking Scraper run_input from state.
 
-    run_input = {
-        "search": state["destination_location"],
+    min_score and max_price are not part of the run: a wide result set is
+    fetched once and filtered locally, so refining them needs no new run.
+    """
+    return {
+        "search": _hotel_destination(state),
         "checkIn": state["travel_dates"]["check_in"],
         "checkOut": state["travel_dates"]["check_out"],
         "rooms": state.get("rooms", 1),
         "adults": state.get("travelers", 2),
         "children": state.get("children", 0),
-        "maxItems": 3,
+        "maxItems": HOTEL_RESULTS_LIMIT,
         "propertyType": state.get("property_type", "Hotels"),
         "currency": state.get("currency", "EUR"),
         "language": state.get("desired_language", "en-gb"),
         "sortBy": state.get("sort_by", "bayesian_review_score"),
-        "minMaxPrice": state.get("min_max_price", "0-99999"),
     }
 
-    run = client.actor("voyager/booking-scraper").call(run_input=run_input)
 
-    hotels = []
-    for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-        hotel_info = {
-            "name": item.get("name"),
-            "price": item.get("price"),
-            "rating": item.get("reviewScore"),
-            "location": item.get("location"),
-            "booking_url": item.get("url"),  # Ovo vraća Apify direktno
-        }
-        hotels.append(hotel_info)
+def _hotel_info(item: dict) -> dict:
+    """Pick the fields we keep from a raw Booking Scraper item (see HOTEL_DATASET_FIELDS)."""
+    return {
+        "name": item.get("name"),
+        "price": item.get("price"),
+        "rating": item.get("reviewScore", item.get("rating")),
+        "reviews": item.get("reviews"),
+        "location": item.get("location"),
+        "booking_url": item.get("url"),  # Ovo vraća Apify direktno
+    }
+
+
+def _describe_filters(
+    min_score: Optional[float], max_price: Optional[float], sort_by: str
+) -> str:
+    parts = []
+    if min_score is not None:
+        parts.append(f"rating {min_score:g}+")
+    if max_price is not None:
+        parts.append(f"price up to {max_price:g}")
+    return (", ".join(parts) or "no filters") + f", sorted by {sort_by}"
+
 
+def _filter_hotels(
+    hotels: List[dict], ref: str, state: dict, limit: int = HOTEL_SHORTLIST_SIZE
+):
+    """Apply the state's min_score / max_price / hotel_sort_by to a fetched result set.
+
+    Returns (shortlist, number of matches, description of the filters).
+    """
+    min_score = to_float(state.get("min_score"))
+    max_price = to_float(state.get("max_price"))
+    sort_by = state.get("hotel_sort_by") or "rating"
+    with timed("rank", source="hotels"):
+        matches = get_hotel_index(ref, hotels).query(min_score, max_price, sort_by)
+    return matches[:limit], len(matches), _describe_filters(min_score, max_price, sort_by)
+
+
+def _hotels_result_command(
+    hotels: List[dict], cache_key: str, state: dict, tool_call_id: str
+):
+    """Shortlist the fetched hotels into state; the full set stays cached under hotels_ref."""
+    shortlist, matched, filters = _filter_hotels(hotels, cache_key, state)
     return Command(
         update={
-            "hotels": hotels,
+            "hotels": shortlist,
+            "hotels_ref": cache_key,
             "messages": [
                 ToolMessage(
-                    f"Found {len(hotels)} hotels for {state['destination_location']}. "
+                    f"Found {len(hotels)} hotels for {_hotel_destination(state)}, "
+                    f"{matched} match ({filters}). "
                     f"Here are the top options you can book directly via the provided links.",
                     tool_call_id=tool_call_id,
+                    artifact=render_artifact("hotels"),
                 )
             ],
         }
     )
 
 
-@tool
-def return_hotels(state: Annotated[dict, InjectedState]):
-    """When users want to book something or after we found list of hotels we invoke this most important attribute is Booking link"""
-    return state.get("hotels")
+def _hotel_tool_message(content: str, tool_call_id: str) -> Command:
+    return Command(update={"messages": [ToolMessage(content, tool_call_id=tool_call_id)]})
+
+
+def _hotels_error_command(e: Exception, tool_call_id: str) -> Command:
+    """Report an unexpected Apify/processing error back to the agent."""
+    logger.error("Error calling Apify or processing hotel results: %s", e, exc_info=e)
+    return _hotel_tool_message(f"An error occurred while searching for hotels: {e}", tool_call_id)
+
+
+def _hotel_key_missing_command(tool_call_id: str) -> Command:
+    return _hotel_tool_message("Apify API key is not configured. Cannot search hotels.", tool_call_id)
+
+
+def _hotel_dataset_id(run: Optional[dict]) -> str:
+    if not run or not run.get("defaultDatasetId"):
+        raise ApifySearchError("Apify actor run did not return a dataset ID.")
+    return run["defaultDatasetId"]
+
+
+def _parse_hotels(raw: bytes, run_input: dict) -> List[dict]:
+    """Hotel fields we keep; raises ApifySearchError (so nothing is cached) on an empty dataset."""
+    with timed("parse", source="hotels"):
+        hotels = [_hotel_info(item) for item in orjson.loads(raw)]
+    if not hotels:
+        logger.warning("Apify dataset is empty", extra={"run_input": run_input})
+        raise ApifySearchError(
+            f"No hotels were returned for {run_input['search']} "
+            f"from {run_input['checkIn']} to {run_input['checkOut']}."
+        )
+    return hotels
+
+
+def _fetch_hotels(run_input: dict) -> List[dict]:
+    """Run the Booking Scraper actor and collect the hotel fields we keep."""
+    client = get_apify_client()
+
+    logger.info("Starting hotel actor run", extra={"actor": HOTELS_ACTOR_ID, "run_input": run_input})
+    run = run_actor(client, HOTELS_ACTOR_ID, run_input)
+    logger.debug("Hotel actor run finished", extra={"run": run})
+
+    # Jedan bulk download, samo polja koja koristimo
+    with timed("dataset_fetch"):
+        raw = client.dataset(_hotel_dataset_id(run)).get_items_as_bytes(
+            item_format="json", fields=HOTEL_DATASET_FIELDS
+        )
+    return _parse_hotels(raw, run_input)
+
+
+async def _afetch_hotels(run_input: dict) -> List[dict]:
+    """Async variant of _fetch_hotels built on the shared ApifyClientAsync."""
+    client = get_apify_async_client()
+
+    logger.info("Starting hotel actor run", extra={"actor": HOTELS_ACTOR_ID, "run_input": run_input})
+    run = await arun_actor(client, HOTELS_ACTOR_ID, run_input)
+    logger.debug("Hotel actor run finished", extra={"run": run})
+
+    # Jedan bulk download, samo polja koja koristimo
+    with timed("dataset_fetch"):
+        raw = await client.dataset(_hotel_dataset_id(run)).get_items_as_bytes(
+            item_format="json", fields=HOTEL_DATASET_FIELDS
+        )
+    return _parse_hotels(raw, run_input)
+
+
+def _search_hotels(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+):
+    """Search hotels on Booking.com using Apify Booking Scraper based on user input."""
+
+    if not APIFY_API_KEY:
+        return _hotel_key_missing_command(tool_call_id)
+
+    run_input = _build_hotel_run_input(state)
+    cache_key = make_cache_key("hotels", run_input)
+    HOTEL_SPECULATION.attach(cache_key)
+
+    try:
+        hotels = HOTEL_SEARCH_CACHE.get_or_fetch(cache_key, lambda: _fetch_hotels(run_input))
+    except ApifySearchError as e:
+        return _hotel_tool_message(str(e), tool_call_id)
+    except Exception as e:
+        return _hotels_error_command(e, tool_call_id)
+
+    return _hotels_result_command(list(hotels), cache_key, state, tool_call_id)
+
+
+async def _asearch_hotels(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+):
+    """Async variant of _search_hotels."""
+
+    if not APIFY_API_KEY:
+        return _hotel_key_missing_command(tool_call_id)
+
+    run_input = _build_hotel_run_input(state)
+    cache_key = make_cache_key("hotels", run_input)
+    HOTEL_SPECULATION.attach(cache_key)
+
+    try:
+        hotels = await HOTEL_SEARCH_CACHE.aget_or_fetch(
+            cache_key, lambda: _afetch_hotels(run_input)
+        )
+    except ApifySearchError as e:
+        return _hotel_tool_message(str(e), tool_call_id)
+    except Exception as e:
+        return _hotels_error_command(e, tool_call_id)
+
+    return _hotels_result_command(list(hotels), cache_key, state, tool_call_id)
+
+
+search_hotels_with_apify = StructuredTool.from_function(
+    func=_search_hotels,
+    coroutine=_asearch_hotels,
+    name="search_hotels_with_apify",
+    description=_search_hotels.__doc__,
+)
 
 
 @tool
-def set_booking_details(
+def filter_hotels(
     tool_call_id: Annotated[str, InjectedToolCallId],
     state: Annotated[dict, InjectedState],
+    min_score: Optional[str] = None,
+    max_price: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    limit: int = HOTEL_SHORTLIST_SIZE,
+):
+    """Refine the last hotel search without a new search: min_score (e.g. "8"), max_price (e.g. "150"), sort_by ("rating", "price" or "reviews"). Pass an empty string to remove a filter."""
+    ref = state.get("hotels_ref")
+    hotels = HOTEL_SEARCH_CACHE.lookup(ref) if ref else None
+    if not hotels:
+        return Command(
+            update={
+                "messages": [
+                    ToolMessage(
+                        "No hotel results to refine. Please search for hotels first.",
+                        tool_call_id=tool_call_id,
+                    )
+                ]
+            }
+        )
+    if sort_by is not None and sort_by not in ("", "rating", "price", "reviews"):
+        return Command(
+            update={
+                "messages": [
+                    ToolMessage(
+                        f"Unknown sort_by '{sort_by}'. Use rating, price or reviews.",
+                        tool_call_id=tool_call_id,
+                    )
+                ]
+            }
+        )
+
+    update_dict = {}
+    for field, value in (
+        ("min_score", min_score),
+        ("max_price", max_price),
+        ("hotel_sort_by", sort_by),
+    ):
+        if value is not None:
+            update_dict[field] = value or None
+
+    shortlist, matched, filters = _filter_hotels(
+        list(hotels), ref, {**state, **update_dict}, max(limit, 1)
+    )
+    update_dict["hotels"] = shortlist
+    update_dict["messages"] = [
+        ToolMessage(
+            f"{matched} of {len(hotels)} hotels match ({filters}); "
+            f"showing {len(shortlist)}.",
+            tool_call_id=tool_call_id,
+            artifact=render_artifact("hotels"),
+        )
+    ]
+    return Command(update=update_dict)
+
+
+@tool(response_format="content_and_artifact")
+def return_hotels(state: Annotated[dict, InjectedState]):
+    """When users want to book something or after we found list of hotels we invoke this most important attribute is Booking link"""
+    hotels = state.get("hotels")
+    return hotels, render_artifact("hotels") if hotels else None
+
+
+def _booking_details_update(
+    state: dict,
     destination_location: str = None,
     check_in: str = None,
     check_out: str = None,
@@ -85,31 +328,107 @@ def set_booking_details(
     property_type: str = None,
     max_price: str = None,
 ):
-    """Set booking search filters dynamically based on user input."""
-
+    """State update for the given booking filters (None = keep) and its confirmation text."""
+    # Datum koji nije zadan ostaje kakav je bio
+    travel_dates = {**(state.get("travel_dates") or {})}
+    if check_in is not None:
+        travel_dates["check_in"] = check_in
+    if check_out is not None:
+        travel_dates["check_out"] = check_out
     update_dict = {
         "destination_location": destination_location,
-        "travel_dates": {"check_in": check_in, "check_out": check_out},
+        "travel_dates": travel_dates,
         "travelers": travelers,
         "children": children,
         "rooms": rooms,
         "min_score": min_score,
         "property_type": property_type,
         "max_price": max_price,
-        "messages": [
-            ToolMessage(
-                f"Booking filters updated for {destination_location} from {check_in} to {check_out}",
-                tool_call_id=tool_call_id,
-            )
-        ],
     }
 
     # Remove None values
     update_dict = {k: v for k, v in update_dict.items() if v is not None}
+    merged = {**state, **update_dict}
+    message = (
+        f"Booking filters updated for {merged.get('destination_location')} "
+        f"from {travel_dates.get('check_in')} to {travel_dates.get('check_out')}"
+    )
+    return update_dict, message
+
+
+def _speculative_hotel_search(state: dict) -> Dict[str, dict]:
+    """Cache key -> run_input of the hotel search the state is ready for (at most one)."""
+    if not APIFY_API_KEY or _missing_hotel_fields(state):
+        return {}
+    run_input = _build_hotel_run_input(state)
+    return {make_cache_key("hotels", run_input): run_input}
+
+
+def _speculate_hotels(before: dict, after: dict) -> None:
+    """Start the search the new filters allow and drop the one they replaced."""
+    old = _speculative_hotel_search(before)
+    new = _speculative_hotel_search(after)
+    for key in old.keys() - new.keys():
+        HOTEL_SPECULATION.discard(key)
+    for key in new.keys() - old.keys():
+        HOTEL_SPECULATION.start(key, lambda run_input=new[key]: _afetch_hotels(run_input))
+
 
+def _set_booking_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    destination_location: str = None,
+    check_in: str = None,
+    check_out: str = None,
+    travelers: int = None,
+    children: int = None,
+    rooms: int = None,
+    min_score: str = None,
+    property_type: str = None,
+    max_price: str = None,
+):
+    """Set booking search filters dynamically based on user input."""
+
+    update_dict, message = _booking_details_update(
+        state, destination_location, check_in, check_out, travelers,
+        children, rooms, min_score, property_type, max_price,
+    )
+    update_dict["messages"] = [ToolMessage(message, tool_call_id=tool_call_id)]
+    return Command(update=update_dict)
+
+
+async def _aset_booking_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    destination_location: str = None,
+    check_in: str = None,
+    check_out: str = None,
+    travelers: int = None,
+    children: int = None,
+    rooms: int = None,
+    min_score: str = None,
+    property_type: str = None,
+    max_price: str = None,
+):
+    """Async variant of _set_booking_details; with SPECULATIVE_SEARCH it also starts the search."""
+    update_dict, message = _booking_details_update(
+        state, destination_location, check_in, check_out, travelers,
+        children, rooms, min_score, property_type, max_price,
+    )
+    if SPECULATIVE_SEARCH:
+        _speculate_hotels(state, {**state, **update_dict})
+    update_dict["messages"] = [ToolMessage(message, tool_call_id=tool_call_id)]
     return Command(update=update_dict)
 
 
+set_booking_details = StructuredTool.from_function(
+    func=_set_booking_details,
+    coroutine=_aset_booking_details,
+    name="set_booking_details",
+    description=_set_booking_details.__doc__,
+)
+
+
 @tool(parse_docstring=False)
 def set_desired_language(
     tool_call_id: Annotated[str, InjectedToolCallId], language: str
@@ -133,3 +452,107 @@ def set_desired_language(
 def retrieve_desired_language(state: Annotated[dict, InjectedState]):
     """Retrieve desired language."""
     return state.get("desired_language")
+
+
+def _missing_hotel_fields(state: dict) -> List[str]:
+    travel_dates = state.get("travel_dates") or {}
+    required = {
+        "destination": state.get("destination_location"),
+        "check-in date": travel_dates.get("check_in"),
+        "check-out date": travel_dates.get("check_out"),
+    }
+    return [name for name, value in required.items() if not value]
+
+
+def _hotel_listing(hotels: List[dict]) -> str:
+    """Numbered one-line summaries of the shortlisted hotels."""
+    return "\n".join(
+        f"Option {number}: {hotel.get('name')}, rating: {hotel.get('rating')}, "
+        f"price: {hotel.get('price')}, link: {hotel.get('booking_url')}"
+        for number, hotel in enumerate(hotels, start=1)
+    )
+
+
+def _fused_hotels_command(
+    details: dict, details_message: str, result: Command, tool_call_id: str
+) -> Command:
+    """Merge the filters update and the search result into one reply with the shortlist."""
+    update = {**details, **result.update}
+    message = result.update["messages"][-1]
+    lines = [details_message + ".", message.content]
+    if "hotels_ref" in result.update:
+        lines.append(_hotel_listing(update["hotels"]))
+    update["messages"] = [
+        ToolMessage("\n".join(lines), tool_call_id=tool_call_id, artifact=message.artifact)
+    ]
+    return Command(update=update)
+
+
+def _missing_hotel_fields_command(
+    details: dict, details_message: str, missing: List[str], tool_call_id: str
+) -> Command:
+    """Keep what was given, and ask for the rest before searching."""
+    content = f"{details_message}. Cannot search hotels yet, missing: {', '.join(missing)}."
+    return Command(
+        update={**details, "messages": [ToolMessage(content, tool_call_id=tool_call_id)]}
+    )
+
+
+def _find_hotels(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    destination_location: str = None,
+    check_in: str = None,
+    check_out: str = None,
+    travelers: int = None,
+    children: int = None,
+    rooms: int = None,
+    min_score: str = None,
+    property_type: str = None,
+    max_price: str = None,
+):
+    """Set the hotel filters AND search Booking.com in one call, returning the best matching hotels. Use this for a new hotel search once destination, check-in and check-out dates (YYYY-MM-DD) are known. Omitted parameters keep their current values."""
+    details, details_message = _booking_details_update(
+        state, destination_location, check_in, check_out, travelers,
+        children, rooms, min_score, property_type, max_price,
+    )
+    merged = {**state, **details}
+    missing = _missing_hotel_fields(merged)
+    if missing:
+        return _missing_hotel_fields_command(details, details_message, missing, tool_call_id)
+    result = _search_hotels(tool_call_id, merged)
+    return _fused_hotels_command(details, details_message, result, tool_call_id)
+
+
+async def _afind_hotels(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    destination_location: str = None,
+    check_in: str = None,
+    check_out: str = None,
+    travelers: int = None,
+    children: int = None,
+    rooms: int = None,
+    min_score: str = None,
+    property_type: str = None,
+    max_price: str = None,
+):
+    """Async variant of _find_hotels."""
+    details, details_message = _booking_details_update(
+        state, destination_location, check_in, check_out, travelers,
+        children, rooms, min_score, property_type, max_price,
+    )
+    merged = {**state, **details}
+    missing = _missing_hotel_fields(merged)
+    if missing:
+        return _missing_hotel_fields_command(details, details_message, missing, tool_call_id)
+    result = await _asearch_hotels(tool_call_id, merged)
+    return _fused_hotels_command(details, details_message, result, tool_call_id)
+
+
+find_hotels = StructuredTool.from_function(
+    func=_find_hotels,
+    coroutine=_afind_hotels,
+    name="find_hotels",
+    description=_find_hotels.__doc__,
+)
@@ -0,0 +1,246 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing_extensions import Annotated
+from langgraph.prebuilt import InjectedState
+from langchain_core.tools.base import InjectedToolCallId
+from langchain_core.tools import StructuredTool
+from langgraph.types import Command
+from langchain_core.messages import ToolMessage
+
+from agent.models.flights import FlightData, FlightSummary
+from agent.tools.flight_tools import (
+    _afetch_flights,
+    _build_flight_run_input,
+    _fetch_flights,
+    _flight_tool_message,
+    _route_state,
+    flight_routes,
+    ranked_summaries,
+    split_locations,
+    summarize_flight,
+)
+from agent.utils.airports import primary_airport
+from agent.utils.apify import ApifySearchError
+from agent.utils.cache import FLIGHT_SEARCH_CACHE, make_cache_key
+from agent.utils.config import FLIGHT_SEARCH_CONCURRENCY
+
+MAX_FLEX_DAYS = 3  # ±3 days is already 49 actor runs for a round trip
+BEST_OPTIONS = 3
+
+# (departure, return or None, cache key, flights or the exception that stopped the run)
+DateResult = Tuple[str, Optional[str], Optional[str], Any]
+
+
+def _shifted(date_str: str, flex_days: int, today: date) -> List[str]:
+    """date_str ±flex_days, clamped to today or later (past dates have no flights)."""
+    start = date.fromisoformat(date_str)
+    days = (max(start + timedelta(days=d), today) for d in range(-flex_days, flex_days + 1))
+    return [day.isoformat() for day in dict.fromkeys(days)]
+
+
+def flex_date_pairs(
+    departure_date: str,
+    return_date: Optional[str],
+    flex_days: int,
+    today: Optional[date] = None,
+) -> List[Tuple[str, Optional[str]]]:
+    """Every departure/return combination within ±flex_days, none before today, return not before departure."""
+    today = today or date.today()
+    departures = _shifted(departure_date, flex_days, today)
+    if not return_date:
+        return [(dep, None) for dep in departures]
+    returns = _shifted(return_date, flex_days, today)
+    return [(dep, ret) for dep in departures for ret in returns if ret >= dep]
+
+
+def _date_state(state: dict, departure: str, ret: Optional[str]) -> dict:
+    return {**state, "departure_date": departure, "return_date": ret}
+
+
+def _cheapest(flights: Sequence[FlightData]) -> Optional[FlightData]:
+    priced = [f for f in flights if f.price and f.price.raw is not None]
+    return min(priced, key=lambda f: f.price.raw) if priced else None
+
+
+def _price_cell(flights: Any) -> str:
+    """Cheapest price, "-" when the search found no flights, "x" when it failed."""
+    if not isinstance(flights, list):
+        return "x"
+    flight = _cheapest(flights)
+    return f"{flight.price.raw:.0f}" if flight else "-"
+
+
+def _format_dates(dep: str, ret: Optional[str]) -> str:
+    return f"{dep} -> {ret}" if ret else dep
+
+
+def _price_matrix(results: Sequence[DateResult]) -> str:
+    """Compact text matrix of the cheapest price per date pair."""
+    cells = {(dep, ret): _price_cell(flights) for dep, ret, _, flights in results}
+    departures = sorted({dep for dep, _ in cells})
+    returns = sorted({ret for _, ret in cells if ret})
+    if not returns:
+        return "\n".join(f"{dep}: {cells[(dep, None)]}" for dep in departures)
+
+    lines = ["dep \\ ret  " + " ".join(f"{ret[5:]:>6}" for ret in returns)]
+    for dep in departures:
+        row = [f"{cells.get((dep, ret), ''):>6}" for ret in returns]
+        lines.append(f"{dep[5:]:<10} " + " ".join(row))
+    return "\n".join(lines)
+
+
+def _flex_result_command(
+    results: Sequence[DateResult], state: dict, tool_call_id: str, narrowed: bool = False
+) -> Command:
+    """Matrix + best date pairs; state gets the flights of the cheapest pair."""
+    ranked = []
+    failed = []
+    for dep, ret, key, flights in results:
+        if not isinstance(flights, list):
+            failed.append(_format_dates(dep, ret))
+            continue
+        best = _cheapest(flights)
+        if best is not None:
+            ranked.append((best.price.raw, dep, ret, key, flights, best))
+    ranked.sort(key=lambda r: r[0])
+
+    # Neuspjela pretraga nije isto što i "nema letova": korisnik je može ponoviti
+    failed_line = (
+        f"Search failed for {len(failed)} date combinations, try them again: {', '.join(failed)}."
+        if failed
+        else ""
+    )
+    if not ranked:
+        message = f"No flights found for any of the {len(results) - len(failed)} date combinations searched."
+        if failed:
+            message += " " + failed_line
+        return _flight_tool_message(message, tool_call_id)
+
+    currency = _build_flight_run_input(state)[0]["currency"]
+    lines = []
+    if narrowed:
+        lines.append(
+            f"Searched the main airports only: {state['origin_location']} -> {state['destination_location']}."
+        )
+    lines += [
+        f"Cheapest price per date pair ({currency}, '-' = no flights"
+        + (", 'x' = search failed" if failed else "")
+        + "):",
+        _price_matrix(results),
+        "",
+        "Best options:",
+    ]
+    for i, (_, dep, ret, _, _, best) in enumerate(ranked[:BEST_OPTIONS]):
+        lines.append(f"[{_format_dates(dep, ret)}] " + summarize_flight(i + 1, FlightSummary.from_flight(best)))
+    if failed:
+        lines.append(failed_line)
+
+    _, dep, ret, key, flights, _ = ranked[0]
+    lines.append(
+        f"Flights for the cheapest dates ({dep}{' -> ' + ret if ret else ''}) are now the current results."
+    )
+    return Command(
+        update={
+            "departure_date": dep,
+            "return_date": ret,
+            "flights": ranked_summaries(flights, state),
+            "flights_ref": key,
+            "messages": [ToolMessage("\n".join(lines), tool_call_id=tool_call_id)],
+        }
+    )
+
+
+def _search_state(state: dict) -> dict:
+    """State with one airport per side: a city with several airports uses its main one."""
+    if len(flight_routes(state)) <= 1:
+        return state
+    # ±N dana za svaku rutu bilo bi previše runova, pa se traži samo glavni aerodrom
+    return _route_state(
+        state,
+        primary_airport(split_locations(state["origin_location"])),
+        primary_airport(split_locations(state["destination_location"])),
+    )
+
+
+def _prepare(state: dict, flex_days: int) -> Tuple[Optional[List], Optional[str]]:
+    """Validate state and expand date pairs. Returns (pairs, error_message)."""
+    _, error = _build_flight_run_input(state)
+    if error:
+        return None, error
+    flex_days = max(0, min(flex_days, MAX_FLEX_DAYS))
+    try:
+        return flex_date_pairs(state["departure_date"], state.get("return_date"), flex_days), None
+    except ValueError:
+        return None, "Dates must be in YYYY-MM-DD format for a flexible date search."
+
+
+def _search_flexible_dates(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    flex_days: int = 3,
+):
+    """Find the cheapest days to fly: searches every departure/return date within ±flex_days (max 3) of the dates already set and returns a price matrix plus the best options."""
+    search_state = _search_state(state)
+    pairs, error = _prepare(search_state, flex_days)
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+
+    def search(pair: Tuple[str, Optional[str]]) -> DateResult:
+        run_input, _ = _build_flight_run_input(_date_state(search_state, *pair))
+        key = make_cache_key("flights", run_input)
+        try:
+            flights = FLIGHT_SEARCH_CACHE.get_or_fetch(key, lambda: _fetch_flights(run_input))
+        except ApifySearchError:
+            flights = []
+        except Exception as e:
+            flights = e
+        return pair[0], pair[1], key, flights
+
+    # Svaki par drži worker dok ne završi, i cache hit: ±3 dana za povratni let (49 parova)
+    # uz FLIGHT_SEARCH_CONCURRENCY=8 traje oko 7 rundi actor latencije, ne jednu pretragu
+    with ThreadPoolExecutor(max_workers=FLIGHT_SEARCH_CONCURRENCY) as executor:
+        results = list(executor.map(search, pairs))
+    return _flex_result_command(results, search_state, tool_call_id, search_state is not state)
+
+
+async def _asearch_flexible_dates(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    flex_days: int = 3,
+):
+    """Async variant of _search_flexible_dates with a semaphore around actor runs."""
+    search_state = await asyncio.to_thread(_search_state, state)
+    pairs, error = _prepare(search_state, flex_days)
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+
+    semaphore = asyncio.Semaphore(FLIGHT_SEARCH_CONCURRENCY)
+
+    async def search(pair: Tuple[str, Optional[str]]) -> DateResult:
+        run_input, _ = _build_flight_run_input(_date_state(search_state, *pair))
+        key = make_cache_key("flights", run_input)
+
+        async def fetch() -> List[FlightData]:
+            async with semaphore:  # Cache hits never wait for a slot
+                return await _afetch_flights(run_input)
+
+        try:
+            flights = await FLIGHT_SEARCH_CACHE.aget_or_fetch(key, fetch)
+        except ApifySearchError:
+            flights = []
+        except Exception as e:
+            flights = e
+        return pair[0], pair[1], key, flights
+
+    results = await asyncio.gather(*(search(pair) for pair in pairs))
+    return _flex_result_command(results, search_state, tool_call_id, search_state is not state)
+
+
+search_flexible_dates_with_apify = StructuredTool.from_function(
+    func=_search_flexible_dates,
+    coroutine=_asearch_flexible_dates,
+    name="search_flexible_dates_with_apify",
+    description=_search_flexible_dates.__doc__,
+)
@@ -1,19 +1,53 @@
 # agent/tools/flight_tools.py
-import json
-import os
-from typing import Any, Callable, List, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 from typing_extensions import Annotated
 from langgraph.prebuilt import InjectedState
 from langchain_core.tools.base import InjectedToolCallId
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool, tool
 from langgraph.types import Command
 from langchain_core.messages import ToolMessage
-from apify_client import ApifyClient
-from pydantic import ValidationError
 from datetime import datetime
-from agent.models.flights import FlightData
-
-APIFY_API_KEY = os.getenv("APIFY_API_KEY")
+from agent.models.flights import (
+    FLIGHT_DATASET_FIELDS,
+    FLIGHT_DATASET_UNWIND,
+    FlightData,
+    FlightSummary,
+    LegSummary,
+    parse_flights,
+)
+from agent.utils.airports import city_name, resolve_location
+from agent.utils.apify import (
+    ApifySearchError,
+    aiter_dataset_json_pages,
+    arun_actor,
+    get_apify_async_client,
+    get_apify_client,
+    iter_dataset_json_pages,
+    run_actor,
+)
+from agent.utils.log import get_logger
+from agent.utils.metrics import timed
+from agent.utils.render import render_artifact
+from agent.utils.cache import FLIGHT_SEARCH_CACHE, make_cache_key
+from agent.utils.speculative import FLIGHT_SPECULATION
+from agent.utils.flight_ranking import (
+    flight_arrays,
+    pareto_mask,
+    parse_departure_hours,
+    preferences_from_state,
+    rank_flights,
+)
+from agent.utils.config import (
+    APIFY_API_KEY,
+    FLIGHT_RESULTS_LIMIT,
+    FLIGHT_SEARCH_CONCURRENCY,
+    FLIGHT_TRUSTED_PARSING,
+    SPECULATIVE_SEARCH,
+)
+
+logger = get_logger(__name__)
 
 
 def format_date_yyyymmdd_to_yymmdd(date_str: Optional[str]) -> Optional[str]:
@@ -23,16 +57,24 @@ def format_date_yyyymmdd_to_yymmdd(date_str: Optional[str]) -> Optional[str]:
     try:
         return datetime.strptime(date_str, "%Y-%m-%d").strftime("%y%m%d")
     except ValueError:
-        print(f"Warning: Could not parse date {date_str}. Expected YYYY-MM-DD format.")
+        logger.warning("Could not parse date %r, expected YYYY-MM-DD", date_str)
         return None  # Vrati None ako format nije dobar
 
 
-@tool
-def search_flights_with_apify(
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    state: Annotated[dict, InjectedState],
-):
-    """Search flights using Apify Skyscanner Scraper (wIfblEie7OF0dOs3C) based on current state."""
+FLIGHTS_ACTOR_ID = "wIfblEie7OF0dOs3C"
+
+
+def _flight_tool_message(content: str, tool_call_id: str) -> Command:
+    """Wrap a plain text reply into a Command with a single ToolMessage."""
+    return Command(
+        update={"messages": [ToolMessage(content, tool_call_id=tool_call_id)]}
+    )
+
+
+def _build_flight_run_input(
+    state: dict,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Build the actor run_input from state. Returns (run_input, error_message)."""
 
     # --- 1. Get data from state ---
     origin = state.get("origin_location")
@@ -44,28 +86,13 @@ def search_flights_with_apify(
 
     # --- 2. Validate required data ---
     if not all([origin, destination, depart_date_str]):
-        return Command(
-            update={
-                "messages": [
-                    ToolMessage(
-                        "Missing required flight details: origin, destination, or departure date.",
-                        tool_call_id=tool_call_id,
-                    )
-                ]
-            }
+        return (
+            None,
+            "Missing required flight details: origin, destination, or departure date.",
         )
 
     if not APIFY_API_KEY:  # Jednostavnija provjera
-        return Command(
-            update={
-                "messages": [
-                    ToolMessage(
-                        "Apify API key is not configured. Cannot search flights.",
-                        tool_call_id=tool_call_id,
-                    )
-                ]
-            }
-        )
+        return None, "Apify API key is not configured. Cannot search flights."
 
     # --- 3. Format data for Apify Actor ---
     depart_date_formatted = format_date_yyyymmdd_to_yymmdd(depart_date_str)
@@ -74,23 +101,14 @@ def search_flights_with_apify(
     )  # Vratit će None ako return_date_str nije postavljen
 
     if not depart_date_formatted:
-        return Command(
-            update={
-                "messages": [
-                    ToolMessage(
-                        f"Invalid departure date format: {depart_date_str}. Expected YYYY-MM-DD.",
-                        tool_call_id=tool_call_id,
-                    )
-                ]
-            }
+        return (
+            None,
+            f"Invalid departure date format: {depart_date_str}. Expected YYYY-MM-DD.",
         )
     # Nije nužno greška ako return date nije dobar format, možda je one-way
     # if return_date_str and not return_date_formatted:
     #      # Handle error or proceed with one-way?
 
-    client = ApifyClient(APIFY_API_KEY)
-    actor_id = "wIfblEie7OF0dOs3C"
-
     # --- 4. Construct run_input based on Apify example ---
     run_input = {
         "origin": origin,
@@ -106,7 +124,7 @@ def search_flights_with_apify(
         "classtype": "economy",  # Dodano prema primjeru, idealno dinamički
         "currency": "EUR",
         "locale": state.get("desired_language", "en-GB"),
-        "maxItems": 5,  # Ograniči broj rezultata za testiranje/brzinu
+        "maxItems": FLIGHT_RESULTS_LIMIT,  # Actor ne scrapea više nego što parsiramo
         # --- Opcionalni parametri iz primjera koje možemo dodati ako treba ---
         # "format": True,
         # "process": "gfp",
@@ -124,149 +142,431 @@ def search_flights_with_apify(
     # if children_count > 0:
     #    run_input["children"] = [] # Ili [1] * children_count kao placeholder? Provjeriti actor!
 
-    print(f"--- Calling Apify Actor '{actor_id}' with input: ---")
-    print(json.dumps(run_input, indent=2))  # Koristi json.dumps za ljepši ispis
-    print("----------------------------------------------------")
+    return run_input, None
+
+
+def _collect_flights(raw_page: bytes, flights_list: List[FlightData], limit: int) -> int:
+    """Validate one page of unwound flight rows into flights_list, up to limit.
+
+    Returns the number of rows on the page.
+    """
+    # Cijela stranica (JSON bytes) se validira odjednom; neispravni letovi se samo preskoče
+    with timed("parse", source="flights"):
+        parsed, errors = parse_flights(raw_page, trusted=FLIGHT_TRUSTED_PARSING)
+    # Jedan zapis po stranici (ne po letu); ponovljeni se još i uzorkuju
+    if errors:
+        index, error = next(iter(errors.items()))
+        logger.warning(
+            "%d flight items failed validation",
+            len(errors),
+            extra={"first_index": index, "first_error": error},
+        )
+    # A row with neither id nor price is a dataset item that had no 'data' list to unwind
+    valid = [flight for flight in parsed if flight.id or flight.price]
+    if len(valid) < len(parsed):
+        logger.warning("%d dataset rows were not flights", len(parsed) - len(valid))
+    flights_list.extend(valid[: limit - len(flights_list)])
+    return len(parsed) + len(errors)
+
+
+def _check_flights(
+    flights_list: List[FlightData], items_seen: int, run_input: Dict[str, Any]
+) -> List[FlightData]:
+    """Raise ApifySearchError if the dataset produced nothing usable."""
+    if not items_seen:
+        logger.warning("Apify dataset is empty", extra={"run_input": run_input})
+        raise ApifySearchError(f"No data returned from Apify for the search.")
+
+    if not flights_list:
+        raise ApifySearchError(
+            f"No valid flight data could be parsed from the Apify dataset for "
+            f"{run_input['origin']} to {run_input['destination']}."
+        )
+    return flights_list
+
+
+def _fetch_flights(
+    run_input: Dict[str, Any], limit: int = FLIGHT_RESULTS_LIMIT
+) -> List[FlightData]:
+    """Run the Skyscanner actor and stream its projected dataset, stopping at limit flights."""
+    client = get_apify_client()
 
-    # --- 5. Call Apify Actor and Process Results ---
+    logger.info("Starting flight actor run", extra={"actor": FLIGHTS_ACTOR_ID, "run_input": run_input})
+    run = run_actor(client, FLIGHTS_ACTOR_ID, run_input)
+    logger.debug("Flight actor run finished", extra={"run": run})
+
+    dataset_id = run.get("defaultDatasetId") if run else None
+    if not dataset_id:
+        raise ApifySearchError("Apify actor run did not return a dataset ID.")
+
+    flights_list: List[FlightData] = []
+    items_seen = 0
+    for page in iter_dataset_json_pages(
+        client, dataset_id, FLIGHT_DATASET_FIELDS, FLIGHT_DATASET_UNWIND
+    ):
+        items_seen += _collect_flights(page, flights_list, limit)
+        if len(flights_list) >= limit:
+            break  # Ne dohvaćaj ostatak dataseta
+
+    return _check_flights(flights_list, items_seen, run_input)
+
+
+async def _afetch_flights(
+    run_input: Dict[str, Any], limit: int = FLIGHT_RESULTS_LIMIT
+) -> List[FlightData]:
+    """Async variant of _fetch_flights built on the shared ApifyClientAsync."""
+    client = get_apify_async_client()
+
+    logger.info("Starting flight actor run", extra={"actor": FLIGHTS_ACTOR_ID, "run_input": run_input})
+    run = await arun_actor(client, FLIGHTS_ACTOR_ID, run_input)
+    logger.debug("Flight actor run finished", extra={"run": run})
+
+    dataset_id = run.get("defaultDatasetId") if run else None
+    if not dataset_id:
+        raise ApifySearchError("Apify actor run did not return a dataset ID.")
+
+    flights_list: List[FlightData] = []
+    items_seen = 0
+    pages = aiter_dataset_json_pages(
+        client, dataset_id, FLIGHT_DATASET_FIELDS, FLIGHT_DATASET_UNWIND
+    )
     try:
-        run = client.actor(actor_id).call(run_input=run_input)
-        print(f"--- Apify Run Info ---")
-        print(run)
-        print("----------------------")
-
-        flights_list = []
-        dataset_id = run.get("defaultDatasetId")
-        if not dataset_id:
-            return Command(
-                update={
-                    "messages": [
-                        ToolMessage(
-                            "Apify actor run did not return a dataset ID.",
-                            tool_call_id=tool_call_id,
-                        )
-                    ]
-                }
-            )
+        async for page in pages:
+            items_seen += _collect_flights(page, flights_list, limit)
+            if len(flights_list) >= limit:
+                break
+    finally:
+        await pages.aclose()
 
-        print(f"Fetching items from dataset: {dataset_id}")
-        # Ispravljeno parsiranje prema primjeru outputa: item -> item['data'] -> iteracija
-        dataset_items = list(
-            client.dataset(dataset_id).iterate_items()
-        )  # Dohvati sve iteme odjednom
-
-        if not dataset_items:
-            print("Warning: Apify dataset is empty.")
-            return Command(
-                update={
-                    "messages": [
-                        ToolMessage(
-                            f"No data returned from Apify for the search.",
-                            tool_call_id=tool_call_id,
-                        )
-                    ]
-                }
-            )
+    return _check_flights(flights_list, items_seen, run_input)
 
-        # Pretpostavka: Dataset sadrži jedan item s 'data' listom unutra
-        # Ako može biti više itema, treba prilagoditi logiku
-        for item in dataset_items:
-            if (
-                isinstance(item, dict)
-                and "data" in item
-                and isinstance(item["data"], list)
-            ):
-                print(
-                    f"Found 'data' key with {len(item['data'])} potential flights in dataset item."
-                )
-                for flight_data_dict in item["data"]:
-                    try:
-                        # Parsiraj svaki rječnik iz 'data' liste kao FlightData
-                        flight_obj = FlightData(**flight_data_dict)
-                        flights_list.append(flight_obj)
-                    except ValidationError as e:
-                        print(f"Pydantic Validation Error parsing flight item: {e}")
-                        # Logiraj rječnik koji uzrokuje grešku
-                        # print(f"Failed item structure: {json.dumps(flight_data_dict, indent=2)}")
-                    except Exception as e:
-                        print(f"Error processing flight item dictionary: {e}")
-            else:
-                print(
-                    f"Warning: Dataset item does not have the expected structure (missing 'data' list): {item}"
+
+# Options shown by return_flights unless the agent asks for more
+FLIGHT_SHORTLIST_SIZE = 5
+
+
+def ranked_summaries(flights: Sequence[Any], state: dict) -> List[FlightSummary]:
+    """FlightSummary records ordered best-first by the user's ranking preferences."""
+    with timed("rank"):
+        summaries = [
+            f if isinstance(f, FlightSummary) else FlightSummary.from_flight(f)
+            for f in flights
+        ]
+        order, _ = rank_flights(summaries, preferences_from_state(state))
+        return [summaries[i] for i in order]
+
+
+def _flights_result_command(
+    flights_list: List[FlightData], cache_key: str, state: dict, tool_call_id: str
+) -> Command:
+    """Build the tool's Command update for a successful search.
+
+    Only compact FlightSummary records go into state; the full FlightData
+    list stays in FLIGHT_SEARCH_CACHE under ``cache_key``.
+    """
+    origin = state.get("origin_location")
+    destination = state.get("destination_location")
+
+    # --- 6. Return Success ---
+    return Command(
+        update={
+            "flights": ranked_summaries(flights_list, state),
+            "flights_ref": cache_key,
+            "messages": [
+                ToolMessage(
+                    f"Found {len(flights_list)} flight options for {origin} to {destination}. "
+                    f"Details available.",
+                    tool_call_id=tool_call_id,
+                    artifact=render_artifact("flights"),
                 )
+            ],
+        }
+    )
 
-        if not flights_list:
-            return Command(
-                update={
-                    "messages": [
-                        ToolMessage(
-                            f"No valid flight data could be parsed from the Apify dataset for {origin} to {destination}.",
-                            tool_call_id=tool_call_id,
-                        )
-                    ]
-                }
-            )
 
-        # --- 6. Return Success ---
-        return Command(
-            update={
-                "flights": flights_list,
-                "messages": [
-                    ToolMessage(
-                        f"Found {len(flights_list)} flight options for {origin} to {destination}. "
-                        f"Details available.",
-                        tool_call_id=tool_call_id,
-                    )
-                ],
-            }
+def _flights_error_command(e: Exception, tool_call_id: str) -> Command:
+    """Report an unexpected Apify/processing error back to the agent."""
+    # Uhvati specifičnije Apify greške ako je moguće
+    logger.error("Error calling Apify or processing results: %s", e, exc_info=e)
+    return _flight_tool_message(
+        f"An error occurred while searching for flights: {e}", tool_call_id
+    )
+
+
+def split_locations(value: Any) -> List[str]:
+    """Locations from a list or a comma-separated string ("Zagreb, Ljubljana")."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [location.strip() for location in value if location and location.strip()]
+
+
+def flight_routes(state: dict) -> List[Tuple[str, str]]:
+    """Every origin x destination combination set in state."""
+    return [
+        (origin, destination)
+        for origin in split_locations(state.get("origin_location"))
+        for destination in split_locations(state.get("destination_location"))
+        if origin.lower() != destination.lower()
+    ]
+
+
+def resolve_locations(value: str) -> Tuple[Optional[str], str, List[str]]:
+    """Resolve comma-separated places to IATA codes, one airport per place.
+
+    A city with several airports (London, Paris) keeps only its main airport,
+    since every extra airport is another actor run. To search several airports
+    the user names them ("LHR, LGW").
+
+    Returns (codes joined with ", ", readable labels, errors).
+    """
+    codes, labels, errors = [], [], []
+    for location in split_locations(value):
+        resolution = resolve_location(location)
+        if resolution.error:
+            errors.append(resolution.error)
+            continue
+        code, others = resolution.codes[0], resolution.codes[1:]
+        if code not in codes:
+            codes.append(code)
+        if others:
+            labels.append(f"{resolution.label} [{code}; also {', '.join(others)} if the user names them]")
+        else:
+            labels.append(resolution.label)
+    return (", ".join(codes) if codes and not errors else None), "; ".join(labels), errors
+
+
+def _route_state(state: dict, origin: str, destination: str) -> dict:
+    return {**state, "origin_location": origin, "destination_location": destination}
+
+
+def merge_route_flights(route_flights: Sequence[List[FlightData]]) -> List[FlightData]:
+    """Merge per-route results, dropping itineraries seen under another query (same id).
+
+    Order is not meaningful; the result is ranked before it goes into state.
+    """
+    seen = set()
+    merged = []
+    for flights in route_flights:
+        for flight in flights:
+            if flight.id:
+                if flight.id in seen:
+                    continue
+                seen.add(flight.id)
+            merged.append(flight)
+    return merged
+
+
+def _routes_result_command(
+    routes: List[Tuple[str, str]],
+    results: Sequence[Any],
+    state: dict,
+    tool_call_id: str,
+) -> Command:
+    """Merge the results of a multi-route search into one ranked Command."""
+    found, counts = [], []
+    for (origin, destination), result in zip(routes, results):
+        if isinstance(result, ApifySearchError):
+            counts.append(f"{origin}->{destination}: none")
+        elif isinstance(result, BaseException):
+            counts.append(f"{origin}->{destination}: failed ({result})")
+        else:
+            found.append(result)
+            counts.append(f"{origin}->{destination}: {len(result)}")
+
+    merged = merge_route_flights(found)
+    if not merged:
+        return _flight_tool_message(
+            "No flights found on any route (" + "; ".join(counts) + ").", tool_call_id
         )
 
+    # Spojena lista se čuva pod vlastitim ključem kako bi select_flight radio
+    cache_key = make_cache_key(
+        "flights",
+        {
+            "routes": [f"{o}->{d}" for o, d in routes],
+            "run_input": _build_flight_run_input(_route_state(state, *routes[0]))[0],
+        },
+    )
+    FLIGHT_SEARCH_CACHE.put(cache_key, merged)
+    return Command(
+        update={
+            "flights": ranked_summaries(merged, state),
+            "flights_ref": cache_key,
+            "messages": [
+                ToolMessage(
+                    f"Found {len(merged)} unique flight options across {len(routes)} routes "
+                    f"(" + "; ".join(counts) + "). Details available.",
+                    tool_call_id=tool_call_id,
+                    artifact=render_artifact("flights"),
+                )
+            ],
+        }
+    )
+
+
+def _search_routes(
+    routes: List[Tuple[str, str]], state: dict, tool_call_id: str
+) -> Command:
+    """Search several routes concurrently (at most FLIGHT_SEARCH_CONCURRENCY runs at once)."""
+
+    # Nedostajući podaci / API key vrijede za sve rute, pa se provjeravaju jednom
+    _, error = _build_flight_run_input(_route_state(state, *routes[0]))
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+
+    def search(route: Tuple[str, str]) -> Any:
+        run_input, _ = _build_flight_run_input(_route_state(state, *route))
+        cache_key = make_cache_key("flights", run_input)
+        FLIGHT_SPECULATION.attach(cache_key)
+        try:
+            return FLIGHT_SEARCH_CACHE.get_or_fetch(cache_key, lambda: _fetch_flights(run_input))
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=FLIGHT_SEARCH_CONCURRENCY) as executor:
+        results = list(executor.map(search, routes))
+    return _routes_result_command(routes, results, state, tool_call_id)
+
+
+async def _asearch_routes(
+    routes: List[Tuple[str, str]], state: dict, tool_call_id: str
+) -> Command:
+    """Async variant of _search_routes."""
+    _, error = _build_flight_run_input(_route_state(state, *routes[0]))
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+    semaphore = asyncio.Semaphore(FLIGHT_SEARCH_CONCURRENCY)
+
+    async def search(route: Tuple[str, str]) -> Any:
+        run_input, _ = _build_flight_run_input(_route_state(state, *route))
+
+        async def fetch() -> List[FlightData]:
+            async with semaphore:
+                return await _afetch_flights(run_input)
+
+        cache_key = make_cache_key("flights", run_input)
+        FLIGHT_SPECULATION.attach(cache_key)
+        try:
+            return await FLIGHT_SEARCH_CACHE.aget_or_fetch(cache_key, fetch)
+        except Exception as e:
+            return e
+
+    results = await asyncio.gather(*(search(route) for route in routes))
+    return _routes_result_command(routes, results, state, tool_call_id)
+
+
+def _search_flights(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+):
+    """Search flights using Apify Skyscanner Scraper (wIfblEie7OF0dOs3C) based on current state. Several origins/destinations are searched in parallel and merged."""
+
+    routes = flight_routes(state)
+    if len(routes) > 1:
+        return _search_routes(routes, state, tool_call_id)
+
+    run_input, error = _build_flight_run_input(state)
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+
+    # --- 5. Call Apify Actor (or cache) and Process Results ---
+    try:
+        cache_key = make_cache_key("flights", run_input)
+        FLIGHT_SPECULATION.attach(cache_key)
+        flights_list = FLIGHT_SEARCH_CACHE.get_or_fetch(
+            cache_key, lambda: _fetch_flights(run_input)
+        )
     # --- 7. Handle Errors ---
+    except ApifySearchError as e:
+        return _flight_tool_message(str(e), tool_call_id)
     except Exception as e:
-        # Uhvati specifičnije Apify greške ako je moguće
-        print(f"Error calling Apify or processing results: {e}")
-        import traceback
+        return _flights_error_command(e, tool_call_id)
 
-        traceback.print_exc()  # Ispiši cijeli traceback za debugiranje
-        return Command(
-            update={
-                "messages": [
-                    ToolMessage(
-                        f"An error occurred while searching for flights: {e}",
-                        tool_call_id=tool_call_id,
-                    )
-                ]
-            }
+    return _flights_result_command(flights_list, cache_key, state, tool_call_id)
+
+
+async def _asearch_flights(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+):
+    """Async variant of _search_flights."""
+
+    routes = flight_routes(state)
+    if len(routes) > 1:
+        return await _asearch_routes(routes, state, tool_call_id)
+
+    run_input, error = _build_flight_run_input(state)
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+
+    try:
+        cache_key = make_cache_key("flights", run_input)
+        FLIGHT_SPECULATION.attach(cache_key)
+        flights_list = await FLIGHT_SEARCH_CACHE.aget_or_fetch(
+            cache_key, lambda: _afetch_flights(run_input)
         )
+    except ApifySearchError as e:
+        return _flight_tool_message(str(e), tool_call_id)
+    except Exception as e:
+        return _flights_error_command(e, tool_call_id)
+
+    return _flights_result_command(flights_list, cache_key, state, tool_call_id)
+
+
+# Jedan alat s oba puta: ToolNode u async grafu poziva coroutine, sync invoke poziva func
+search_flights_with_apify = StructuredTool.from_function(
+    func=_search_flights,
+    coroutine=_asearch_flights,
+    name="search_flights_with_apify",
+    description=_search_flights.__doc__,
+)
 
 
 # Ostali alati (set_flight_details, return_flights) ostaju isti kao u prethodnom odgovoru
 # ... (zalijepi kod za set_flight_details i return_flights ovdje) ...
 
 
-@tool
-def set_flight_details(
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    state: Annotated[dict, InjectedState],
+def _flight_details_update(
+    state: dict,
     origin_location: Optional[str] = None,
     destination_location: Optional[str] = None,
     departure_date: Optional[str] = None,
     return_date: Optional[str] = None,
-    travelers: Optional[int] = None,  # Koristimo postojeći 'travelers'
-    children: Optional[int] = None,  # Koristimo postojeći 'children'
-    # TODO: Dodati parametre za direct, classtype, market, children_ages ako želimo dinamičko postavljanje
-):
-    """Set flight search parameters based on user input. Dates should be in YYYY-MM-DD format."""
-
+    travelers: Optional[int] = None,
+    children: Optional[int] = None,
+    departure_hours: Optional[str] = None,
+    flexible_fare: Optional[bool] = None,
+) -> Tuple[Dict[str, Any], List[str], Optional[str]]:
+    """Validate flight parameters into a state update.
+
+    Returns (update, confirmation parts, error message); on an error nothing is updated.
+    """
     update_dict = {}
     confirmation_parts = []
 
-    if origin_location:
-        update_dict["origin_location"] = origin_location
-        confirmation_parts.append(f"origin {origin_location}")
-    if destination_location:
-        update_dict["destination_location"] = destination_location
-        confirmation_parts.append(f"destination {destination_location}")
+    # Lokacije se provjeravaju lokalno prije bilo kakvog actor runa
+    location_errors = []
+    for field, label, value in (
+        ("origin_location", "origin", origin_location),
+        ("destination_location", "destination", destination_location),
+    ):
+        if not value:
+            continue
+        codes, labels, errors = resolve_locations(value)
+        location_errors.extend(errors)
+        if codes:
+            update_dict[field] = codes
+            confirmation_parts.append(f"{label} {labels}")
+            if field == "destination_location":
+                # Hotelska pretraga po ovim kodovima traži grad, ne aerodrom
+                update_dict["resolved_destination"] = {
+                    "codes": codes,
+                    "city": city_name(split_locations(codes)[0]),
+                }
+    if location_errors:
+        return {}, [], "Flight details not updated. " + " ".join(location_errors)
     if departure_date:
         # TODO: Možda dodati validaciju formata YYYY-MM-DD ovdje?
         update_dict["departure_date"] = departure_date
@@ -283,6 +583,81 @@ def set_flight_details(
         if children > 0:
             confirmation_parts.append(f"with {children} children")
 
+    if departure_hours is not None:
+        if departure_hours and not parse_departure_hours(departure_hours):
+            return {}, [], f"Invalid departure_hours '{departure_hours}'. Use HH-HH, e.g. 6-12."
+        update_dict["departure_hours"] = departure_hours or None
+        confirmation_parts.append(f"departure between {departure_hours or 'any time'}")
+    if flexible_fare is not None:
+        update_dict["flexible_fare"] = flexible_fare
+        confirmation_parts.append(
+            "preferring flexible fares" if flexible_fare else "any fare type"
+        )
+    if state.get("flights") and (
+        departure_hours is not None or flexible_fare is not None
+    ):
+        # Postojeći rezultati se samo preslože, nova pretraga nije potrebna
+        update_dict["flights"] = ranked_summaries(
+            state["flights"], {**state, **update_dict}
+        )
+    return update_dict, confirmation_parts, None
+
+
+def _speculative_flight_searches(state: dict) -> Dict[str, Dict[str, Any]]:
+    """Cache key -> run_input of every route search the state is ready for."""
+    routes = flight_routes(state)
+    # Unaprijed se pokreće najviše onoliko runova koliko i pravi poziv pokreće odjednom
+    if not routes or len(routes) > FLIGHT_SEARCH_CONCURRENCY:
+        return {}
+    searches = {}
+    for route in routes:
+        run_input, error = _build_flight_run_input(_route_state(state, *route))
+        if error:
+            return {}
+        searches[make_cache_key("flights", run_input)] = run_input
+    return searches
+
+
+def _speculate_flights(before: dict, after: dict) -> None:
+    """Start the searches the new details allow and drop those they replaced."""
+    old = _speculative_flight_searches(before)
+    new = _speculative_flight_searches(after)
+    for key in old.keys() - new.keys():
+        FLIGHT_SPECULATION.discard(key)
+    for key in new.keys() - old.keys():
+        FLIGHT_SPECULATION.start(key, lambda run_input=new[key]: _afetch_flights(run_input))
+
+
+def _set_flight_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    origin_location: Optional[str] = None,
+    destination_location: Optional[str] = None,
+    departure_date: Optional[str] = None,
+    return_date: Optional[str] = None,
+    travelers: Optional[int] = None,  # Koristimo postojeći 'travelers'
+    children: Optional[int] = None,  # Koristimo postojeći 'children'
+    departure_hours: Optional[str] = None,
+    flexible_fare: Optional[bool] = None,
+    # TODO: Dodati parametre za direct, classtype, market, children_ages ako želimo dinamičko postavljanje
+):
+    """Set flight search parameters based on user input. Dates should be in YYYY-MM-DD format. Locations can be cities, airports or IATA codes; they are resolved to IATA codes offline. A city with several airports uses its main one. Several origins or destinations can be given comma-separated (e.g. "Zagreb, Ljubljana" or "LHR, LGW").
+    Ranking preferences: departure_hours as "HH-HH" (e.g. "6-12" for morning departures) and flexible_fare=True if the user wants a changeable/refundable ticket."""
+
+    update_dict, confirmation_parts, error = _flight_details_update(
+        state,
+        origin_location,
+        destination_location,
+        departure_date,
+        return_date,
+        travelers,
+        children,
+        departure_hours,
+        flexible_fare,
+    )
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+
     if not confirmation_parts:
         return Command(
             update={
@@ -304,116 +679,230 @@ def set_flight_details(
     return Command(update=update_dict)
 
 
-@tool
-def return_flights(state: Annotated[dict, InjectedState]):
-    """Returns the list of flights found in the previous search."""
+async def _aset_flight_details(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    origin_location: Optional[str] = None,
+    destination_location: Optional[str] = None,
+    departure_date: Optional[str] = None,
+    return_date: Optional[str] = None,
+    travelers: Optional[int] = None,
+    children: Optional[int] = None,
+    departure_hours: Optional[str] = None,
+    flexible_fare: Optional[bool] = None,
+):
+    """Async variant of _set_flight_details; with SPECULATIVE_SEARCH it also starts the search."""
+    # Resolver radi nad ~8k aerodroma, ne smije blokirati event loop
+    result = await asyncio.to_thread(
+        _set_flight_details,
+        tool_call_id, state, origin_location, destination_location, departure_date,
+        return_date, travelers, children, departure_hours, flexible_fare,
+    )
+    if SPECULATIVE_SEARCH:
+        details = {k: v for k, v in result.update.items() if k != "messages"}
+        _speculate_flights(state, {**state, **details})
+    return result
+
+
+set_flight_details = StructuredTool.from_function(
+    func=_set_flight_details,
+    coroutine=_aset_flight_details,
+    name="set_flight_details",
+    description=_set_flight_details.__doc__,
+)
+
+
+def _format_leg(label: str, leg: LegSummary) -> str:
+    dep_time = leg.departure[:16] if leg.departure else "N/A"
+    arr_time = leg.arrival[:16] if leg.arrival else "N/A"
+    duration = leg.duration_minutes if leg.duration_minutes is not None else "N/A"
+    text = (
+        f"{label}: {leg.origin or 'N/A'} {dep_time} -> "
+        f"{leg.destination or 'N/A'} {arr_time} ({duration} min"
+    )
+    if leg.stops:
+        text += f", {leg.stops} stop(s)"
+    return text + ")"
+
+
+def summarize_flight(index: int, flight: FlightSummary) -> str:
+    """One-line text summary of a flight option (1-based index)."""
+    summary = f"Option {index}: "
+    if flight.price_formatted:
+        summary += f"Price: {flight.price_formatted}, "
+    if flight.carrier:
+        summary += f"Main Carrier: {flight.carrier}, "
+    if flight.legs:
+        summary += _format_leg("Outbound", flight.legs[0]) + ". "
+        if len(flight.legs) > 1:
+            summary += _format_leg("Return", flight.legs[1]) + "."
+
+    # Linkovi
+    if flight.link:
+        summary += f" Link: {flight.link}"
+    else:
+        summary += " (No direct link found)"
+    return summary.strip()  # Ukloni eventualni razmak na kraju
+
+
+def _flight_listing(flights: Sequence[Any], limit: int) -> Optional[str]:
+    """Numbered text summary of the best ``limit`` flights, best trade-offs marked."""
+    valid = []
+    for i, flight in enumerate(flights):
+        # Provjeri je li flight stvarno FlightSummary zapis
+        if not isinstance(flight, FlightSummary):
+            logger.warning("Item in state['flights'] is not a FlightSummary: %s", type(flight))
+            continue
+        valid.append((i + 1, flight))
+    if not valid:
+        return None
+
+    with timed("format", source="flights"):
+        pareto = pareto_mask(flight_arrays([flight for _, flight in valid]))
+        flight_summaries = [
+            summarize_flight(number, flight) + (" [best trade-off]" if best else "")
+            for (number, flight), best in list(zip(valid, pareto))[: max(limit, 1)]
+        ]
+        if len(valid) > len(flight_summaries):
+            flight_summaries.append(
+                f"({len(valid) - len(flight_summaries)} more options ranked lower.)"
+            )
+        return "\n".join(flight_summaries)
+
+
+@tool(response_format="content_and_artifact")
+def return_flights(
+    state: Annotated[dict, InjectedState], limit: int = FLIGHT_SHORTLIST_SIZE
+):
+    """Returns the best flights found in the previous search, already ranked best first (price, duration, stops and the user's preferences). Increase limit to see more options."""
     flights = state.get("flights")
     if not flights:
-        return "No flights have been searched for or found yet."
+        return "No flights have been searched for or found yet.", None
 
-    flight_summaries = []
-    for i, flight in enumerate(flights):
-        # Provjeri je li flight stvarno FlightData objekt
-        if not isinstance(flight, FlightData):
-            print(
-                f"Warning: Item in state['flights'] is not a FlightData object: {type(flight)}"
-            )
-            continue
+    listing = _flight_listing(flights, limit)
+    if listing is None:
+        return "No flight details could be summarized.", None
+    return listing, render_artifact("flights", limit=limit)
 
-        summary = f"Option {i+1}: "
-        if flight.price and flight.price.formatted:
-            summary += f"Price: {flight.price.formatted}, "
-        if flight.firstCarrier:
-            summary += f"Main Carrier: {flight.firstCarrier}, "
-        if flight.legs:
-            try:  # Dodaj try-except za siguran pristup atributima
-                outbound_leg = flight.legs[0]
-                dep_time = (
-                    outbound_leg.departure[:16] if outbound_leg.departure else "N/A"
-                )
-                arr_time = outbound_leg.arrival[:16] if outbound_leg.arrival else "N/A"
-                origin_code = (
-                    outbound_leg.origin.displayCode if outbound_leg.origin else "N/A"
-                )
-                dest_code = (
-                    outbound_leg.destination.displayCode
-                    if outbound_leg.destination
-                    else "N/A"
-                )
-                duration = (
-                    outbound_leg.durationInMinutes
-                    if outbound_leg.durationInMinutes is not None
-                    else "N/A"
-                )
-                stops = (
-                    outbound_leg.stopCount
-                    if outbound_leg.stopCount is not None
-                    else "N/A"
+
+@tool
+def select_flight(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    option_number: int,
+):
+    """Select one of the found flights by its option number (1-based) and load its full details (legs, fare policy; per-agent pricing options are not fetched)."""
+    flights = state.get("flights") or []
+    if not 1 <= option_number <= len(flights):
+        return _flight_tool_message(
+            f"There is no flight option {option_number}; "
+            f"{len(flights)} options are available.",
+            tool_call_id,
+        )
+
+    summary = flights[option_number - 1]
+    ref = state.get("flights_ref")
+    full_flights = FLIGHT_SEARCH_CACHE.lookup(ref) if ref else None
+    selected = None
+    if full_flights:
+        if summary.id:
+            selected = next((f for f in full_flights if f.id == summary.id), None)
+        elif option_number <= len(full_flights):
+            selected = full_flights[option_number - 1]
+
+    if selected is None:
+        return _flight_tool_message(
+            "Full details for this flight are no longer available. "
+            "Please search for flights again.",
+            tool_call_id,
+        )
+
+    return Command(
+        update={
+            "selected_flight": selected,
+            "messages": [
+                ToolMessage(
+                    f"Selected {summarize_flight(option_number, summary)}",
+                    tool_call_id=tool_call_id,
                 )
+            ],
+        }
+    )
 
-                summary += f"Outbound: {origin_code} {dep_time} -> {dest_code} {arr_time} ({duration} min"
-                if stops != "N/A" and stops > 0:
-                    summary += f", {stops} stop(s)"
-                summary += "). "
 
-                if len(flight.legs) > 1:
-                    inbound_leg = flight.legs[1]
-                    dep_time_ret = (
-                        inbound_leg.departure[:16] if inbound_leg.departure else "N/A"
-                    )
-                    arr_time_ret = (
-                        inbound_leg.arrival[:16] if inbound_leg.arrival else "N/A"
-                    )
-                    origin_code_ret = (
-                        inbound_leg.origin.displayCode if inbound_leg.origin else "N/A"
-                    )
-                    dest_code_ret = (
-                        inbound_leg.destination.displayCode
-                        if inbound_leg.destination
-                        else "N/A"
-                    )
-                    duration_ret = (
-                        inbound_leg.durationInMinutes
-                        if inbound_leg.durationInMinutes is not None
-                        else "N/A"
-                    )
-                    stops_ret = (
-                        inbound_leg.stopCount
-                        if inbound_leg.stopCount is not None
-                        else "N/A"
-                    )
+def _fused_flights_command(
+    details: Dict[str, Any],
+    confirmation_parts: List[str],
+    result: Command,
+    tool_call_id: str,
+) -> Command:
+    """Merge the details update and the search result into one reply with the shortlist."""
+    update = {**details, **result.update}
+    message = result.update["messages"][-1]
+    lines = []
+    if confirmation_parts:
+        lines.append("Flight details updated: " + ", ".join(confirmation_parts) + ".")
+    lines.append(message.content)
+    if "flights_ref" in result.update:
+        listing = _flight_listing(update["flights"], FLIGHT_SHORTLIST_SIZE)
+        if listing:
+            lines.append(listing)
+    update["messages"] = [
+        ToolMessage("\n".join(lines), tool_call_id=tool_call_id, artifact=message.artifact)
+    ]
+    return Command(update=update)
+
+
+def _find_flights(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    origin_location: Optional[str] = None,
+    destination_location: Optional[str] = None,
+    departure_date: Optional[str] = None,
+    return_date: Optional[str] = None,
+    travelers: Optional[int] = None,
+    children: Optional[int] = None,
+    departure_hours: Optional[str] = None,
+    flexible_fare: Optional[bool] = None,
+):
+    """Set the flight parameters AND search in one call, returning the ranked best options. Use this for a new flight search once origin, destination and departure date are known. Dates in YYYY-MM-DD format; locations can be cities, airports or IATA codes, several comma-separated. Optional ranking preferences: departure_hours "HH-HH", flexible_fare. Omitted parameters keep their current values."""
+    details, confirmation_parts, error = _flight_details_update(
+        state, origin_location, destination_location, departure_date, return_date,
+        travelers, children, departure_hours, flexible_fare,
+    )
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+    result = _search_flights(tool_call_id, {**state, **details})
+    return _fused_flights_command(details, confirmation_parts, result, tool_call_id)
+
 
-                    summary += f"Return: {origin_code_ret} {dep_time_ret} -> {dest_code_ret} {arr_time_ret} ({duration_ret} min"
-                    if stops_ret != "N/A" and stops_ret > 0:
-                        summary += f", {stops_ret} stop(s)"
-                    summary += ")."
-            except (AttributeError, IndexError, TypeError) as e:
-                print(f"Error summarizing leg data for flight {i+1}: {e}")
-                summary += "[Error summarizing leg details]. "
-
-        # Linkovi
-        link_found = False
-        if flight.url:
-            summary += f" Link: {flight.url}"
-            link_found = True
-        elif flight.pricingOptions:
-            try:
-                first_option = flight.pricingOptions[0]
-                if first_option.items:
-                    first_item = first_option.items[0]
-                    if first_item.url:
-                        summary += f" Link: {first_item.url}"
-                        link_found = True
-            except (AttributeError, IndexError, TypeError) as e:
-                print(f"Error accessing pricing option URL for flight {i+1}: {e}")
-
-        if not link_found:
-            summary += " (No direct link found)"
-
-        flight_summaries.append(summary.strip())  # Ukloni eventualni razmak na kraju
-
-    return (
-        "\n".join(flight_summaries)
-        if flight_summaries
-        else "No flight details could be summarized."
+async def _afind_flights(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+    origin_location: Optional[str] = None,
+    destination_location: Optional[str] = None,
+    departure_date: Optional[str] = None,
+    return_date: Optional[str] = None,
+    travelers: Optional[int] = None,
+    children: Optional[int] = None,
+    departure_hours: Optional[str] = None,
+    flexible_fare: Optional[bool] = None,
+):
+    """Async variant of _find_flights; locations are resolved in a worker thread."""
+    details, confirmation_parts, error = await asyncio.to_thread(
+        _flight_details_update,
+        state, origin_location, destination_location, departure_date, return_date,
+        travelers, children, departure_hours, flexible_fare,
     )
+    if error:
+        return _flight_tool_message(error, tool_call_id)
+    result = await _asearch_flights(tool_call_id, {**state, **details})
+    return _fused_flights_command(details, confirmation_parts, result, tool_call_id)
+
+
+find_flights = StructuredTool.from_function(
+    func=_find_flights,
+    coroutine=_afind_flights,
+    name="find_flights",
+    description=_find_flights.__doc__,
+)
@@ -1,6 +1,8 @@
 from typing import Any, Callable, List
 
 from agent.tools.booking_tools import (
+    filter_hotels,
+    find_hotels,
     retrieve_desired_language,
     return_hotels,
     search_hotels_with_apify,
@@ -8,19 +10,33 @@ from agent.tools.booking_tools import (
     set_desired_language,
 )
 from agent.tools.flight_tools import (
+    find_flights,
     return_flights,
     search_flights_with_apify,
+    select_flight,
     set_flight_details,
 )
+from agent.tools.flex_flight_tools import search_flexible_dates_with_apify
+from agent.tools.trip_tools import search_trip_with_apify
+from agent.utils.metrics import instrument_tools
 
 
-AGENT_TOOLS: List[Callable[..., Any]] = [
-    search_hotels_with_apify,
-    set_booking_details,
-    set_desired_language,
-    retrieve_desired_language,
-    return_hotels,
-    set_flight_details,
-    search_flights_with_apify,
-    return_flights,
-]
+# Svaki alat se mjeri (kolumbo_tool_duration_seconds) preko LangChain callbacka
+AGENT_TOOLS: List[Callable[..., Any]] = instrument_tools(
+    [
+        find_flights,
+        find_hotels,
+        search_hotels_with_apify,
+        set_booking_details,
+        set_desired_language,
+        retrieve_desired_language,
+        return_hotels,
+        filter_hotels,
+        set_flight_details,
+        search_flights_with_apify,
+        return_flights,
+        select_flight,
+        search_trip_with_apify,
+        search_flexible_dates_with_apify,
+    ]
+)
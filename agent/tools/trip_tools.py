@@ -0,0 +1,133 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Sequence
+from typing_extensions import Annotated
+from langgraph.prebuilt import InjectedState
+from langchain_core.tools.base import InjectedToolCallId
+from langchain_core.tools import StructuredTool
+from langgraph.types import Command
+from langchain_core.messages import ToolMessage
+
+from agent.tools.booking_tools import _asearch_hotels, _search_hotels
+from agent.tools.flight_tools import _asearch_flights, _search_flights
+from agent.utils.render import merge_render_artifacts
+
+_SEARCH_LABELS = ("Flights", "Hotels")
+
+
+def _trip_state(state: dict) -> dict:
+    """Fill hotel dates from the flight dates when only the latter were given."""
+    travel_dates = state.get("travel_dates") or {}
+    if travel_dates.get("check_in") and travel_dates.get("check_out"):
+        return state
+    if state.get("departure_date") and state.get("return_date"):
+        return {
+            **state,
+            "travel_dates": {
+                "check_in": state["departure_date"],
+                "check_out": state["return_date"],
+            },
+        }
+    return state
+
+
+def _missing_trip_fields(state: dict) -> List[str]:
+    travel_dates = state.get("travel_dates") or {}
+    required = {
+        "origin": state.get("origin_location"),
+        "destination": state.get("destination_location"),
+        "departure date": state.get("departure_date"),
+        "hotel check-in date": travel_dates.get("check_in"),
+        "hotel check-out date": travel_dates.get("check_out"),
+    }
+    return [name for name, value in required.items() if not value]
+
+
+def _merge_search_commands(
+    results: Sequence[Any], state: dict, tool_call_id: str
+) -> Command:
+    """Merge the flight and hotel Commands into one update with a single ToolMessage."""
+    update = {}
+    if state.get("travel_dates"):
+        update["travel_dates"] = state["travel_dates"]
+    contents = []
+    artifacts = []
+    for label, result in zip(_SEARCH_LABELS, results):
+        if isinstance(result, BaseException):
+            contents.append(f"{label}: search failed: {result}")
+            artifacts.append(None)
+            continue
+        for key, value in result.update.items():
+            if key == "messages":
+                contents.extend(f"{label}: {message.content}" for message in value)
+                artifacts.extend(message.artifact for message in value)
+            else:
+                update[key] = value
+    # Kartice samo kad su obje pretrage uspjele; inače model mora objasniti što nije uspjelo
+    rendered = all(isinstance(a, dict) and a.get("render") for a in artifacts)
+    update["messages"] = [
+        ToolMessage(
+            "\n".join(contents),
+            tool_call_id=tool_call_id,
+            artifact=merge_render_artifacts(artifacts) if rendered else None,
+        )
+    ]
+    return Command(update=update)
+
+
+def _missing_fields_command(missing: List[str], tool_call_id: str) -> Command:
+    return Command(
+        update={
+            "messages": [
+                ToolMessage(
+                    "Cannot search the trip yet, missing: " + ", ".join(missing) + ".",
+                    tool_call_id=tool_call_id,
+                )
+            ]
+        }
+    )
+
+
+def _search_trip(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+):
+    """Search flights and hotels for the whole trip at the same time. Use when origin, destination, travel dates and travelers are known."""
+    state = _trip_state(state)
+    missing = _missing_trip_fields(state)
+    if missing:
+        return _missing_fields_command(missing, tool_call_id)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(_search_flights, tool_call_id, state),
+            executor.submit(_search_hotels, tool_call_id, state),
+        ]
+    results = [f.exception() or f.result() for f in futures]
+    return _merge_search_commands(results, state, tool_call_id)
+
+
+async def _asearch_trip(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    state: Annotated[dict, InjectedState],
+):
+    """Async variant of _search_trip; both actor runs are awaited concurrently."""
+    state = _trip_state(state)
+    missing = _missing_trip_fields(state)
+    if missing:
+        return _missing_fields_command(missing, tool_call_id)
+
+    results = await asyncio.gather(
+        _asearch_flights(tool_call_id, state),
+        _asearch_hotels(tool_call_id, state),
+        return_exceptions=True,
+    )
+    return _merge_search_commands(results, state, tool_call_id)
+
+
+search_trip_with_apify = StructuredTool.from_function(
+    func=_search_trip,
+    coroutine=_asearch_trip,
+    name="search_trip_with_apify",
+    description=_search_trip.__doc__,
+)
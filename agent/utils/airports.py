@@ -0,0 +1,345 @@
+"""Offline airport/city resolver for flight search locations.
+
+Backed by the bundled IATA table in agent/data (airportsdata, MIT). Every
+searchable name (code, city, airport name and its words) is normalized and
+kept in one sorted list with a parallel array of row numbers, so exact and
+prefix lookups are a binary search and nothing is fetched over the network.
+
+The table has no traffic data, so airports that share a city name are ranked
+with agent/data/major_airports.tsv (large passenger airports), "International"
+in the name, and keywords that mark airfields without scheduled service.
+Closed airports are left out.
+"""
+
+import bisect
+import difflib
+import pathlib
+import threading
+import unicodedata
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+DATA_DIR = pathlib.Path(__file__).parent.parent / "data"
+AIRPORTS_PATH = DATA_DIR / "airports.tsv"
+METRO_AREAS_PATH = DATA_DIR / "metro_areas.tsv"
+MAJOR_AIRPORTS_PATH = DATA_DIR / "major_airports.tsv"
+
+# Zatvoreni za putnike, ali još u datasetu (Tegel, Hellinikon, stari Atatürk)
+CLOSED_AIRPORTS = frozenset({"HEW", "ISL", "TXL"})
+# Airfields without scheduled passenger flights
+MINOR_KEYWORDS = (
+    "air base",
+    "air force base",
+    "airpark",
+    "airstrip",
+    "army airfield",
+    "heliport",
+    "military",
+    "naval air station",
+    "ranch",
+    "seaplane base",
+)
+
+# Hrvatski (i drugi česti) nazivi gradova koji se ne poklapaju s engleskim iz dataseta
+CITY_ALIASES = {
+    "atena": "athens",
+    "bec": "vienna",
+    "bol": "brac",  # Brač (BWK) je kod Bola; BOL je Ballykelly
+    "bruxelles": "brussels",
+    "firenca": "firenze",
+    "florence": "firenze",
+    "genoa": "genova",
+    "kopenhagen": "copenhagen",
+    "krk": "rijeka",  # Rijeka (RJK) je na Krku; KRK je Kraków
+    "lisabon": "lisbon",
+    "minhen": "munich",
+    "munchen": "munich",
+    "milano": "milan",
+    "napulj": "napoli",
+    "naples": "napoli",
+    "pariz": "paris",
+    "prag": "prague",
+    "rim": "rome",
+    "roma": "rome",
+    "solun": "thessaloniki",
+    "turin": "torino",
+    "varsava": "warsaw",
+    "venecija": "venezia",
+    "venedig": "venezia",
+    "venice": "venezia",
+    "wien": "vienna",
+}
+
+# Candidates listed when a location is ambiguous or unknown
+MAX_SUGGESTIONS = 5
+
+
+def normalize_name(text: str) -> str:
+    """Casefold and strip accents: "Beč " -> "bec"."""
+    decomposed = unicodedata.normalize("NFKD", text.strip().casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class Resolution(NamedTuple):
+    """Outcome of resolving one location; codes is empty when error is set."""
+
+    query: str
+    codes: Tuple[str, ...] = ()
+    label: str = ""  # e.g. "London (GB)"
+    error: Optional[str] = None
+
+
+class AirportIndex:
+    """Columnar airport table plus a sorted (name, row) prefix index."""
+
+    def __init__(
+        self,
+        airports_path=AIRPORTS_PATH,
+        metro_areas_path=METRO_AREAS_PATH,
+        major_airports_path=MAJOR_AIRPORTS_PATH,
+    ):
+        codes, names, cities, regions, countries = [], [], [], [], []
+        with open(airports_path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                code, name, city, region, country = line.rstrip("\n").split("\t")
+                if code in CLOSED_AIRPORTS:
+                    continue
+                codes.append(code)
+                names.append(name)
+                cities.append(city)
+                regions.append(region)
+                countries.append(country)
+        self.codes, self.names = tuple(codes), tuple(names)
+        self.cities, self.regions = tuple(cities), tuple(regions)
+        self.countries = tuple(countries)
+        self.row_by_code: Dict[str, int] = {code: i for i, code in enumerate(codes)}
+        with open(major_airports_path, encoding="utf-8") as f:
+            ordered_major = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        # Redoslijed u datasetu: najprometniji prvi (unutar regije)
+        self.major_rank: Dict[str, int] = {code: i for i, code in enumerate(ordered_major)}
+        major = set(ordered_major)
+        self.scores = array("b", (self._score(codes[i], names[i], major) for i in range(len(codes))))
+
+        # Metro area (LON, PAR, MIL...): code -> (city, country, airports)
+        self.metros: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {}
+        self.metro_by_city: Dict[str, str] = {}
+        with open(metro_areas_path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                code, city, country, airports = line.rstrip("\n").split("\t")
+                members = [a for a in airports.split(",") if a in self.row_by_code]
+                # Metro kod koji je i sam aerodrom (JNB) ponekad nije na popisu svojih aerodroma
+                if code in self.row_by_code and code not in members:
+                    members.append(code)
+                members.sort(key=self._rank_key)
+                self.metros[code] = (city, country, tuple(members))
+                self.metro_by_city.setdefault(normalize_name(city), code)
+
+        entries = set()
+        for i in range(len(codes)):
+            city, name = normalize_name(cities[i]), normalize_name(names[i])
+            entries.add((city, i))
+            entries.add((name, i))
+            for word in name.replace("/", " ").replace("-", " ").split():
+                if len(word) >= 4 and word not in ("airport", "international"):
+                    entries.add((word, i))
+        ordered = sorted(e for e in entries if e[0])
+        self._keys: List[str] = [key for key, _ in ordered]
+        self._rows = array("I", (row for _, row in ordered))
+        self._city_keys = sorted({normalize_name(c) for c in cities if c})
+
+    def _rank_key(self, code: str) -> Tuple[int, int]:
+        """Sort key, best airport first."""
+        row = self.row_by_code.get(code)
+        score = self.scores[row] if row is not None else -2
+        return -score, self.major_rank.get(code, len(self.major_rank))
+
+    @staticmethod
+    def _score(code: str, name: str, major: Set[str]) -> int:
+        """2 large airport, 1 international, 0 other, -1 no scheduled service."""
+        name = name.casefold()
+        if code in major:
+            return 2
+        if any(keyword in name for keyword in MINOR_KEYWORDS):
+            return -1
+        return 1 if "international" in name else 0
+
+    def exact(self, key: str) -> List[int]:
+        """Rows indexed under exactly ``key``."""
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key)
+        return list(self._rows[lo:hi])
+
+    def prefix(self, key: str, limit: int = 200) -> List[int]:
+        """Rows with any indexed name starting with ``key``."""
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_left(self._keys, key + "\uffff", lo)
+        return list(dict.fromkeys(self._rows[lo : min(hi, lo + limit)]))
+
+    def describe(self, row: int) -> str:
+        place = self.cities[row] or self.names[row]
+        # Manji aerodromi s regijom, da se vidi koji je to "York"
+        if self.scores[row] < 2 and self.regions[row] and self.regions[row] != place:
+            place = f"{place}, {self.regions[row]}"
+        return f"{place} ({self.codes[row]}, {self.countries[row]})"
+
+    def _from_rows(self, query: str, rows: List[int], expand_metro: bool = True) -> Resolution:
+        """Airports of the best-ranked place (city, region, country); a tie -> ambiguous."""
+        served = [r for r in rows if self.scores[r] >= 0]
+        if not served:
+            options = "; ".join(self.describe(r) for r in rows[:MAX_SUGGESTIONS])
+            return Resolution(
+                query,
+                error=f"'{query}' only matches airfields without scheduled flights ({options}). Ask the user for the nearest airport.",
+            )
+        places: Dict[Tuple[str, str, str], List[int]] = {}
+        for row in served:
+            place = (self.cities[row], self.regions[row], self.countries[row])
+            places.setdefault(place, []).append(row)
+        ranked = sorted(places.items(), key=lambda item: -max(self.scores[r] for r in item[1]))
+        best = max(self.scores[r] for r in ranked[0][1])
+        # Jedno mjesto, ili jedno s jasno većim aerodromom (Berlin BER, a ne Berlin, NH)
+        if len(ranked) == 1 or (best > 0 and best > max(self.scores[r] for r in ranked[1][1])):
+            (city, _, country), city_rows = ranked[0]
+            metro = self.metro_by_city.get(normalize_name(city))
+            if expand_metro and metro and self.metros[metro][1] == country:
+                return self._metro(query, metro)
+            if best > 0:
+                city_rows = [r for r in city_rows if self.scores[r] > 0]
+            codes = tuple(sorted((self.codes[r] for r in city_rows), key=self._rank_key))
+            if len(codes) == 1:
+                return Resolution(query, codes, self.describe(city_rows[0]))
+            return Resolution(query, codes, f"{city} ({country})")
+        ordered = [r for _, place_rows in ranked for r in place_rows]
+        options = "; ".join(self.describe(r) for r in ordered[:MAX_SUGGESTIONS])
+        return Resolution(
+            query,
+            error=f"'{query}' is ambiguous: {options}. Use the IATA code if the conversation makes it clear, otherwise ask the user.",
+        )
+
+    def _metro(self, query: str, metro: str) -> Resolution:
+        city, country, airports = self.metros[metro]
+        return Resolution(query, airports, f"{city} ({country})")
+
+    def _code(self, query: str, code: str) -> Optional[Resolution]:
+        """Airport or metro code, skipping airfields without scheduled flights."""
+        if len(code) != 3 or not code.isalpha():
+            return None
+        row = self.row_by_code.get(code)
+        if row is not None and self.scores[row] >= 0:
+            return Resolution(query, (code,), self.describe(row))
+        if code in self.metros:
+            return self._metro(query, code)
+        return None
+
+    def _by_name(self, query: str, key: str) -> Tuple[Optional[Resolution], List[int]]:
+        """City, metro or airport name lookup; (None, []) when no name matches."""
+        metro = self.metro_by_city.get(key)
+        if metro:
+            return self._metro(query, metro), []
+
+        rows = self.exact(key)
+        if rows:
+            # Grad s tim imenom ima prednost pred aerodromima čiji naziv sadrži tu riječ
+            city_rows = [r for r in rows if normalize_name(self.cities[r]) == key]
+            if city_rows:
+                return self._from_rows(query, city_rows), city_rows
+            city_rows = [r for r in rows if normalize_name(self.cities[r]).startswith(key)]
+            if city_rows:
+                return self._from_rows(query, city_rows), city_rows
+            # Naziv aerodroma ("Heathrow") znači baš taj aerodrom, ne cijeli grad
+            return self._from_rows(query, rows, expand_metro=False), rows
+
+        rows = self.prefix(key)
+        if rows:
+            return self._from_rows(query, rows), rows
+        return None, []
+
+    def resolve(self, query: str) -> Resolution:
+        """Turn a city, airport name or code into IATA airport codes.
+
+        Names are matched first: "Krk" or "Rim" is a place, not Kraków (KRK)
+        or Rodríguez de Mendoza (RIM). Three letters count as a code when typed in
+        uppercase or when no name matches; otherwise both readings are
+        returned as an ambiguity for the user to settle.
+        """
+        key = normalize_name(query)
+        if not key:
+            return Resolution(query, error="Empty location.")
+        by_code = self._code(query, key.upper())
+        if by_code is not None and query.strip().isupper():
+            return by_code
+        alias = CITY_ALIASES.get(key)
+
+        by_name, rows = self._by_name(query, alias or key)
+        # Poznati naziv ("Rim", "Krk") je mjesto, ne kod (RIM, KRK)
+        if by_code is None or (alias and by_name is not None):
+            return by_name or self._unknown(query, key)
+        if by_name is None or set(by_code.codes) & set(by_name.codes):
+            return by_code
+
+        if by_name.codes:
+            named = [by_name.label]
+        else:
+            ranked = sorted((r for r in rows if self.scores[r] >= 0), key=lambda r: self._rank_key(self.codes[r]))
+            named = [self.describe(r) for r in ranked[: MAX_SUGGESTIONS - 1]]
+        options = "; ".join([f"{by_code.label} by IATA code", *named])
+        return Resolution(
+            query,
+            error=f"'{query}' is ambiguous: {options}. Ask the user which one is meant (or whether there is a nearer airport).",
+        )
+
+    def _unknown(self, query: str, key: str) -> Resolution:
+        close = difflib.get_close_matches(key, self._city_keys, n=MAX_SUGGESTIONS, cutoff=0.75)
+        if close:
+            options = "; ".join(self.describe(self.exact(c)[0]) for c in close)
+            return Resolution(query, error=f"Unknown location '{query}'. Did you mean: {options}?")
+        return Resolution(query, error=f"Unknown location '{query}'.")
+
+    def city_name(self, location: str) -> str:
+        """City for an uppercase airport or metro code ("LHR" -> "London"); other input unchanged ("Rab")."""
+        code = location.strip()
+        if code in self.metros:
+            return self.metros[code][0]
+        row = self.row_by_code.get(code)
+        if row is not None and self.cities[row]:
+            return self.cities[row]
+        return location
+
+    def primary(self, codes: List[str]) -> str:
+        """Highest-ranked airport of several codes (the first one on a tie)."""
+        return min(codes, key=self._rank_key)
+
+
+_INDEX: Optional[AirportIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_airport_index() -> AirportIndex:
+    """Process-wide index, loaded on first use (~8k airports)."""
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = AirportIndex()
+    return _INDEX
+
+
+def load_airport_index_in_background() -> None:
+    """Build the index in a daemon thread so the first lookup doesn't stall the event loop."""
+    threading.Thread(target=get_airport_index, name="airport-index", daemon=True).start()
+
+
+def resolve_location(query: str) -> Resolution:
+    return get_airport_index().resolve(query)
+
+
+def city_name(location: str) -> str:
+    return get_airport_index().city_name(location)
+
+
+def primary_airport(codes: List[str]) -> str:
+    return get_airport_index().primary(codes)
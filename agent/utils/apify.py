@@ -0,0 +1,245 @@
+"""Process-wide Apify clients with a shared keep-alive connection pool."""
+
+import asyncio
+import atexit
+import threading
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set
+
+import httpx
+from apify_client import ApifyClient, ApifyClientAsync
+
+from agent.utils.config import (
+    APIFY_API_KEY,
+    APIFY_API_URL,
+    APIFY_DATASET_PAGE_SIZE,
+    APIFY_KEEPALIVE_EXPIRY,
+    APIFY_MAX_CONNECTIONS,
+    APIFY_MAX_KEEPALIVE_CONNECTIONS,
+)
+from agent.utils.log import get_logger
+from agent.utils.metrics import timed
+
+logger = get_logger(__name__)
+
+_lock = threading.Lock()
+_client: Optional[ApifyClient] = None
+# httpx async pools are bound to the event loop they were first used on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ApifyClientAsync]" = (
+    weakref.WeakKeyDictionary()
+)
+# aclose() tasks of replaced default clients, referenced until they finish
+_closing: Set[asyncio.Task] = set()
+# Aborts of runs whose caller was cancelled during start()
+_aborting: Set[asyncio.Task] = set()
+
+
+class ApifySearchError(Exception):
+    """An actor run finished without usable results; the message is shown to the agent."""
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=APIFY_MAX_CONNECTIONS,
+        max_keepalive_connections=APIFY_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=APIFY_KEEPALIVE_EXPIRY,
+    )
+
+
+def _close_async(client: httpx.AsyncClient) -> None:
+    """Close an httpx.AsyncClient from sync code, on the running loop if there is one."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(client.aclose())
+        return
+    task = loop.create_task(client.aclose())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def _pooled_sync_client() -> ApifyClient:
+    client = ApifyClient(APIFY_API_KEY, api_url=APIFY_API_URL)
+    http = client.http_client
+    default, unused = http.httpx_client, http.httpx_async_client
+    # apify-client does not expose httpx.Limits, so swap in a pooled client with the same headers
+    http.httpx_client = httpx.Client(
+        headers=default.headers,
+        follow_redirects=True,
+        timeout=default.timeout,
+        limits=_pool_limits(),
+    )
+    # apify-client pravi i sync i async httpx klijent; zatvori oba koja se ne koriste
+    default.close()
+    _close_async(unused)
+    return client
+
+
+def _pooled_async_client() -> ApifyClientAsync:
+    client = ApifyClientAsync(APIFY_API_KEY, api_url=APIFY_API_URL)
+    http = client.http_client
+    default, unused = http.httpx_async_client, http.httpx_client
+    http.httpx_async_client = httpx.AsyncClient(
+        headers=default.headers,
+        follow_redirects=True,
+        timeout=default.timeout,
+        limits=_pool_limits(),
+    )
+    _close_async(default)
+    unused.close()
+    return client
+
+
+def get_apify_client() -> ApifyClient:
+    """Return the shared sync Apify client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _pooled_sync_client()
+    return _client
+
+
+def get_apify_async_client() -> ApifyClientAsync:
+    """Return the shared async Apify client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                client = _pooled_async_client()
+                _async_clients[loop] = client
+    return client
+
+
+def run_actor(
+    client: ApifyClient, actor_id: str, run_input: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """actor.call() split into start and wait, so both are timed separately."""
+    with timed("actor_start", actor=actor_id):
+        run = client.actor(actor_id).start(run_input=run_input)
+    with timed("actor_wait", actor=actor_id):
+        return client.run(run["id"]).wait_for_finish()
+
+
+async def _abort_run(client: ApifyClientAsync, run_id: str) -> None:
+    try:
+        await client.run(run_id).abort()
+    except Exception as e:
+        logger.warning("Aborting actor run %s failed: %s", run_id, e)
+
+
+async def _abort_once_started(client: ApifyClientAsync, start: "asyncio.Future") -> None:
+    """The caller left while start() was in flight; abort the run as soon as it has an id."""
+    try:
+        run = await start
+    except Exception:
+        return  # Run nije ni kreiran
+    await _abort_run(client, run["id"])
+
+
+async def arun_actor(
+    client: ApifyClientAsync, actor_id: str, run_input: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Async variant of run_actor; a cancelled start or wait aborts the run on Apify."""
+    with timed("actor_start", actor=actor_id):
+        start = asyncio.ensure_future(client.actor(actor_id).start(run_input=run_input))
+        try:
+            # Shield: run se na Apifyju kreira i ako nas otkažu usred zahtjeva
+            run = await asyncio.shield(start)
+        except asyncio.CancelledError:
+            task = asyncio.ensure_future(_abort_once_started(client, start))
+            _aborting.add(task)
+            task.add_done_callback(_aborting.discard)
+            raise
+    try:
+        with timed("actor_wait", actor=actor_id):
+            return await client.run(run["id"]).wait_for_finish()
+    except asyncio.CancelledError:
+        # Nitko više ne čeka rezultat (npr. odbačen spekulativni run), ne plaćaj ga do kraja
+        await asyncio.shield(_abort_run(client, run["id"]))
+        raise
+
+
+def _is_empty_page(raw: bytes) -> bool:
+    return raw.strip() in (b"", b"[]")
+
+
+def iter_dataset_json_pages(
+    client: ApifyClient,
+    dataset_id: str,
+    fields: Optional[List[str]] = None,
+    unwind: Optional[List[str]] = None,
+    page_size: int = APIFY_DATASET_PAGE_SIZE,
+) -> Iterator[bytes]:
+    """Yield dataset pages as raw JSON array bytes; stop iterating to stop fetching.
+
+    ``fields`` and ``unwind`` are applied by the Apify API, so only the
+    projected records are transferred (compressed, via the pooled client).
+    """
+    dataset = client.dataset(dataset_id)
+    offset = 0
+    while True:
+        with timed("dataset_fetch"):
+            raw = dataset.get_items_as_bytes(
+                item_format="json",
+                offset=offset,
+                limit=page_size,
+                fields=fields,
+                unwind=unwind,
+            )
+        if _is_empty_page(raw):
+            return
+        yield raw
+        offset += page_size
+
+
+async def aiter_dataset_json_pages(
+    client: ApifyClientAsync,
+    dataset_id: str,
+    fields: Optional[List[str]] = None,
+    unwind: Optional[List[str]] = None,
+    page_size: int = APIFY_DATASET_PAGE_SIZE,
+) -> AsyncIterator[bytes]:
+    """Async variant of iter_dataset_json_pages."""
+    dataset = client.dataset(dataset_id)
+    offset = 0
+    while True:
+        with timed("dataset_fetch"):
+            raw = await dataset.get_items_as_bytes(
+                item_format="json",
+                offset=offset,
+                limit=page_size,
+                fields=fields,
+                unwind=unwind,
+            )
+        if _is_empty_page(raw):
+            return
+        yield raw
+        offset += page_size
+
+
+async def aclose_apify_client() -> None:
+    """Close the async client of the running loop (e.g. from a shutdown hook)."""
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.http_client.httpx_async_client.aclose()
+
+
+@atexit.register
+def close_apify_clients() -> None:
+    """Close every pooled connection; registered to run on interpreter exit."""
+    global _client
+    with _lock:
+        client, _client = _client, None
+        async_clients = list(_async_clients.items())
+        _async_clients.clear()
+
+    if client is not None:
+        client.http_client.httpx_client.close()
+    for loop, async_client in async_clients:
+        # A running or closed loop can't be driven from here; its sockets die with the process
+        if not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(async_client.http_client.httpx_async_client.aclose())
@@ -0,0 +1,324 @@
+"""Search result caching: in-process TTL + LRU in front of a shared SQLite store."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+import xxhash
+from cachetools import TLRUCache
+from pydantic import TypeAdapter
+
+from agent.models.flights import FlightData
+from agent.utils.config import (
+    FLIGHT_CACHE_STALE_TTL,
+    FLIGHT_CACHE_TTL,
+    HOTEL_CACHE_STALE_TTL,
+    HOTEL_CACHE_TTL,
+    SEARCH_CACHE_MAXSIZE,
+    SEARCH_CACHE_PATH,
+)
+from agent.utils.disk_cache import DiskSearchCache
+from agent.utils.log import get_logger
+from agent.utils.metrics import METRICS
+from agent.utils.singleflight import SingleFlight
+
+logger = get_logger(__name__)
+
+# run_input keys holding dates, in either the Skyscanner (YYMMDD) or Booking (YYYY-MM-DD) format
+_DATE_KEYS = {"datefrom", "dateto", "checkIn", "checkOut"}
+_DATE_FORMATS = ("%Y-%m-%d", "%y%m%d", "%Y%m%d", "%d.%m.%Y")
+_LOCALE_KEYS = {"locale", "language"}
+_CURRENCY_KEYS = {"currency"}
+
+
+def _normalize_date(value: str) -> str:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return value
+
+
+def normalize_run_input(run_input: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonicalize an actor run_input so equivalent searches compare equal."""
+    normalized = {}
+    for key, value in run_input.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if key in _DATE_KEYS:
+                value = _normalize_date(value)
+            elif key in _LOCALE_KEYS:
+                value = value.replace("_", "-").lower()
+            elif key in _CURRENCY_KEYS:
+                value = value.upper()
+        normalized[key] = value
+    return normalized
+
+
+def _expires_at(key: str, entry: Tuple[Any, float], now: float) -> float:
+    """TLRUCache time-to-use: entries are stored as (value, seconds left)."""
+    return now + entry[1]
+
+
+def make_cache_key(namespace: str, run_input: Dict[str, Any]) -> str:
+    """Stable key for a search: namespace plus a hash of the normalized run_input."""
+    payload = orjson.dumps(normalize_run_input(run_input), option=orjson.OPT_SORT_KEYS)
+    return f"{namespace}:{xxhash.xxh3_128_hexdigest(payload)}"
+
+
+class SearchCache:
+    """Thread-safe TTL cache with LRU eviction and hit/miss counters.
+
+    With a DiskSearchCache attached it also acts as a two-level cache: memory
+    misses fall through to disk, and disk entries past ``ttl`` but within
+    ``stale_ttl`` are served immediately while a background run refreshes them.
+    Concurrent misses for the same key share a single fetch.
+
+    A disk hit is kept in memory only for what is left of its ``ttl``, so
+    nothing is served as fresh for longer than ``ttl`` after it was fetched.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        maxsize: int = SEARCH_CACHE_MAXSIZE,
+        stale_ttl: Optional[float] = None,
+        disk: Optional[DiskSearchCache] = None,
+        adapter: Optional[TypeAdapter] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl or ttl, ttl)
+        self.disk = disk
+        self.adapter = adapter or TypeAdapter(Any)
+        self._cache: TLRUCache = TLRUCache(maxsize=maxsize, ttu=_expires_at, timer=timer)
+        self._lock = threading.Lock()
+        self._refreshing: Set[str] = set()
+        self._flight = SingleFlight(name)
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Memory lookup that leaves the hit/miss counters alone."""
+        with self._lock:
+            entry = self._cache.get(key)
+            return None if entry is None else entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Keep value in memory for ttl seconds (default: the full ``ttl``)."""
+        with self._lock:
+            self._cache[key] = (value, self.ttl if ttl is None else ttl)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    # --- Disk tier ---
+
+    def _disk_get(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (value, is_stale) from disk, or (None, False) on a miss."""
+        if self.disk is None:
+            return None, False
+        try:
+            entry = self.disk.get(key)
+            if entry is None:
+                return None, False
+            payload, age = entry
+            if age >= self.stale_ttl:
+                return None, False
+            # Entries were validated before they were written
+            value = self.adapter.validate_json(payload, context={"trusted": True})
+        except Exception as e:
+            logger.warning("%s disk cache read failed for %s: %s", self.name, key, e)
+            return None, False
+        is_stale = age >= self.ttl
+        with self._lock:
+            if is_stale:
+                self.stale_hits += 1
+            else:
+                self.disk_hits += 1
+                # Samo preostali TTL, inače bi unos bio "svjež" do 2×ttl
+                self._cache[key] = (value, self.ttl - age)
+        return value, is_stale
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a value in memory and on disk."""
+        self._store(key, value)
+
+    def _store(self, key: str, value: Any) -> None:
+        self.set(key, value)
+        if self.disk is None:
+            return
+        try:
+            self.disk.set(key, self.name, self.adapter.dump_json(value))
+            self.disk.purge(self.name, self.stale_ttl)
+        except Exception as e:
+            logger.warning("%s disk cache write failed for %s: %s", self.name, key, e)
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _fetch_and_store(self, key: str, fetch: Callable[[], Any]) -> Any:
+        value = fetch()
+        self._store(key, value)
+        return value
+
+    async def _afetch_and_store(
+        self, key: str, afetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = await afetch()
+        await asyncio.to_thread(self._store, key, value)
+        return value
+
+    def _refresh(self, key: str, fetch: Callable[[], Any]) -> None:
+        try:
+            self._flight.do(key, lambda: self._fetch_and_store(key, fetch))
+        except Exception as e:
+            logger.warning("Background refresh of %s failed: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _arefresh(self, key: str, afetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self._flight.ado(key, lambda: self._afetch_and_store(key, afetch))
+        except Exception as e:
+            logger.warning("Background refresh of %s failed: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    # --- Read-through lookups used by the tools ---
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """Return a stored value from memory or disk without ever fetching."""
+        value = self.get(key)
+        if value is None:
+            value, _ = self._disk_get(key)
+        return value
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Return a cached value or call ``fetch`` and cache its result.
+
+        Exceptions from ``fetch`` propagate and nothing is cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value, is_stale = self._disk_get(key)
+        if value is not None:
+            if is_stale and self._claim_refresh(key):
+                _REFRESH_EXECUTOR.submit(self._refresh, key, fetch)
+            return value
+
+        return self._flight.do(key, lambda: self._fetch_and_store(key, fetch))
+
+    async def aget_or_fetch(
+        self, key: str, afetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Async variant of get_or_fetch; disk I/O runs off the event loop."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        if self.disk is not None:
+            value, is_stale = await asyncio.to_thread(self._disk_get, key)
+            if value is not None:
+                if is_stale and self._claim_refresh(key):
+                    task = asyncio.create_task(self._arefresh(key, afetch))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return value
+
+        return await self._flight.ado(
+            key, lambda: self._afetch_and_store(key, afetch)
+        )
+
+    def in_flight(self, key: str) -> bool:
+        return self._flight.in_flight(key)
+
+    def stats(self) -> Dict[str, Any]:
+        flight_stats = self._flight.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "disk_hits": self.disk_hits,
+                "stale_hits": self.stale_hits,
+                "fetches": flight_stats["calls"] - flight_stats["coalesced"],
+                "coalesced": flight_stats["coalesced"],
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+            }
+
+
+_REFRESH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="search-cache-refresh"
+)
+
+_DISK_CACHE = DiskSearchCache(SEARCH_CACHE_PATH) if SEARCH_CACHE_PATH else None
+
+FLIGHT_SEARCH_CACHE = SearchCache(
+    "flights",
+    ttl=FLIGHT_CACHE_TTL,
+    stale_ttl=FLIGHT_CACHE_STALE_TTL,
+    disk=_DISK_CACHE,
+    adapter=TypeAdapter(List[FlightData]),
+)
+HOTEL_SEARCH_CACHE = SearchCache(
+    "hotels",
+    ttl=HOTEL_CACHE_TTL,
+    stale_ttl=HOTEL_CACHE_STALE_TTL,
+    disk=_DISK_CACHE,
+    adapter=TypeAdapter(List[Dict[str, Any]]),
+)
+
+
+def _cache_gauges():
+    """Search cache counters for the /metrics export."""
+    gauges = []
+    for cache in (FLIGHT_SEARCH_CACHE, HOTEL_SEARCH_CACHE):
+        stats = cache.stats()
+        for field in ("hits", "misses", "hit_rate", "disk_hits", "stale_hits", "fetches", "coalesced", "size"):
+            gauges.append((f"kolumbo_search_cache_{field}", {"cache": cache.name}, stats[field]))
+    return gauges
+
+
+METRICS.add_collector(_cache_gauges)
@@ -1,6 +1,7 @@
 """Agent configuration."""
 
 from __future__ import annotations
+import os
 from typing import Optional
 from typing_extensions import Annotated, Literal
 from dataclasses import dataclass, field, fields
@@ -13,6 +14,8 @@ ModelChoice = Literal[
     "google_genai/gemini-2.0-flash",
     "google_genai/gemini-2.0-flash-lite",
     "google_genai/gemini-2.5-pro-exp-03-25",
+    "anthropic/claude-3-7-sonnet-latest",
+    "anthropic/claude-3-5-haiku-latest",
     "openai/gpt-4o",
     "openai/gpt-4.1",
     "openai/gpt-4o-mini",
@@ -20,6 +23,63 @@ ModelChoice = Literal[
 ]
 
 
+# --- Apify settings (process-wide, read once from the environment) ---
+APIFY_API_KEY = os.getenv("APIFY_API_KEY")
+# Override to point the clients at a stand-in server (see benchmarks/load_harness.py)
+APIFY_API_URL = os.getenv("APIFY_API_URL") or None
+# Connection pool shared by every Apify call in this process
+APIFY_MAX_CONNECTIONS = int(os.getenv("APIFY_MAX_CONNECTIONS", "20"))
+APIFY_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("APIFY_MAX_KEEPALIVE_CONNECTIONS", "10")
+)
+APIFY_KEEPALIVE_EXPIRY = float(os.getenv("APIFY_KEEPALIVE_EXPIRY", "60"))
+# Dataset items fetched per request while streaming results
+APIFY_DATASET_PAGE_SIZE = int(os.getenv("APIFY_DATASET_PAGE_SIZE", "10"))
+# Flights requested per actor run (maxItems); reading stops once this many valid ones were parsed
+FLIGHT_RESULTS_LIMIT = int(os.getenv("FLIGHT_RESULTS_LIMIT", "30"))
+# Skip URL validation when parsing actor output we trust
+FLIGHT_TRUSTED_PARSING = os.getenv("FLIGHT_TRUSTED_PARSING", "false").lower() == "true"
+# Hotels fetched per Booking Scraper run; filters and sorting are then applied locally
+HOTEL_RESULTS_LIMIT = int(os.getenv("HOTEL_RESULTS_LIMIT", "30"))
+# Max actor runs in flight at once for fan-out searches (flexible dates, multi-route)
+FLIGHT_SEARCH_CONCURRENCY = int(os.getenv("FLIGHT_SEARCH_CONCURRENCY", "8"))
+# Start a search in the background as soon as set_*_details completes its parameters
+# (see agent/utils/speculative.py)
+SPECULATIVE_SEARCH = os.getenv("SPECULATIVE_SEARCH", "false").lower() == "true"
+
+# Serve Prometheus metrics on this port (0 = off)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# --- Model context (see agent/utils/context.py) ---
+# Tokens sent to the model per step (system prompt + summary + messages)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+# Cap on the running summary of folded turns
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "800"))
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "o200k_base")
+
+# --- Logging (see agent/utils/log.py) ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+# Records waiting for the writer thread; beyond this they are dropped, never blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Identical records (same logger, level, message template): first LOG_SAMPLE_BURST per
+# LOG_SAMPLE_WINDOW seconds are logged, after that every LOG_SAMPLE_EVERY-th
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "5"))
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+LOG_SAMPLE_WINDOW = float(os.getenv("LOG_SAMPLE_WINDOW", "60"))
+
+# --- Search result cache ---
+# Results younger than *_CACHE_TTL are fresh. Up to *_CACHE_STALE_TTL they are still
+# served from disk, but a background run refreshes them.
+FLIGHT_CACHE_TTL = float(os.getenv("FLIGHT_CACHE_TTL", "600"))  # seconds
+FLIGHT_CACHE_STALE_TTL = float(os.getenv("FLIGHT_CACHE_STALE_TTL", "3600"))
+HOTEL_CACHE_TTL = float(os.getenv("HOTEL_CACHE_TTL", "1800"))
+HOTEL_CACHE_STALE_TTL = float(os.getenv("HOTEL_CACHE_STALE_TTL", "21600"))
+SEARCH_CACHE_MAXSIZE = int(os.getenv("SEARCH_CACHE_MAXSIZE", "256"))  # entries per tool
+# Shared SQLite file for all workers; set to an empty string to keep the cache in memory only
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", ".cache/search_cache.sqlite3")
+
+
 @dataclass(kw_only=True)
 class Configuration:
     """Configuration for the Hotel Booking Agent."""
@@ -51,6 +111,14 @@ class Configuration:
         },
     )
 
+    render_results: bool = field(
+        default=True,
+        metadata={
+            "description": "Answer search results with template cards instead of another model call.",
+            "json_schema_extra": {"langgraph_nodes": ["render_results"]},
+        },
+    )
+
     @property
     def system_prompt(self) -> str:
         """Return the active system prompt text."""
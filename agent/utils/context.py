@@ -0,0 +1,264 @@
+"""Bound the context sent to the model on every agent step.
+
+``prepare_context(state, system_prompt)`` runs in front of each model call
+(agent/utils/prompt_cache.py then puts the system prompt in front):
+
+1. Listings that a later listing of the same kind superseded (an older
+   ``return_flights`` after a newer one, an older ``return_hotels`` /
+   ``filter_hotels`` result) shrink to a one-line reference. The ToolMessage
+   stays, so every tool call keeps its answer.
+2. If the result is still over CONTEXT_TOKEN_BUDGET (counted with tiktoken),
+   the oldest whole turns (a user message plus all that followed it) are
+   folded into a running summary kept in State (``context_summary``, up to
+   the message id in ``context_summary_until``). The current turn is never
+   folded.
+3. If the current turn alone is over budget, its older tool outputs are cut.
+
+Trip details already set through the tools are always repeated from State in
+a block that follows the static system prompt, so folding a turn never loses
+a search parameter. The summary is extractive
+(no extra model call), so compaction adds no latency.
+"""
+
+import functools
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from cachetools import LRUCache
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from agent.utils.config import (
+    CONTEXT_SUMMARY_MAX_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
+    TIKTOKEN_ENCODING,
+)
+from agent.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Tool -> kind of listing; only the newest listing of each kind is kept in full
+RESULT_TOOLS = {
+    "find_flights": "flights",
+    "find_hotels": "hotels",
+    "return_flights": "flights",
+    "search_flexible_dates_with_apify": "flights",
+    "return_hotels": "hotels",
+    "filter_hotels": "hotels",
+}
+_SUPERSEDED = {
+    "flights": "[Earlier flight results, superseded by a newer listing below. Call return_flights for the current options.]",
+    "hotels": "[Earlier hotel results, superseded by a newer listing below. Call return_hotels for the current options.]",
+}
+# State fields repeated to the model so folded turns don't lose search parameters
+TRIP_FIELDS = (
+    "origin_location",
+    "destination_location",
+    "departure_date",
+    "return_date",
+    "travel_dates",
+    "travelers",
+    "children",
+    "rooms",
+    "min_score",
+    "max_price",
+    "property_type",
+    "hotel_sort_by",
+    "departure_hours",
+    "flexible_fare",
+    "desired_language",
+)
+SUMMARY_SNIPPET_CHARS = 240
+TRUNCATED_TOOL_TOKENS = 200
+PER_MESSAGE_OVERHEAD = 4  # role/separator tokens, as in OpenAI's counting recipe
+
+_encoding: Any = None
+_encoding_lock = threading.Lock()
+# (message id, content length) -> tokens; messages are immutable once in state
+_token_cache: LRUCache = LRUCache(maxsize=20_000)
+
+
+def _get_encoding() -> Any:
+    """tiktoken encoding, or False when it cannot be loaded (e.g. offline)."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+                except Exception as e:  # tiktoken skida encoding pri prvom korištenju
+                    logger.warning("tiktoken encoding %s unavailable, estimating tokens: %s", TIKTOKEN_ENCODING, e)
+                    _encoding = False
+    return _encoding
+
+
+def count_text_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+@functools.lru_cache(maxsize=8)
+def _prompt_tokens(system_prompt: str) -> int:
+    """Tokens of a (static) system prompt, counted once."""
+    return count_text_tokens(system_prompt)
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        content += orjson.dumps([(c["name"], c["args"]) for c in tool_calls], default=str).decode()
+    return content
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    text = _message_text(message)
+    key = (message.id, len(text)) if message.id else None
+    if key is not None:
+        cached = _token_cache.get(key)
+        if cached is not None:
+            return cached
+    tokens = count_text_tokens(text) + PER_MESSAGE_OVERHEAD
+    if key is not None:
+        _token_cache[key] = tokens
+    return tokens
+
+
+def replace_superseded(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Shrink every listing that a newer listing of the same kind superseded."""
+    latest: Dict[str, int] = {}
+    for index, message in enumerate(messages):
+        if isinstance(message, ToolMessage) and message.name in RESULT_TOOLS:
+            latest[RESULT_TOOLS[message.name]] = index
+    result = list(messages)
+    for index, message in enumerate(messages):
+        if isinstance(message, ToolMessage) and message.name in RESULT_TOOLS:
+            kind = RESULT_TOOLS[message.name]
+            if index != latest[kind]:
+                result[index] = message.model_copy(update={"content": _SUPERSEDED[kind]})
+    return result
+
+
+def _turn_starts(messages: Sequence[BaseMessage]) -> List[int]:
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return starts
+
+
+def _snippet(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= SUMMARY_SNIPPET_CHARS else text[: SUMMARY_SNIPPET_CHARS - 1] + "…"
+
+
+def summarize_turn(messages: Sequence[BaseMessage]) -> str:
+    """One summary line per turn: what the user asked, tools used, the answer."""
+    user = next((m for m in messages if isinstance(m, HumanMessage)), None)
+    tools = []
+    answer = ""
+    for message in messages:
+        if isinstance(message, AIMessage):
+            tools.extend(call["name"] for call in message.tool_calls)
+            if not message.tool_calls and message.content:
+                answer = _message_text(message)
+    parts = []
+    if user is not None:
+        parts.append(f"User: {_snippet(_message_text(user))}")
+    if tools:
+        parts.append(f"tools: {', '.join(dict.fromkeys(tools))}")
+    if answer:
+        parts.append(f"Assistant: {_snippet(answer)}")
+    return "- " + " | ".join(parts)
+
+
+def _cap_summary(lines: List[str]) -> List[str]:
+    """Drop the oldest lines until the summary fits CONTEXT_SUMMARY_MAX_TOKENS."""
+    while len(lines) > 1 and count_text_tokens("\n".join(lines)) > CONTEXT_SUMMARY_MAX_TOKENS:
+        lines = lines[1:]
+    return lines
+
+
+def trip_details(state: dict) -> str:
+    values = [f"{field}={state[field]}" for field in TRIP_FIELDS if state.get(field) not in (None, "", {})]
+    return "; ".join(values)
+
+
+def context_block(state: dict, summary: Optional[str]) -> str:
+    """Text that follows the system prompt: current trip details and the running summary."""
+    blocks = []
+    details = trip_details(state)
+    if details:
+        blocks.append(f"## Current trip details (already set)\n{details}")
+    if summary:
+        blocks.append(f"## Earlier in this conversation (summarized)\n{summary}")
+    return "\n\n".join(blocks)
+
+
+def _truncate(message: BaseMessage) -> BaseMessage:
+    text = _message_text(message)
+    encoding = _get_encoding()
+    if encoding:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:TRUNCATED_TOOL_TOKENS])
+    else:
+        head = text[: TRUNCATED_TOOL_TOKENS * 4]
+    return message.model_copy(update={"content": head + " …[truncated]"})
+
+
+def prepare_context(
+    state: dict, system_prompt: str, budget: int = CONTEXT_TOKEN_BUDGET
+) -> Tuple[List[BaseMessage], str, Dict[str, Any]]:
+    """(messages for the model, context block for the system prompt, state update)."""
+    messages = list(state["messages"])
+    summary = state.get("context_summary") or ""
+    until = state.get("context_summary_until")
+    if until:
+        cut = next((i for i, m in enumerate(messages) if m.id == until), None)
+        if cut is not None:
+            messages = messages[cut + 1 :]
+
+    messages = replace_superseded(messages)
+    counts = [count_message_tokens(m) for m in messages]
+
+    def system_tokens() -> int:
+        return _prompt_tokens(system_prompt) + count_text_tokens(context_block(state, summary))
+
+    update: Dict[str, Any] = {}
+    total = system_tokens() + sum(counts)
+    if total > budget:
+        starts = _turn_starts(messages)
+        lines = summary.splitlines() if summary else []
+        folded = 0
+        # Najstariji cijeli turnovi idu u sažetak; trenutni turn ostaje
+        for start, end in zip(starts, starts[1:]):
+            if total <= budget:
+                break
+            lines.append(summarize_turn(messages[start:end]))
+            folded = end
+            total = sum(counts[folded:]) + _prompt_tokens(system_prompt) + count_text_tokens(
+                context_block(state, "\n".join(_cap_summary(lines)))
+            )
+        if folded:
+            summary = "\n".join(_cap_summary(lines))
+            update = {"context_summary": summary, "context_summary_until": messages[folded - 1].id}
+            messages, counts = messages[folded:], counts[folded:]
+            logger.info("Folded %d messages into the context summary", folded, extra={"tokens": total})
+
+        # Trenutni turn je i sam prevelik: skrati starije izlaze alata (zadnja poruka ostaje)
+        for index in sorted(range(len(messages) - 1), key=lambda i: -counts[i]):
+            if total <= budget:
+                break
+            if isinstance(messages[index], ToolMessage) and counts[index] > TRUNCATED_TOOL_TOKENS:
+                messages[index] = _truncate(messages[index])
+                new_count = count_message_tokens(messages[index])
+                total -= counts[index] - new_count
+                counts[index] = new_count
+
+    return messages, context_block(state, summary), update
@@ -0,0 +1,74 @@
+"""SQLite-backed, zstd-compressed store for search results shared between workers."""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+import zstandard
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    payload BLOB NOT NULL
+)
+"""
+
+
+class DiskSearchCache:
+    """Key/value store of compressed payloads with their creation time.
+
+    Every thread gets its own connection; WAL mode lets several server
+    processes read and write the same file concurrently.
+    """
+
+    def __init__(self, path: str, compression_level: int = 3):
+        self.path = path
+        self.compression_level = compression_level
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return (payload, age_in_seconds) or None if the key is unknown."""
+        row = (
+            self._connection()
+            .execute("SELECT payload, created_at FROM search_cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        payload, created_at = row
+        return zstandard.decompress(payload), time.time() - created_at
+
+    def set(self, key: str, namespace: str, payload: bytes) -> None:
+        compressed = zstandard.compress(payload, self.compression_level)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO search_cache (key, namespace, created_at, payload) "
+            "VALUES (?, ?, ?, ?)",
+            (key, namespace, time.time(), compressed),
+        )
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM search_cache WHERE key = ?", (key,))
+
+    def purge(self, namespace: str, max_age: float) -> int:
+        """Drop entries of a namespace older than max_age seconds."""
+        cursor = self._connection().execute(
+            "DELETE FROM search_cache WHERE namespace = ? AND created_at < ?",
+            (namespace, time.time() - max_age),
+        )
+        return cursor.rowcount
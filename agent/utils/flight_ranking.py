@@ -0,0 +1,191 @@
+"""Vectorized scoring and Pareto filtering of flight options.
+
+Flights are loaded once into NumPy columns; every scoring pass is then a few
+array operations, so ranking hundreds of options from multi-route or
+flexible-date searches costs far less than one LLM call.
+"""
+
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agent.models.flights import FlightSummary
+
+# Rows compared at once by pareto_mask (chunk x n boolean matrices)
+_PARETO_CHUNK = 256
+
+
+class FlightArrays(NamedTuple):
+    """Column view of a list of flights; missing values are NaN."""
+
+    price: np.ndarray
+    duration: np.ndarray  # total minutes over all legs
+    stops: np.ndarray  # total stops over all legs
+    departure_hour: np.ndarray  # outbound departure, e.g. 9.25 for 09:15
+    change_allowed: np.ndarray
+    cancellation_allowed: np.ndarray
+    self_transfer: np.ndarray
+
+
+@dataclass(frozen=True)
+class RankingPreferences:
+    """Weights of the ranking score (lower score = better flight)."""
+
+    price_weight: float = 0.5
+    duration_weight: float = 0.25
+    stops_weight: float = 0.15
+    self_transfer_weight: float = 0.1
+    # Used only when departure_hours is set, e.g. (6, 12) = depart between 06:00 and 12:00
+    departure_hours: Optional[Tuple[int, int]] = None
+    departure_weight: float = 0.3
+    # Used only when the user wants a changeable/refundable fare
+    flexible_fare: bool = False
+    fare_weight: float = 0.3
+
+
+def parse_departure_hours(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse "6-12" into (6, 12). Returns None for empty or invalid input."""
+    if not value:
+        return None
+    try:
+        start, end = (int(part.strip().split(":")[0]) for part in value.split("-", 1))
+    except ValueError:
+        return None
+    if not (0 <= start <= 24 and 0 <= end <= 24) or start == end:
+        return None
+    return start, end
+
+
+def preferences_from_state(state: dict) -> RankingPreferences:
+    """Ranking preferences the user gave through set_flight_details."""
+    return RankingPreferences(
+        departure_hours=parse_departure_hours(state.get("departure_hours")),
+        flexible_fare=bool(state.get("flexible_fare")),
+    )
+
+
+def _hour(timestamp: Optional[str]) -> float:
+    # "2025-07-07T09:15:00" -> 9.25
+    if not timestamp or len(timestamp) < 16:
+        return np.nan
+    try:
+        return int(timestamp[11:13]) + int(timestamp[14:16]) / 60
+    except ValueError:
+        return np.nan
+
+
+def _flag(value: Optional[bool]) -> float:
+    return np.nan if value is None else float(value)
+
+
+def flight_arrays(flights: Sequence[FlightSummary]) -> FlightArrays:
+    """Load flight summaries into NumPy columns (one pass over the list)."""
+    n = len(flights)
+    price = np.full(n, np.nan)
+    duration = np.full(n, np.nan)
+    stops = np.full(n, np.nan)
+    departure_hour = np.full(n, np.nan)
+    change_allowed = np.full(n, np.nan)
+    cancellation_allowed = np.full(n, np.nan)
+    self_transfer = np.full(n, np.nan)
+
+    for i, flight in enumerate(flights):
+        if flight.price is not None:
+            price[i] = flight.price
+        legs = flight.legs or ()
+        if legs:
+            durations = [leg.duration_minutes for leg in legs]
+            if None not in durations:
+                duration[i] = sum(durations)
+            leg_stops = [leg.stops for leg in legs]
+            if None not in leg_stops:
+                stops[i] = sum(leg_stops)
+            departure_hour[i] = _hour(legs[0].departure)
+        change_allowed[i] = _flag(flight.change_allowed)
+        cancellation_allowed[i] = _flag(flight.cancellation_allowed)
+        self_transfer[i] = _flag(flight.self_transfer)
+
+    return FlightArrays(
+        price,
+        duration,
+        stops,
+        departure_hour,
+        change_allowed,
+        cancellation_allowed,
+        self_transfer,
+    )
+
+
+def _normalized(column: np.ndarray) -> np.ndarray:
+    """Min-max scale to 0..1; missing values count as the worst (1)."""
+    if column.size == 0 or np.isnan(column).all():
+        return np.ones_like(column)
+    low, high = np.nanmin(column), np.nanmax(column)
+    span = high - low
+    scaled = (column - low) / span if span > 0 else np.zeros_like(column)
+    return np.where(np.isnan(scaled), 1.0, scaled)
+
+
+def _departure_penalty(hours: np.ndarray, window: Tuple[int, int]) -> np.ndarray:
+    """0 inside the window, growing to 1 at 12 hours outside it (wraps past midnight)."""
+    start, end = window
+    span = (end - start) % 24
+    offset = (hours - start) % 24  # hours after the window opens
+    outside = np.where(offset <= span, 0.0, np.minimum(offset - span, 24 - offset))
+    return np.where(np.isnan(hours), 0.5, np.minimum(outside / 12, 1.0))
+
+
+def score_flights(arrays: FlightArrays, prefs: RankingPreferences) -> np.ndarray:
+    """Weighted score per flight; lower is better."""
+    score = (
+        prefs.price_weight * _normalized(arrays.price)
+        + prefs.duration_weight * _normalized(arrays.duration)
+        + prefs.stops_weight * _normalized(arrays.stops)
+        + prefs.self_transfer_weight * np.nan_to_num(arrays.self_transfer, nan=0.0)
+    )
+    if prefs.departure_hours:
+        score += prefs.departure_weight * _departure_penalty(
+            arrays.departure_hour, prefs.departure_hours
+        )
+    if prefs.flexible_fare:
+        flexibility = (
+            np.nan_to_num(arrays.change_allowed, nan=0.0)
+            + np.nan_to_num(arrays.cancellation_allowed, nan=0.0)
+        ) / 2
+        score += prefs.fare_weight * (1.0 - flexibility)
+    return score
+
+
+def pareto_mask(arrays: FlightArrays) -> np.ndarray:
+    """True for flights no other flight beats on price, duration and stops at once."""
+    columns = [
+        np.where(np.isnan(column), np.inf, column)
+        for column in (arrays.price, arrays.duration, arrays.stops)
+    ]
+    n = len(columns[0])
+    dominated = np.zeros(n, dtype=bool)
+    for start in range(0, n, _PARETO_CHUNK):
+        stop = start + _PARETO_CHUNK
+        # [i, j]: flight j is no worse than flight i in every column / better in one
+        no_worse = np.ones((min(stop, n) - start, n), dtype=bool)
+        better = np.zeros_like(no_worse)
+        for column in columns:
+            mine, others = column[start:stop, None], column[None, :]
+            no_worse &= others <= mine
+            better |= others < mine
+        dominated[start:stop] = (no_worse & better).any(axis=1)
+    return ~dominated
+
+
+def rank_flights(
+    flights: Sequence[FlightSummary], prefs: Optional[RankingPreferences] = None
+) -> Tuple[List[int], np.ndarray]:
+    """Return (indices best-first, Pareto mask in that same order)."""
+    if not flights:
+        return [], np.zeros(0, dtype=bool)
+    arrays = flight_arrays(flights)
+    score = score_flights(arrays, prefs or RankingPreferences())
+    price = np.where(np.isnan(arrays.price), np.inf, arrays.price)
+    order = np.lexsort((price, score))  # by score, ties by price
+    return order.tolist(), pareto_mask(arrays)[order]
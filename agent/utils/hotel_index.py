@@ -0,0 +1,112 @@
+"""Sorted in-memory index over one hotel search result.
+
+A search fetches a wide result set once; follow-ups such as "only 8+ rated
+under €150, cheapest first" are answered here in microseconds instead of
+starting another Booking Scraper run.
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Literal, Optional, Sequence
+
+import numpy as np
+from cachetools import LRUCache
+
+HotelSortKey = Literal["rating", "price", "reviews"]
+
+# (hotels list, index) kept for recent hotels_ref keys (one per search result set)
+_INDEXES: LRUCache = LRUCache(maxsize=64)
+_INDEXES_LOCK = threading.Lock()
+
+# Prvi broj u stringu, sa separatorima tisućica/decimala ("1.234,50", "8,5")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def to_float(value: Any) -> Optional[float]:
+    """Parse the first number in a string from state ("8", "€150", "1,234.50", "8/10")."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value))
+    if match is None:
+        return None
+    token = match.group()
+    separators = [ch for ch in token if ch in ".,"]
+    if not separators:
+        return float(token)
+    decimal = separators[-1]
+    if len(set(separators)) == 1:
+        # Isti separator više puta, ili jednom ispred točno 3 znamenke ("1,234"), je separator tisućica
+        head, _, tail = token.rpartition(decimal)
+        if len(separators) > 1 or (len(tail) == 3 and head != "0"):
+            return float(token.replace(decimal, ""))
+    integer, _, fraction = token.rpartition(decimal)
+    return float(f"{integer.replace('.', '').replace(',', '')}.{fraction}")
+
+
+def _column(hotels: Sequence[dict], field: str) -> np.ndarray:
+    values = (to_float(hotel.get(field)) for hotel in hotels)
+    return np.fromiter(
+        (np.nan if v is None else v for v in values), dtype=float, count=len(hotels)
+    )
+
+
+class HotelIndex:
+    """Hotels of one search plus argsort orders on price, rating and review count."""
+
+    def __init__(self, hotels: Sequence[dict]):
+        self.hotels = list(hotels)
+        self.price = _column(self.hotels, "price")
+        self.rating = _column(self.hotels, "rating")
+        self.reviews = _column(self.hotels, "reviews")
+        # Hotels without a value sort last in every order
+        self._orders: Dict[str, np.ndarray] = {
+            "price": np.argsort(np.where(np.isnan(self.price), np.inf, self.price), kind="stable"),
+            "rating": np.argsort(np.where(np.isnan(self.rating), np.inf, -self.rating), kind="stable"),
+            "reviews": np.argsort(np.where(np.isnan(self.reviews), np.inf, -self.reviews), kind="stable"),
+        }
+        # Cijene sortirane uzlazno za binarno pretraživanje po max_price
+        self._sorted_prices = self.price[self._orders["price"]]
+
+    def __len__(self) -> int:
+        return len(self.hotels)
+
+    def query(
+        self,
+        min_score: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort_by: HotelSortKey = "rating",
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Hotels matching the filters, best first by sort_by (rating/reviews descending, price ascending)."""
+        keep = np.ones(len(self.hotels), dtype=bool)
+        if max_price is not None:
+            # Prefiks price indeksa; hoteli bez cijene (NaN, na kraju) ispadaju
+            cutoff = np.searchsorted(self._sorted_prices, max_price, side="right")
+            keep[:] = False
+            keep[self._orders["price"][:cutoff]] = True
+        if min_score is not None:
+            keep &= self.rating >= min_score
+        order = self._orders.get(sort_by, self._orders["rating"])
+        selected = order[keep[order]]
+        if limit is not None:
+            selected = selected[:limit]
+        return [self.hotels[i] for i in selected]
+
+
+def get_hotel_index(ref: str, hotels: Sequence[dict]) -> HotelIndex:
+    """Index for the result set stored under ``ref``, rebuilt when the cache holds a new list.
+
+    A refresh can keep the hotel count and change prices, so the index is tied
+    to the identity of the list it was built from, not to its length.
+    """
+    with _INDEXES_LOCK:
+        entry = _INDEXES.get(ref)
+    if entry is not None and entry[0] is hotels:
+        return entry[1]
+    index = HotelIndex(hotels)
+    with _INDEXES_LOCK:
+        # Lista ostaje referencirana, pa se njen id ne može ponovno dodijeliti
+        _INDEXES[ref] = (hotels, index)
+    return index
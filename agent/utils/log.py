@@ -0,0 +1,201 @@
+"""Structured, non-blocking logging for the agent package.
+
+Loggers come from ``get_logger(__name__)`` and live under the ``agent``
+logger. ``configure_logging()`` (called once when the graph is built) gives
+that logger a bounded QueueHandler: the request path only filters and enqueues
+the record, and a QueueListener thread formats it as one JSON (or text) line
+on stderr. When the queue is full, records are dropped and counted instead of
+blocking a turn.
+
+Expensive payloads go through ``lazy()`` or as ``extra`` fields. They are
+serialized only if the record passes the level check, and extras are
+serialized on the listener thread::
+
+    logger.debug("actor input", extra={"run_input": run_input})
+    logger.debug("actor run %s", lazy(lambda: json.dumps(run)))
+
+Records with the same logger, level and message template are sampled: the
+first LOG_SAMPLE_BURST in each LOG_SAMPLE_WINDOW pass, and after that only
+every LOG_SAMPLE_EVERY-th. The next record that passes carries the number
+suppressed so far in ``suppressed``.
+"""
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from agent.utils.config import (
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLE_BURST,
+    LOG_SAMPLE_EVERY,
+    LOG_SAMPLE_WINDOW,
+)
+from agent.utils.metrics import METRICS, PREFIX
+
+ROOT_LOGGER = "agent"
+LOG_DROPPED = f"{PREFIX}_log_records_dropped_total"
+LOG_SAMPLED = f"{PREFIX}_log_records_sampled_total"
+METRICS.describe(LOG_DROPPED, "counter", "Log records dropped because the log queue was full.")
+METRICS.describe(LOG_SAMPLED, "counter", "Repeated log records suppressed by sampling.")
+
+# Atributi svakog LogRecorda; sve ostalo je došlo kroz extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_EXC_FORMATTER = logging.Formatter()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for an agent module (``agent.*`` names are used as is)."""
+    if name != ROOT_LOGGER and not name.startswith(ROOT_LOGGER + "."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return logging.getLogger(name)
+
+
+class lazy:
+    """Defer building a log argument until the message is actually formatted."""
+
+    __slots__ = ("_fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self._fn = fn
+
+    def __str__(self) -> str:
+        return str(self._fn())
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    """Let a burst of identical records through per window, then every Nth."""
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, every: int = LOG_SAMPLE_EVERY, window: float = LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.every = max(every, 1)
+        self.window = window
+        self._lock = threading.Lock()
+        # key -> [window start, seen in window, suppressed since last emitted]
+        self._seen: Dict[Tuple[str, int, Any], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                suppressed = entry[2] if entry else 0
+                entry = self._seen[key] = [now, 0, suppressed]
+                if len(self._seen) > 10_000:  # ne raste bez granica s dinamičkim porukama
+                    self._seen = {key: entry}
+            entry[1] += 1
+            if entry[1] > self.burst and (entry[1] - self.burst) % self.every:
+                entry[2] += 1
+                METRICS.inc(LOG_SAMPLED, logger=record.name)
+                return False
+            if entry[2]:
+                record.suppressed = entry[2]
+                entry[2] = 0
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            METRICS.inc(LOG_DROPPED)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Poruka se spaja ovdje jer args mogu biti objekti koji se još mijenjaju;
+        # JSON extra polja serijalizira tek listener thread
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with extra fields appended as key=value."""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = " ".join(
+            f"{key}={orjson.dumps(value, default=str).decode()}"
+            for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRS and not key.startswith("_")
+        )
+        return f"{line} {extras}" if extras else line
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream: Any = None) -> None:
+    """Attach the queue handler to the ``agent`` logger (idempotent)."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        handler = _DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        handler.addFilter(SamplingFilter())
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(level.upper())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(handler.queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        logger = logging.getLogger(ROOT_LOGGER)
+        for handler in list(logger.handlers):
+            if isinstance(handler, _DroppingQueueHandler):
+                logger.removeHandler(handler)
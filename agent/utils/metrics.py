@@ -0,0 +1,263 @@
+"""Stage timings, token counts and cache stats with a Prometheus text export.
+
+Every stage of a turn (LLM call, actor start, actor wait, dataset fetch,
+parse, rank, format, each tool) is timed with ``timed(stage)``. Durations go
+into in-process histograms rendered by ``render_prometheus()`` (served on
+METRICS_PORT when set). If opentelemetry is installed, each stage is also an
+OpenTelemetry span, so a trace shows which stage of a slow turn used the time.
+
+``stage_breakdown()`` collects the stages of one unit of work (e.g. a turn)
+through a context variable, which follows asyncio tasks and LangChain's
+executor threads.
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+try:  # Opcionalno: spanovi idu u OpenTelemetry ako je instaliran i konfiguriran
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # pragma: no cover - ovisi o okruženju
+    _otel_trace = None
+
+PREFIX = "kolumbo"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_tracer = _otel_trace.get_tracer("kolumbo.agent") if _otel_trace else None
+_breakdown: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "stage_breakdown", default=None
+)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)  # last = +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters keyed by (metric name, labels)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, Dict[str, str], float]]]] = []
+        self._help: Dict[str, Tuple[str, str]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, Dict[str, str], float]]]) -> None:
+        """Register a callable returning (name, labels, value) gauges at export time."""
+        self._collectors.append(collector)
+
+    def histogram_summary(self, name: str) -> Dict[Labels, Tuple[int, float]]:
+        """(count, total seconds) per label set, e.g. for a benchmark report."""
+        with self._lock:
+            return {
+                labels: (h.count, h.total)
+                for (metric, labels), h in self._histograms.items()
+                if metric == name
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        seen = set()
+
+        def header(name: str, default_kind: str) -> None:
+            if name in seen:
+                return
+            seen.add(name)
+            kind, help_text = self._help.get(name, (default_kind, name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        for (name, labels), h in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), h.counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {h.total}")
+            lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                header(name, "gauge")
+                lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+METRICS = MetricsRegistry()
+STAGE_SECONDS = f"{PREFIX}_stage_duration_seconds"
+TOOL_SECONDS = f"{PREFIX}_tool_duration_seconds"
+TOOL_ERRORS = f"{PREFIX}_tool_errors_total"
+LLM_TOKENS = f"{PREFIX}_llm_tokens_total"
+METRICS.describe(STAGE_SECONDS, "histogram", "Duration of one stage of a turn (llm, actor_start, actor_wait, dataset_fetch, parse, rank, format).")
+METRICS.describe(TOOL_SECONDS, "histogram", "Duration of one tool call as run by the ToolNode.")
+METRICS.describe(TOOL_ERRORS, "counter", "Tool calls that raised.")
+METRICS.describe(LLM_TOKENS, "counter", "Tokens reported by the model provider.")
+
+
+@contextlib.contextmanager
+def timed(stage: str, **labels: str) -> Iterator[None]:
+    """Time a block as ``stage``; also an OpenTelemetry span when available."""
+    span = _tracer.start_as_current_span(stage, attributes=labels) if _tracer else contextlib.nullcontext()
+    started = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            METRICS.observe(STAGE_SECONDS, elapsed, stage=stage, **labels)
+            breakdown = _breakdown.get()
+            if breakdown is not None:
+                breakdown[stage] = breakdown.get(stage, 0.0) + elapsed
+
+
+@contextlib.contextmanager
+def stage_breakdown() -> Iterator[Dict[str, float]]:
+    """Collect stage -> total seconds for everything timed inside the block."""
+    stages: Dict[str, float] = {}
+    token = _breakdown.set(stages)
+    try:
+        yield stages
+    finally:
+        _breakdown.reset(token)
+
+
+def record_token_usage(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """Count input/output tokens (and cache reads/writes if reported) of one LLM call."""
+    if not usage:
+        return
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            METRICS.inc(LLM_TOKENS, usage[kind], model=model, kind=kind.removesuffix("_tokens"))
+    for kind, value in (usage.get("input_token_details") or {}).items():
+        if value:
+            METRICS.inc(LLM_TOKENS, value, model=model, kind=f"input_{kind}")
+
+
+class ToolMetricsCallback(BaseCallbackHandler):
+    """Times every tool run; attached to the agent tools as a LangChain callback."""
+
+    def __init__(self) -> None:
+        self._started: Dict[UUID, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._started[run_id] = ((serialized or {}).get("name", "unknown"), time.perf_counter())
+
+    def _finish(self, run_id: UUID, error: bool) -> None:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        name, t0 = started
+        elapsed = time.perf_counter() - t0
+        METRICS.observe(TOOL_SECONDS, elapsed, tool=name)
+        breakdown = _breakdown.get()
+        if breakdown is not None:
+            breakdown[f"tool:{name}"] = breakdown.get(f"tool:{name}", 0.0) + elapsed
+        if error:
+            METRICS.inc(TOOL_ERRORS, tool=name)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error=False)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error=True)
+
+
+TOOL_METRICS_CALLBACK = ToolMetricsCallback()
+
+
+def instrument_tools(tools: List[Any]) -> List[Any]:
+    """Attach TOOL_METRICS_CALLBACK to every tool (BaseTool.callbacks)."""
+    for tool in tools:
+        callbacks = list(tool.callbacks or [])
+        if TOOL_METRICS_CALLBACK not in callbacks:
+            tool.callbacks = [*callbacks, TOOL_METRICS_CALLBACK]
+    return tools
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = METRICS.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread (once per process)."""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
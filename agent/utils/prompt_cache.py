@@ -0,0 +1,81 @@
+"""Order and mark the model input so provider prompt caches are hit.
+
+Every agent step sends the same tool schemas and system prompt, followed by a
+conversation that only grows. Each provider caches a different part of that
+prefix:
+
+- Anthropic caches up to explicit ``cache_control`` breakpoints. One goes on
+  the static system prompt, which caches the tools and the system prompt. A
+  second goes on the last message, so the next step of the same conversation
+  reads the history from the cache.
+- OpenAI and Gemini 2.5 cache identical prompt prefixes automatically. The
+  prefix only has to stay byte-identical, so the per-conversation block
+  (trip details, summary) goes after the static prompt.
+
+Cache reads and writes show up in ``usage_metadata["input_token_details"]``;
+metrics.record_token_usage counts them (kind="input_cache_read" /
+"input_cache_creation") and ``log_cache_usage`` logs them per call.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+from agent.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def provider_of(fully_specified_name: str) -> str:
+    return fully_specified_name.split("/", maxsplit=1)[0]
+
+
+def system_message(provider: str, static_prompt: str, dynamic_block: str) -> Dict[str, Any]:
+    """System message with the static prompt first, marked cacheable where needed."""
+    if provider == "anthropic":
+        content: List[Dict[str, Any]] = [
+            {"type": "text", "text": static_prompt, "cache_control": EPHEMERAL}
+        ]
+        if dynamic_block:
+            content.append({"type": "text", "text": dynamic_block})
+        return {"role": "system", "content": content}
+    text = f"{static_prompt}\n\n{dynamic_block}" if dynamic_block else static_prompt
+    return {"role": "system", "content": text}
+
+
+def _mark_last(messages: List[Any]) -> List[Any]:
+    """Put an Anthropic cache breakpoint on the newest user/tool message."""
+    if not messages:
+        return messages
+    last = messages[-1]
+    if isinstance(last, (HumanMessage, ToolMessage)) and isinstance(last.content, str) and last.content:
+        block = {"type": "text", "text": last.content, "cache_control": EPHEMERAL}
+        messages = [*messages[:-1], last.model_copy(update={"content": [block]})]
+    return messages
+
+
+def model_input(
+    fully_specified_name: str,
+    static_prompt: str,
+    dynamic_block: str,
+    messages: Sequence[BaseMessage],
+) -> List[Any]:
+    """Full model input: cacheable system prefix, then the conversation."""
+    provider = provider_of(fully_specified_name)
+    messages = list(messages)
+    if provider == "anthropic":
+        messages = _mark_last(messages)
+    return [system_message(provider, static_prompt, dynamic_block), *messages]
+
+
+def log_cache_usage(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """Log the prompt cache read / write tokens of one call (DEBUG)."""
+    details = (usage or {}).get("input_token_details") or {}
+    read = details.get("cache_read") or 0
+    write = details.get("cache_creation") or 0
+    logger.debug(
+        "LLM call prompt cache",
+        extra={"model": model, "input_tokens": (usage or {}).get("input_tokens"), "cache_read": read, "cache_write": write},
+    )
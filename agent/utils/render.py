@@ -0,0 +1,296 @@
+"""Render flight and hotel results as cards straight from State.
+
+The search and listing tools mark their ToolMessage with
+``artifact={"render": [...]}``. When every result of a tool step carries
+one, the graph sends the step to the ``render_results`` node instead of back
+to the model, and that node answers with ``render_reply`` cards (the layout SYSTEM_PROMPT_AGENT asks for). Labels follow
+``desired_language``; unknown languages fall back to English.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from agent.models.flights import FlightSummary, LegSummary
+from agent.utils.flight_ranking import flight_arrays, pareto_mask
+
+LABELS: Dict[str, Dict[str, str]] = {
+    "en": {
+        "flights_intro": "Here are the best flight options, ranked best first:",
+        "hotels_intro": "Here are the top hotel options:",
+        "option": "Option",
+        "outbound": "Outbound",
+        "return": "Return",
+        "direct": "direct",
+        "stop": "stop",
+        "stops": "stops",
+        "best": "best trade-off",
+        "view_deal": "View Deal",
+        "book_now": "Book Now",
+        "map": "Map",
+        "no_link": "no direct link",
+        "more": "{n} more options ranked lower.",
+        "no_flights": "No flights were found for this search.",
+        "no_hotels": "No hotels match the current filters.",
+        "follow_up": "Would you like to book one of these, or should I refine the search?",
+    },
+    "hr": {
+        "flights_intro": "Evo najboljih letova, poredanih od najboljeg:",
+        "hotels_intro": "Evo najboljih hotela:",
+        "option": "Opcija",
+        "outbound": "Polazak",
+        "return": "Povratak",
+        "direct": "direktan",
+        "stop": "presjedanje",
+        "stops": "presjedanja",
+        "best": "najbolji omjer",
+        "view_deal": "Pogledaj ponudu",
+        "book_now": "Rezerviraj",
+        "map": "Karta",
+        "no_link": "nema izravnog linka",
+        "more": "Još {n} opcija je niže rangirano.",
+        "no_flights": "Za ovu pretragu nije pronađen nijedan let.",
+        "no_hotels": "Nijedan hotel ne odgovara trenutnim filterima.",
+        "follow_up": "Želite li rezervirati neku od ovih opcija ili da suzim pretragu?",
+    },
+    "de": {
+        "flights_intro": "Hier sind die besten Flüge, das beste zuerst:",
+        "hotels_intro": "Hier sind die besten Hotels:",
+        "option": "Option",
+        "outbound": "Hinflug",
+        "return": "Rückflug",
+        "direct": "direkt",
+        "stop": "Stopp",
+        "stops": "Stopps",
+        "best": "bester Kompromiss",
+        "view_deal": "Zum Angebot",
+        "book_now": "Jetzt buchen",
+        "map": "Karte",
+        "no_link": "kein direkter Link",
+        "more": "{n} weitere Optionen sind niedriger eingestuft.",
+        "no_flights": "Für diese Suche wurden keine Flüge gefunden.",
+        "no_hotels": "Keine Hotels entsprechen den aktuellen Filtern.",
+        "follow_up": "Möchten Sie eine davon buchen, oder soll ich die Suche verfeinern?",
+    },
+    "it": {
+        "flights_intro": "Ecco i voli migliori, in ordine di preferenza:",
+        "hotels_intro": "Ecco i migliori hotel:",
+        "option": "Opzione",
+        "outbound": "Andata",
+        "return": "Ritorno",
+        "direct": "diretto",
+        "stop": "scalo",
+        "stops": "scali",
+        "best": "miglior compromesso",
+        "view_deal": "Vedi offerta",
+        "book_now": "Prenota ora",
+        "map": "Mappa",
+        "no_link": "nessun link diretto",
+        "more": "Altre {n} opzioni sono classificate più in basso.",
+        "no_flights": "Nessun volo trovato per questa ricerca.",
+        "no_hotels": "Nessun hotel corrisponde ai filtri attuali.",
+        "follow_up": "Vuoi prenotarne uno o preferisci che affini la ricerca?",
+    },
+    "fr": {
+        "flights_intro": "Voici les meilleurs vols, du meilleur au moins bon :",
+        "hotels_intro": "Voici les meilleurs hôtels :",
+        "option": "Option",
+        "outbound": "Aller",
+        "return": "Retour",
+        "direct": "direct",
+        "stop": "escale",
+        "stops": "escales",
+        "best": "meilleur compromis",
+        "view_deal": "Voir l'offre",
+        "book_now": "Réserver",
+        "map": "Carte",
+        "no_link": "pas de lien direct",
+        "more": "{n} autres options sont moins bien classées.",
+        "no_flights": "Aucun vol trouvé pour cette recherche.",
+        "no_hotels": "Aucun hôtel ne correspond aux filtres actuels.",
+        "follow_up": "Souhaitez-vous en réserver un, ou dois-je affiner la recherche ?",
+    },
+    "es": {
+        "flights_intro": "Estos son los mejores vuelos, del mejor al peor:",
+        "hotels_intro": "Estos son los mejores hoteles:",
+        "option": "Opción",
+        "outbound": "Ida",
+        "return": "Vuelta",
+        "direct": "directo",
+        "stop": "escala",
+        "stops": "escalas",
+        "best": "mejor equilibrio",
+        "view_deal": "Ver oferta",
+        "book_now": "Reservar",
+        "map": "Mapa",
+        "no_link": "sin enlace directo",
+        "more": "Otras {n} opciones están peor clasificadas.",
+        "no_flights": "No se encontraron vuelos para esta búsqueda.",
+        "no_hotels": "Ningún hotel coincide con los filtros actuales.",
+        "follow_up": "¿Quieres reservar alguno o prefieres que afine la búsqueda?",
+    },
+}
+# Imena jezika koja korisnici (i model) ponekad proslijede umjesto koda
+_LANGUAGE_NAMES = {
+    "english": "en",
+    "croatian": "hr",
+    "hrvatski": "hr",
+    "german": "de",
+    "deutsch": "de",
+    "italian": "it",
+    "italiano": "it",
+    "french": "fr",
+    "français": "fr",
+    "spanish": "es",
+    "español": "es",
+}
+
+
+def render_artifact(*kinds: str, **options: Any) -> Dict[str, Any]:
+    """ToolMessage artifact asking for the given result kinds to be rendered."""
+    return {"render": list(kinds), **options}
+
+
+def merge_render_artifacts(artifacts: Sequence[Any]) -> Optional[Dict[str, Any]]:
+    """One artifact for a tool that merged several results (e.g. the trip search)."""
+    kinds: List[str] = []
+    options: Dict[str, Any] = {}
+    for artifact in artifacts:
+        if isinstance(artifact, dict) and artifact.get("render"):
+            kinds.extend(artifact["render"])
+            options.update({k: v for k, v in artifact.items() if k != "render"})
+    return render_artifact(*dict.fromkeys(kinds), **options) if kinds else None
+
+
+def pending_render(messages: Sequence[BaseMessage]) -> Optional[Dict[str, Any]]:
+    """Merged render artifact if every result of the last tool step asks to be rendered."""
+    results: List[ToolMessage] = []
+    for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            break
+        if isinstance(message, ToolMessage):
+            results.append(message)
+    if not results or not all(
+        isinstance(m.artifact, dict) and m.artifact.get("render") for m in results
+    ):
+        return None
+    return merge_render_artifacts([m.artifact for m in reversed(results)])
+
+
+def language_key(desired_language: Optional[str]) -> str:
+    """LABELS key for a desired_language such as "hr", "en-gb" or "German"."""
+    value = (desired_language or "").strip().lower()
+    value = _LANGUAGE_NAMES.get(value, value)
+    primary = value.replace("_", "-").split("-")[0]
+    return primary if primary in LABELS else "en"
+
+
+def _time(value: Optional[str]) -> str:
+    return value[:16].replace("T", " ") if value else "N/A"
+
+
+def _duration(minutes: Optional[int]) -> str:
+    if minutes is None:
+        return "N/A"
+    hours, mins = divmod(minutes, 60)
+    return f"{hours} h {mins:02d} min" if hours else f"{mins} min"
+
+
+def _stops(stops: Optional[int], labels: Dict[str, str]) -> str:
+    if not stops:
+        return labels["direct"]
+    return f"{stops} {labels['stop'] if stops == 1 else labels['stops']}"
+
+
+def _leg_line(icon: str, label: str, leg: LegSummary, labels: Dict[str, str]) -> str:
+    return (
+        f"{icon} {label}: {leg.origin or 'N/A'} {_time(leg.departure)} -> "
+        f"{leg.destination or 'N/A'} {_time(leg.arrival)} "
+        f"({_duration(leg.duration_minutes)}, {_stops(leg.stops, labels)})"
+    )
+
+
+def flight_card(number: int, flight: FlightSummary, best: bool, labels: Dict[str, str]) -> str:
+    title = f"✈️ {labels['option']} {number}: {flight.carrier or 'N/A'}"
+    if flight.price_formatted:
+        title += f" | 💰 {flight.price_formatted}"
+    if best:
+        title += f" | 🏅 {labels['best']}"
+    lines = [title]
+    if flight.legs:
+        lines.append(_leg_line("➡️", labels["outbound"], flight.legs[0], labels))
+    if len(flight.legs) > 1:
+        lines.append(_leg_line("⬅️", labels["return"], flight.legs[1], labels))
+    lines.append(f"🔗 [{labels['view_deal']}]({flight.link})" if flight.link else f"🔗 {labels['no_link']}")
+    return "\n".join(lines)
+
+
+def render_flights(flights: Sequence[Any], language: Optional[str], limit: int) -> str:
+    """Flight cards in State order (already ranked), best trade-offs marked."""
+    labels = LABELS[language_key(language)]
+    flights = [f for f in flights or () if isinstance(f, FlightSummary)]
+    if not flights:
+        return labels["no_flights"]
+    pareto = pareto_mask(flight_arrays(flights))
+    shown = max(limit, 1)
+    cards = [
+        flight_card(number, flight, bool(best), labels)
+        for number, (flight, best) in enumerate(zip(flights[:shown], pareto), start=1)
+    ]
+    text = labels["flights_intro"] + "\n\n###\n" + "\n###\n".join(cards) + "\n###"
+    if len(flights) > shown:
+        text += "\n" + labels["more"].format(n=len(flights) - shown)
+    return text
+
+
+def _location(location: Any, labels: Dict[str, str]) -> Optional[str]:
+    """Address text, or a map link when the scraper only gave coordinates."""
+    if not location:
+        return None
+    if not isinstance(location, dict):
+        return str(location)
+    if location.get("address"):
+        return str(location["address"])
+    if location.get("lat") is not None and location.get("lng") is not None:
+        return f"[{labels['map']}](https://www.google.com/maps?q={location['lat']},{location['lng']})"
+    return None
+
+
+def hotel_card(hotel: Dict[str, Any], labels: Dict[str, str]) -> str:
+    details = []
+    if hotel.get("rating") is not None:
+        details.append(f"⭐ {hotel['rating']}/10")
+    if hotel.get("price") is not None:
+        details.append(f"💰 {hotel['price']}")
+    location = _location(hotel.get("location"), labels)
+    if location:
+        details.append(f"📍 {location}")
+    lines = [f"🏨 {hotel.get('name') or 'N/A'}"]
+    if details:
+        lines.append(" | ".join(details))
+    url = hotel.get("booking_url")
+    lines.append(f"🔗 [{labels['book_now']}]({url})" if url else f"🔗 {labels['no_link']}")
+    return "\n".join(lines)
+
+
+def render_hotels(hotels: Sequence[Dict[str, Any]], language: Optional[str]) -> str:
+    """Hotel cards for the current shortlist."""
+    labels = LABELS[language_key(language)]
+    if not hotels:
+        return labels["no_hotels"]
+    cards = [hotel_card(hotel, labels) for hotel in hotels]
+    return labels["hotels_intro"] + "\n\n###\n" + "\n###\n".join(cards) + "\n###"
+
+
+def render_reply(state: dict, artifact: Dict[str, Any], flight_limit: int) -> str:
+    """The reply for one step: cards for each rendered kind, then the follow-up question."""
+    language = state.get("desired_language")
+    parts: List[str] = []
+    for kind in artifact["render"]:
+        if kind == "flights":
+            limit = artifact.get("limit") or flight_limit
+            parts.append(render_flights(state.get("flights") or [], language, limit))
+        elif kind == "hotels":
+            parts.append(render_hotels(state.get("hotels") or [], language))
+    parts.append(LABELS[language_key(language)]["follow_up"])
+    return "\n\n".join(parts)
@@ -0,0 +1,128 @@
+"""Coalesce identical in-flight calls so only one actor run happens per key."""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def _consume(waiter: asyncio.Future) -> None:
+    """Mark the result of a waiter nobody awaits any more as retrieved."""
+    if not waiter.cancelled():
+        waiter.exception()
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result.
+
+    The in-flight record is a concurrent.futures.Future, so sync callers (threads)
+    and async callers (any event loop) can wait on the same run. An async run
+    executes in its own task: a cancelled caller only stops waiting, and the run
+    is cancelled only once no caller is left waiting for it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _join(self, key: str):
+        """Return (future, is_leader) for key."""
+        with self._lock:
+            self.calls += 1
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _leave(self, key: str, future: Future) -> Optional[asyncio.Task]:
+        """A caller stopped waiting; returns the run to cancel if it was the last one."""
+        with self._lock:
+            if self._inflight.get(key) is not future:
+                return None
+            self._waiters[key] -= 1
+            if self._waiters[key] > 0:
+                return None
+            # Novi pozivi za isti ključ ne smiju se priključiti runu koji se otkazuje
+            self._inflight.pop(key)
+            self._waiters.pop(key)
+            return self._tasks.pop(key, None)
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                self._inflight.pop(key)
+                self._waiters.pop(key, None)
+                self._tasks.pop(key, None)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        future, is_leader = self._join(key)
+        if not is_leader:
+            try:
+                return future.result()
+            finally:
+                self._leave(key, future)
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    async def _run(self, key: str, future: Future, afn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            result = await afn()
+        except asyncio.CancelledError:
+            # Otkazan samo kad više nitko ne čeka
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            future.set_result(result)
+        finally:
+            self._finish(key, future)
+
+    async def ado(self, key: str, afn: Callable[[], Awaitable[Any]]) -> Any:
+        future, is_leader = self._join(key)
+        if is_leader:
+            task = asyncio.ensure_future(self._run(key, future, afn))
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    self._tasks[key] = task
+        waiter = asyncio.wrap_future(future)
+        try:
+            # Shield: a cancelled caller must not cancel the shared run
+            return await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            waiter.add_done_callback(_consume)
+            task = self._leave(key, future)
+            if task is not None:
+                task.get_loop().call_soon_threadsafe(task.cancel)
+            raise
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._inflight
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
@@ -0,0 +1,110 @@
+"""Start a search in the background as soon as its parameters are complete.
+
+Opt-in with SPECULATIVE_SEARCH=true. When ``set_flight_details`` or
+``set_booking_details`` leaves State with everything a search needs, the tool
+calls ``start(key, afetch)``. That runs the fetch through the search cache
+(``SearchCache.aget_or_fetch``) as an asyncio task. When the model then calls
+the search tool, it calls ``attach(key)`` and reads the same key from the
+cache: a run still in flight is joined by the single-flight, and a finished
+run is a plain cache hit.
+
+If a later ``set_*_details`` call changes the parameters first, the old key is
+passed to ``discard(key)``, which cancels the background task. The
+single-flight cancels the run only if nobody else waits for it, and
+``arun_actor`` then aborts it on Apify. A run that already finished stays in
+the cache.
+
+Only the async graph speculates, because it needs a running event loop.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+from agent.utils.cache import FLIGHT_SEARCH_CACHE, HOTEL_SEARCH_CACHE, SearchCache
+from agent.utils.log import get_logger
+from agent.utils.metrics import METRICS, PREFIX
+
+logger = get_logger(__name__)
+
+SPECULATIVE_SEARCHES = f"{PREFIX}_speculative_searches_total"
+METRICS.describe(
+    SPECULATIVE_SEARCHES,
+    "counter",
+    "Speculative searches by outcome (started, attached, completed, cancelled, failed).",
+)
+
+
+class SpeculativeSearches:
+    """Background search tasks keyed like the search cache.
+
+    A key started by several conversations is cancelled only once all of
+    them have discarded it.
+    """
+
+    def __init__(self, cache: SearchCache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._owners: Dict[str, int] = {}
+
+    def start(self, key: str, afetch: Callable[[], Awaitable[Any]]) -> bool:
+        """Fetch key in the background unless it is cached or already running."""
+        with self._lock:
+            if key in self._tasks:
+                self._owners[key] += 1
+                return False
+            if self.cache.peek(key) is not None or self.cache.in_flight(key):
+                return False
+            task = asyncio.get_running_loop().create_task(self.cache.aget_or_fetch(key, afetch))
+            self._tasks[key] = task
+            self._owners[key] = 1
+        task.add_done_callback(lambda t: self._done(key, t))
+        METRICS.inc(SPECULATIVE_SEARCHES, cache=self.cache.name, outcome="started")
+        logger.debug("Speculative %s search started", self.cache.name, extra={"key": key})
+        return True
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                self._tasks.pop(key)
+                self._owners.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # Pravi poziv alata ponovit će pretragu i prijaviti grešku
+            METRICS.inc(SPECULATIVE_SEARCHES, cache=self.cache.name, outcome="failed")
+            logger.info("Speculative %s search failed: %s", self.cache.name, error, extra={"key": key})
+        else:
+            METRICS.inc(SPECULATIVE_SEARCHES, cache=self.cache.name, outcome="completed")
+
+    def attach(self, key: str) -> None:
+        """Called by the search tool before it reads key; the run is no longer cancellable."""
+        with self._lock:
+            task = self._tasks.pop(key, None)
+            self._owners.pop(key, None)
+        if task is not None and not task.done():
+            METRICS.inc(SPECULATIVE_SEARCHES, cache=self.cache.name, outcome="attached")
+
+    def discard(self, key: str) -> None:
+        """The parameters behind key changed; cancel its run if nobody else needs it."""
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                return
+            self._owners[key] -= 1
+            if self._owners[key] > 0:
+                return
+            self._tasks.pop(key)
+            self._owners.pop(key)
+        if task.done():
+            return
+        # Run ostaje živ ako ga u međuvremenu čeka netko drugi (SingleFlight)
+        task.cancel()
+        METRICS.inc(SPECULATIVE_SEARCHES, cache=self.cache.name, outcome="cancelled")
+        logger.debug("Speculative %s search cancelled", self.cache.name, extra={"key": key})
+
+
+FLIGHT_SPECULATION = SpeculativeSearches(FLIGHT_SEARCH_CACHE)
+HOTEL_SPECULATION = SpeculativeSearches(HOTEL_SEARCH_CACHE)
@@ -0,0 +1,84 @@
+"""Compare per-item FlightData validation with the batched parse_flights API.
+
+Runs offline on the recorded Skyscanner actor payload (agent/models/skyscan.json),
+replicated to a few sizes:
+
+    python -m benchmarks.bench_flight_parsing
+"""
+
+import pathlib
+import timeit
+from typing import Any, Callable, List
+
+import orjson
+from pydantic import ValidationError
+
+from agent.models.flights import FlightData, parse_flights
+
+PAYLOAD_PATH = pathlib.Path(__file__).parent.parent / "agent" / "models" / "skyscan.json"
+SIZES = (12, 120, 1200)
+
+
+def load_recorded_flights() -> List[dict]:
+    """Flight dicts from the recorded actor dataset."""
+    dataset = orjson.loads(PAYLOAD_PATH.read_bytes())
+    return [flight for item in dataset for flight in item.get("data") or []]
+
+
+def make_payload(flights: List[dict], size: int) -> bytes:
+    """Raw JSON array of ``size`` flights, cycling through the recorded ones."""
+    return orjson.dumps([flights[i % len(flights)] for i in range(size)])
+
+
+def per_item_loop(raw: bytes) -> List[FlightData]:
+    """Baseline: the original one-model-at-a-time loop."""
+    flights = []
+    for flight_data_dict in orjson.loads(raw):
+        try:
+            flights.append(FlightData(**flight_data_dict))
+        except ValidationError:
+            pass
+    return flights
+
+
+def batch(raw: bytes) -> List[FlightData]:
+    return parse_flights(raw)[0]
+
+
+def batch_trusted(raw: bytes) -> List[FlightData]:
+    return parse_flights(raw, trusted=True)[0]
+
+
+CANDIDATES: List[tuple] = [
+    ("per-item loop", per_item_loop),
+    ("parse_flights", batch),
+    ("parse_flights trusted", batch_trusted),
+]
+
+
+def bench(fn: Callable[[bytes], Any], raw: bytes, min_time: float = 0.5) -> float:
+    """Best seconds per call over a few timeit repeats."""
+    timer = timeit.Timer(lambda: fn(raw))
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main() -> None:
+    flights = load_recorded_flights()
+    print(f"{'flights':>8}  {'candidate':<24}{'ms/call':>10}{'flights/s':>12}{'speedup':>9}")
+    for size in SIZES:
+        raw = make_payload(flights, size)
+        baseline = None
+        for name, fn in CANDIDATES:
+            assert len(fn(raw)) == size
+            seconds = bench(fn, raw)
+            baseline = baseline or seconds
+            print(
+                f"{size:>8}  {name:<24}{seconds * 1000:>10.3f}"
+                f"{size / seconds:>12,.0f}{baseline / seconds:>8.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
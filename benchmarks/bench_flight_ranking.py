@@ -0,0 +1,43 @@
+"""Time rank_flights (scores + Pareto mask) on hundreds to thousands of options.
+
+Uses the recorded Skyscanner payload with prices jittered per copy, the way
+multi-route and flexible-date searches produce many near-duplicate options:
+
+    python -m benchmarks.bench_flight_ranking
+"""
+
+import random
+import timeit
+from typing import List
+
+from agent.models.flights import FlightSummary, parse_flights
+from agent.utils.flight_ranking import RankingPreferences, rank_flights
+from benchmarks.bench_flight_parsing import load_recorded_flights, make_payload
+
+SIZES = (12, 120, 1200, 5000)
+PREFERENCES = RankingPreferences(departure_hours=(6, 12), flexible_fare=True)
+
+
+def make_summaries(size: int) -> List[FlightSummary]:
+    """``size`` summaries cycling through the recorded flights, prices jittered."""
+    flights, _ = parse_flights(make_payload(load_recorded_flights(), size))
+    rng = random.Random(size)
+    return [
+        FlightSummary.from_flight(f)._replace(price=f.price.raw * rng.uniform(0.8, 1.2))
+        for f in flights
+    ]
+
+
+def main() -> None:
+    print(f"{'flights':>8}{'ms/rank':>10}{'pareto':>8}")
+    for size in SIZES:
+        summaries = make_summaries(size)
+        timer = timeit.Timer(lambda: rank_flights(summaries, PREFERENCES))
+        number, _ = timer.autorange()
+        seconds = min(timer.repeat(repeat=5, number=number)) / number
+        _, pareto = rank_flights(summaries, PREFERENCES)
+        print(f"{size:>8}{seconds * 1000:>10.2f}{int(pareto.sum()):>8}")
+
+
+if __name__ == "__main__":
+    main()
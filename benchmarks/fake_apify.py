@@ -0,0 +1,192 @@
+"""Local stand-in for the Apify API endpoints the agent uses.
+
+Serves just enough of https://api.apify.com/v2 for ApifyClient(Async):
+
+    POST /v2/acts/{actor}/runs            start a run (finishes after actor_latency)
+    GET  /v2/actor-runs/{run}             run status, honours ?waitForFinish
+    GET  /v2/datasets/{dataset}/items     items with offset/limit/fields/unwind
+
+Flight runs return the recorded Skyscanner payload replicated to flight_items
+flights (ids made unique); Booking runs return generated hotel items. The
+server runs on its own thread and event loop so it does not distort the
+client's loop measurements.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import orjson
+from aiohttp import web
+
+from benchmarks.bench_flight_parsing import load_recorded_flights
+from benchmarks.payloads import make_hotel_items
+
+FLIGHTS_PER_ITEM = 12  # like the recorded actor output: one dataset item holds a "data" list
+
+
+def flight_dataset(size: int) -> List[dict]:
+    flights = load_recorded_flights()
+    rows = []
+    for i in range(size):
+        flight = dict(flights[i % len(flights)])
+        flight["id"] = f"{flight.get('id')}-{i}"
+        rows.append(flight)
+    return [
+        {"data": rows[i : i + FLIGHTS_PER_ITEM]}
+        for i in range(0, size, FLIGHTS_PER_ITEM)
+    ]
+
+
+def _unwind(items: List[dict], field: str) -> List[dict]:
+    """Apify unwind: array elements become records merged into their parent."""
+    result = []
+    for item in items:
+        value = item.get(field)
+        rest = {k: v for k, v in item.items() if k != field}
+        if isinstance(value, list):
+            result.extend({**rest, **v} if isinstance(v, dict) else {**rest, field: v} for v in value)
+        elif isinstance(value, dict):
+            result.append({**rest, **value})
+        else:
+            result.append(item)
+    return result
+
+
+class FakeApifyServer:
+    """aiohttp app with configurable actor run time, per-request latency and payload size."""
+
+    def __init__(
+        self,
+        actor_latency: float = 0.5,
+        http_latency: float = 0.0,
+        flight_items: int = 120,
+        hotel_items: int = 30,
+    ):
+        self.actor_latency = actor_latency
+        self.http_latency = http_latency
+        self.flights = flight_dataset(flight_items)
+        self.hotels = orjson.loads(make_hotel_items(hotel_items))
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.datasets: Dict[str, List[dict]] = {}
+        self.requests = 0
+        self.runs_started = 0
+        self.runs_aborted = 0
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self.url = ""
+
+    # --- handlers ---
+
+    async def _delay(self) -> None:
+        self.requests += 1
+        if self.http_latency:
+            await asyncio.sleep(self.http_latency)
+
+    def _run_data(self, run_id: str) -> dict:
+        run = self.runs[run_id]
+        done = time.monotonic() >= run["finishes_at"]
+        status = "SUCCEEDED" if done else "RUNNING"
+        return {
+            "id": run_id,
+            "actId": run["actor"],
+            "status": run.get("status") or status,
+            "defaultDatasetId": run["dataset_id"],
+        }
+
+    async def start_run(self, request: web.Request) -> web.Response:
+        await self._delay()
+        actor = request.match_info["actor"]
+        n = next(self._ids)
+        run_id, dataset_id = f"run{n}", f"ds{n}"
+        self.datasets[dataset_id] = self.hotels if "booking" in actor else self.flights
+        self.runs[run_id] = {
+            "actor": actor,
+            "dataset_id": dataset_id,
+            "finishes_at": time.monotonic() + self.actor_latency,
+        }
+        self.runs_started += 1
+        return web.json_response({"data": self._run_data(run_id)}, status=201)
+
+    async def get_run(self, request: web.Request) -> web.Response:
+        await self._delay()
+        run_id = request.match_info["run"]
+        if run_id not in self.runs:
+            return web.json_response({"error": {"type": "record-not-found"}}, status=404)
+        wait = float(request.query.get("waitForFinish") or 0)
+        remaining = self.runs[run_id]["finishes_at"] - time.monotonic()
+        if remaining > 0 and wait > 0 and "status" not in self.runs[run_id]:
+            await asyncio.sleep(min(remaining, wait))
+        return web.json_response({"data": self._run_data(run_id)})
+
+    async def abort_run(self, request: web.Request) -> web.Response:
+        await self._delay()
+        run_id = request.match_info["run"]
+        if run_id not in self.runs:
+            return web.json_response({"error": {"type": "record-not-found"}}, status=404)
+        if time.monotonic() < self.runs[run_id]["finishes_at"]:
+            self.runs[run_id]["status"] = "ABORTED"
+            self.runs_aborted += 1
+        return web.json_response({"data": self._run_data(run_id)})
+
+    async def dataset_items(self, request: web.Request) -> web.Response:
+        await self._delay()
+        items = self.datasets.get(request.match_info["dataset"])
+        if items is None:
+            return web.json_response({"error": {"type": "record-not-found"}}, status=404)
+        query = request.query
+        for field in filter(None, query.get("unwind", "").split(",")):
+            items = _unwind(items, field)
+        fields = [f for f in query.get("fields", "").split(",") if f]
+        if fields:
+            items = [{f: item[f] for f in fields if f in item} for item in items]
+        offset = int(query.get("offset") or 0)
+        limit = query.get("limit")
+        items = items[offset : offset + int(limit)] if limit else items[offset:]
+        return web.Response(body=orjson.dumps(items), content_type="application/json")
+
+    # --- lifecycle ---
+
+    def _app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post("/v2/acts/{actor}/runs", self.start_run),
+                web.get("/v2/actor-runs/{run}", self.get_run),
+                web.post("/v2/actor-runs/{run}/abort", self.abort_run),
+                web.get("/v2/datasets/{dataset}/items", self.dataset_items),
+            ]
+        )
+        return app
+
+    def start(self) -> str:
+        """Start serving on a free local port; returns the base URL."""
+        started = threading.Event()
+
+        def serve() -> None:
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self._app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            self._loop.run_until_complete(site.start())
+            host, port = self._runner.addresses[0][:2]
+            self.url = f"http://{host}:{port}"
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="fake-apify", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,247 @@
+"""Drive the compiled graph with many concurrent conversations, fully offline.
+
+Starts benchmarks.fake_apify.FakeApifyServer, points the Apify clients at it
+(APIFY_API_URL) and replaces the chat model with benchmarks.scripted_model.
+Each conversation runs a three-turn script (flights, hotels, refine + select)
+and every graph.ainvoke is one timed turn. A probe task measures event-loop
+lag, which is where blocking sync work in async tools shows up. Stage timings
+from agent.utils.metrics show where the slowest turns spent their time:
+
+    python -m benchmarks.load_harness --concurrency 20 --conversations 100
+    python -m benchmarks.load_harness --actor-latency 2 --flights 600 --llm-latency 0.2
+
+Each conversation uses its own dates so searches miss the cache; pass
+--shared-dates to measure the cached / coalesced path instead, --fused to
+search with the one-call find_flights / find_hotels tools, and --speculative to
+start each search as soon as set_*_details completes its parameters.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.fake_apify import FakeApifyServer
+from benchmarks.scripted_model import ScriptedChatModel, ScriptedTurn
+
+LAG_PROBE_INTERVAL = 0.01  # seconds
+
+
+def conversation_script(index: int, shared_dates: bool, fused: bool = False) -> List[ScriptedTurn]:
+    start = datetime.date(2025, 7, 1) + datetime.timedelta(days=0 if shared_dates else index % 300)
+    depart, ret = start.isoformat(), (start + datetime.timedelta(days=3)).isoformat()
+    flight_args = {
+        "origin_location": "ZAG",
+        "destination_location": "LHR",
+        "departure_date": depart,
+        "return_date": ret,
+        "travelers": 2,
+    }
+    hotel_args = {
+        "destination_location": "London",
+        "check_in": depart,
+        "check_out": ret,
+        "travelers": 2,
+        "rooms": 1,
+    }
+    if fused:
+        flight_calls = [{"name": "find_flights", "args": flight_args}]
+        hotel_calls = [{"name": "find_hotels", "args": hotel_args}]
+    else:
+        flight_calls = [
+            {"name": "set_flight_details", "args": flight_args},
+            {"name": "search_flights_with_apify"},
+            {"name": "return_flights"},
+        ]
+        hotel_calls = [
+            {"name": "set_booking_details", "args": hotel_args},
+            {"name": "search_hotels_with_apify"},
+            {"name": "return_hotels"},
+        ]
+    return [
+        ScriptedTurn(f"Let iz Zagreba za London {depart} - {ret}, 2 osobe", flight_calls, "Evo najboljih letova."),
+        ScriptedTurn("I hotel u Londonu za te datume", hotel_calls, "Evo hotela."),
+        ScriptedTurn(
+            "Samo ocjena 8+ ispod 300 €, i uzimam prvi let",
+            [
+                # Rezultati filtra se renderiraju bez modela i završavaju turn, pa filter ide zadnji
+                {"name": "select_flight", "args": {"option_number": 1}},
+                {"name": "filter_hotels", "args": {"min_score": "8", "max_price": "300"}},
+            ],
+            "Gotovo.",
+        ),
+    ]
+
+
+async def _lag_probe(samples: List[float], stop: asyncio.Event) -> None:
+    """Record how late the loop wakes a task that asked to sleep LAG_PROBE_INTERVAL."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        before = loop.time()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        samples.append(loop.time() - before - LAG_PROBE_INTERVAL)
+
+
+async def _conversation(
+    graph: Any,
+    script: List[ScriptedTurn],
+    latencies: List[float],
+    breakdowns: List[Dict[str, float]],
+    errors: List[str],
+) -> None:
+    from langchain_core.messages import HumanMessage
+    from agent.utils.metrics import stage_breakdown
+
+    state: Dict[str, Any] = {"messages": []}
+    for turn in script:
+        state = {**state, "messages": [*state["messages"], HumanMessage(turn.user)]}
+        started = time.perf_counter()
+        try:
+            with stage_breakdown() as stages:
+                state = await graph.ainvoke(state)
+        except Exception as e:  # jedna neuspjela konverzacija ne ruši cijeli test
+            errors.append(f"{type(e).__name__}: {e}")
+            return
+        latencies.append(time.perf_counter() - started)
+        breakdowns.append(stages)
+
+
+async def run_load(args: argparse.Namespace, graph: Any) -> Dict[str, Any]:
+    latencies: List[float] = []
+    breakdowns: List[Dict[str, float]] = []
+    errors: List[str] = []
+    lag: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_lag_probe(lag, stop))
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            await _conversation(
+                graph,
+                conversation_script(index, args.shared_dates, args.fused),
+                latencies,
+                breakdowns,
+                errors,
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.conversations)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return {
+        "latencies": latencies,
+        "breakdowns": breakdowns,
+        "errors": errors,
+        "lag": lag,
+        "elapsed": elapsed,
+    }
+
+
+def _ms(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def report(result: Dict[str, Any], server: FakeApifyServer, args: argparse.Namespace) -> None:
+    latencies, lag = result["latencies"], result["lag"]
+    print(
+        f"conversations={args.conversations} concurrency={args.concurrency} "
+        f"actor_latency={args.actor_latency}s llm_latency={args.llm_latency}s "
+        f"flights={args.flights} hotels={args.hotels}"
+    )
+    print(f"turns completed     {len(latencies)} in {result['elapsed']:.2f}s")
+    print(f"throughput          {len(latencies) / result['elapsed']:.2f} turns/s")
+    print(
+        f"turn latency ms     p50={_ms(latencies, 50):.0f} p95={_ms(latencies, 95):.0f} "
+        f"p99={_ms(latencies, 99):.0f} max={_ms(latencies, 100):.0f}"
+    )
+    print(
+        f"event-loop lag ms   p50={_ms(lag, 50):.1f} p95={_ms(lag, 95):.1f} "
+        f"p99={_ms(lag, 99):.1f} max={_ms(lag, 100):.1f}"
+    )
+    print(
+        f"fake Apify          {server.runs_started} actor runs ({server.runs_aborted} aborted), "
+        f"{server.requests} requests"
+    )
+
+    # Vrijeme po fazi u najsporijih 5 % turnova (faze se preklapaju kod paralelnih alata)
+    if latencies:
+        cutoff = np.percentile(latencies, 95)
+        slow = [b for t, b in zip(latencies, result["breakdowns"]) if t >= cutoff]
+        stages = sorted({stage for b in slow for stage in b})
+        print(f"slowest turns (>= p95, n={len(slow)}), mean ms per stage:")
+        for stage in sorted(stages, key=lambda s: -sum(b.get(s, 0) for b in slow)):
+            print(f"    {stage:<36}{sum(b.get(stage, 0) for b in slow) / len(slow) * 1000:>9.1f}")
+    if result["errors"]:
+        print(f"errors              {len(result['errors'])}, first: {result['errors'][0]}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=10, help="conversations in flight at once")
+    parser.add_argument("--conversations", type=int, default=30)
+    parser.add_argument("--actor-latency", type=float, default=0.5, help="seconds per actor run")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="seconds per API request")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--flights", type=int, default=120, help="flights in each flight dataset")
+    parser.add_argument("--hotels", type=int, default=30, help="hotels in each hotel dataset")
+    parser.add_argument("--shared-dates", action="store_true", help="all conversations search the same dates")
+    parser.add_argument("--fused", action="store_true", help="search with find_flights / find_hotels")
+    parser.add_argument("--speculative", action="store_true", help="run with SPECULATIVE_SEARCH=true")
+    parser.add_argument("--verbose", action="store_true", help="keep the agent's own output")
+    parser.add_argument("--metrics-out", help="write the Prometheus metrics text to this file")
+    args = parser.parse_args(argv)
+
+    server = FakeApifyServer(args.actor_latency, args.http_latency, args.flights, args.hotels)
+    url = server.start()
+
+    # Config se čita pri importu, pa se okruženje postavlja prije importa agenta
+    cache_dir = tempfile.TemporaryDirectory()
+    os.environ.update(
+        {
+            "APIFY_API_KEY": "fake-token",
+            "APIFY_API_URL": url,
+            "SEARCH_CACHE_PATH": os.path.join(cache_dir.name, "search_cache.sqlite3"),
+        }
+    )
+    if args.speculative:
+        os.environ["SPECULATIVE_SEARCH"] = "true"
+    if not args.verbose:
+        os.environ.setdefault("LOG_LEVEL", "ERROR")
+    import agent.graph as agent_graph
+
+    scripts = {}
+    for i in range(args.conversations):
+        script = conversation_script(i, args.shared_dates, args.fused)
+        scripts[script[0].user] = script
+    model = ScriptedChatModel(scripts=scripts, latency=args.llm_latency)
+    agent_graph.load_chat_model = lambda fully_specified_name: model
+    agent_graph._BOUND_MODELS.clear()
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            result = asyncio.run(run_load(args, agent_graph.graph))
+    finally:
+        server.stop()
+        cache_dir.cleanup()
+    report(result, server, args)
+    if args.metrics_out:
+        from agent.utils.metrics import METRICS
+
+        with open(args.metrics_out, "w") as f:
+            f.write(METRICS.render_prometheus())
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
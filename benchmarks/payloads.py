@@ -0,0 +1,23 @@
+"""Generated actor payloads for benchmarks (no recorded Booking payload exists)."""
+
+import random
+
+import orjson
+
+
+def make_hotel_items(size: int) -> bytes:
+    """Booking Scraper-like items (only HOTEL_DATASET_FIELDS), deterministic per size."""
+    rng = random.Random(size)
+    return orjson.dumps(
+        [
+            {
+                "name": f"Hotel {i}",
+                "price": round(rng.uniform(40, 600), 2),
+                "reviewScore": round(rng.uniform(5, 10), 1),
+                "reviews": rng.randint(0, 5000),
+                "location": {"lat": 41.9 + rng.random() / 10, "lng": 12.5 + rng.random() / 10},
+                "url": f"https://www.booking.com/hotel/it/hotel-{i}.html",
+            }
+            for i in range(size)
+        ]
+    )
@@ -0,0 +1,93 @@
+"""Chat model stand-in that replays a scripted conversation as tool calls.
+
+The reply depends only on the messages it is given: the number of human
+messages picks the turn, the number of AI messages since the last human
+message picks the step, and the first human message picks the script. That
+keeps it stateless, so one instance serves any number of concurrent
+conversations.
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_call_ids = itertools.count(1)
+
+
+class ScriptedTurn(NamedTuple):
+    """One user turn: the user's text, the tool calls the model makes, its final answer."""
+
+    user: str
+    tool_calls: Sequence[Dict[str, Any]]  # {"name": ..., "args": {...}}
+    answer: str
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Emit the tool calls of the current turn one per step, then the answer."""
+
+    # First user message -> that conversation's script
+    scripts: Dict[str, List[ScriptedTurn]]
+    latency: float = 0.0  # simulated time to first token, seconds
+    # Approximate token usage reported per call, as providers do
+    tokens_per_message: int = 30
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        turn_index = sum(isinstance(m, HumanMessage) for m in messages) - 1
+        last_human = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        step = sum(isinstance(m, AIMessage) for m in messages[last_human:])
+        humans = [m for m in messages if isinstance(m, HumanMessage)]
+        script = self.scripts[humans[0].content]
+        turn = script[min(turn_index, len(script) - 1)]
+        usage = {
+            "input_tokens": self.tokens_per_message * len(messages),
+            "output_tokens": 20,
+            "total_tokens": self.tokens_per_message * len(messages) + 20,
+        }
+        if step < len(turn.tool_calls):
+            call = turn.tool_calls[step]
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": call["name"], "args": call.get("args", {}), "id": f"call_{next(_call_ids)}"}
+                ],
+                usage_metadata=usage,
+            )
+        return AIMessage(content=turn.answer, usage_metadata=usage)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
@@ -0,0 +1,183 @@
+"""Offline micro-benchmarks for the parsing and formatting hot paths.
+
+Every case runs on the recorded Skyscanner payload (agent/models/skyscan.json)
+replicated to several sizes, or on generated Booking Scraper items, and reports
+ops/sec and peak traced memory per call. Results are compared with
+benchmarks/baseline.json and the run exits with status 1 when a case is slower
+(or allocates more) than the baseline allows:
+
+    python -m benchmarks.suite                     # compare with the baseline
+    python -m benchmarks.suite --update-baseline   # record this machine's numbers
+    python -m benchmarks.suite --only flight_validation --tolerance 0.2
+
+Baselines are machine-specific; record one on the machine that runs the check.
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+import orjson
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from agent.models.flights import parse_flights
+from agent.tools.booking_tools import _hotel_info
+from agent.tools.flight_tools import _collect_flights, ranked_summaries, return_flights
+from benchmarks.bench_flight_parsing import load_recorded_flights, make_payload
+from benchmarks.payloads import make_hotel_items
+
+BASELINE_PATH = pathlib.Path(__file__).parent / "baseline.json"
+SIZES = (12, 120, 1200)
+# Allowed slowdown / extra memory before a case counts as a regression
+DEFAULT_TOLERANCE = 0.3
+PAGE_SIZE = 10  # APIFY_DATASET_PAGE_SIZE default
+
+
+class Case(NamedTuple):
+    name: str
+    # size -> zero-argument callable doing one operation
+    setup: Callable[[int], Callable[[], Any]]
+
+
+def _flight_validation(size: int) -> Callable[[], Any]:
+    raw = make_payload(load_recorded_flights(), size)
+    return lambda: parse_flights(raw)
+
+
+def _dataset_loop(size: int) -> Callable[[], Any]:
+    """Page-by-page validation as done while streaming the actor dataset."""
+    flights = load_recorded_flights()
+    rows = [flights[i % len(flights)] for i in range(size)]
+    pages = [orjson.dumps(rows[i : i + PAGE_SIZE]) for i in range(0, size, PAGE_SIZE)]
+
+    def run() -> List[Any]:
+        flights_list: List[Any] = []
+        for page in pages:
+            _collect_flights(page, flights_list, size)
+        return flights_list
+
+    return run
+
+
+def _flight_state(size: int) -> Dict[str, Any]:
+    parsed, _ = parse_flights(make_payload(load_recorded_flights(), size))
+    return {"flights": ranked_summaries(parsed, {}), "messages": []}
+
+
+def _return_flights(size: int) -> Callable[[], Any]:
+    state = _flight_state(size)
+    return lambda: return_flights.invoke({"state": state, "limit": size})
+
+
+def _hotel_dicts(size: int) -> Callable[[], Any]:
+    raw = make_hotel_items(size)
+    return lambda: [_hotel_info(item) for item in orjson.loads(raw)]
+
+
+def _state_checkpoint(size: int) -> Callable[[], Any]:
+    """Round trip of a state snapshot through the checkpointer serializer."""
+    serde = JsonPlusSerializer()
+    state = _flight_state(size)
+    state["hotels"] = [_hotel_info(item) for item in orjson.loads(make_hotel_items(30))]
+    state["messages"] = [
+        HumanMessage("Letovi Zagreb - London 7.7. do 9.7., 2 osobe"),
+        AIMessage("", tool_calls=[{"name": "search_flights_with_apify", "args": {}, "id": "call_1"}]),
+        ToolMessage(f"Found {size} flight options. Details available.", tool_call_id="call_1"),
+    ]
+    return lambda: serde.loads_typed(serde.dumps_typed(state))
+
+
+CASES = [
+    Case("flight_validation", _flight_validation),
+    Case("dataset_loop", _dataset_loop),
+    Case("return_flights", _return_flights),
+    Case("hotel_dicts", _hotel_dicts),
+    Case("state_checkpoint", _state_checkpoint),
+]
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.3) -> Tuple[float, int]:
+    """(ops/sec from the best of 5 repeats, peak traced bytes of one call)."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=5, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return 1 / best, peak
+
+
+def run(cases: List[Case]) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for case in cases:
+        for size in SIZES:
+            fn = case.setup(size)
+            fn()  # warm-up (imports, validators, caches)
+            ops, peak = measure(fn)
+            results[f"{case.name}[{size}]"] = {"ops_per_sec": ops, "peak_bytes": peak}
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Print a report and return the names of regressed cases."""
+    regressions = []
+    print(f"{'case':<28}{'ops/sec':>12}{'baseline':>12}{'peak KiB':>11}{'baseline':>10}  status")
+    for name, result in results.items():
+        base = baseline.get(name)
+        status = "new"
+        if base:
+            slower = result["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance)
+            bigger = result["peak_bytes"] > base["peak_bytes"] * (1 + tolerance)
+            status = "REGRESSED" if slower or bigger else "ok"
+            if status == "REGRESSED":
+                regressions.append(name)
+        print(
+            f"{name:<28}{result['ops_per_sec']:>12,.1f}"
+            f"{base['ops_per_sec'] if base else float('nan'):>12,.1f}"
+            f"{result['peak_bytes'] / 1024:>11,.1f}"
+            f"{base['peak_bytes'] / 1024 if base else float('nan'):>10,.1f}  {status}"
+        )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--only", action="append", choices=[c.name for c in CASES])
+    args = parser.parse_args(argv)
+
+    cases = [c for c in CASES if not args.only or c.name in args.only]
+    results = run(cases)
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+
+    if args.update_baseline:
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        compare(results, {}, args.tolerance)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed past {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+import os
+
+# Testovi ne smiju dijeliti SQLite cache s lokalnim pokretanjem agenta
+os.environ["SEARCH_CACHE_PATH"] = ""
@@ -0,0 +1,56 @@
+import pytest
+
+from agent.utils.airports import city_name, primary_airport, resolve_location
+
+
+@pytest.mark.parametrize(
+    "query, codes",
+    [
+        ("Zagreb", ("ZAG",)),
+        ("zag", ("ZAG",)),
+        ("LHR", ("LHR",)),
+        ("Heathrow", ("LHR",)),
+        ("Berlin", ("BER",)),
+        ("Los Angeles", ("LAX",)),
+        ("Venecija", ("VCE",)),
+        ("Beč", ("VIE",)),
+        ("Rim", ("FCO", "CIA")),
+        ("Krk", ("RJK",)),
+        ("Bol", ("BWK",)),
+        ("KRK", ("KRK",)),
+    ],
+)
+def test_resolves_places_and_codes(query, codes):
+    resolution = resolve_location(query)
+    assert resolution.error is None
+    assert resolution.codes == codes
+
+
+def test_metro_lists_main_airport_first():
+    assert resolve_location("London").codes[0] == "LHR"
+    assert resolve_location("Paris").codes[0] == "CDG"
+
+
+@pytest.mark.parametrize("query", ["Rab", "Bar"])
+def test_name_and_code_disagree_is_ambiguous(query):
+    resolution = resolve_location(query)
+    assert not resolution.codes
+    assert "ambiguous" in resolution.error
+    assert f"({query.upper()}, " in resolution.error
+
+
+def test_same_name_towns_without_a_major_airport_are_ambiguous():
+    resolution = resolve_location("Springfield")
+    assert not resolution.codes and "ambiguous" in resolution.error
+
+
+@pytest.mark.parametrize("query", ["Tegel", "TXL", "Xyzzyq", ""])
+def test_unknown_or_closed(query):
+    resolution = resolve_location(query)
+    assert not resolution.codes and resolution.error
+
+
+def test_city_name_and_primary_airport():
+    assert city_name("LHR") == "London"
+    assert city_name("Rab") == "Rab"
+    assert primary_airport(["LCY", "STN", "LHR"]) == "LHR"
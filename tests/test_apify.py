@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from agent.utils.apify import arun_actor
+
+
+class FakeClient:
+    """Just enough of ApifyClientAsync for arun_actor."""
+
+    def __init__(self, start_delay=0.0, run_delay=0.0):
+        self.start_delay = start_delay
+        self.run_delay = run_delay
+        self.started = []
+        self.aborted = []
+
+    def actor(self, actor_id):
+        client = self
+
+        class Actor:
+            async def start(self, run_input):
+                await asyncio.sleep(client.start_delay)
+                client.started.append("run-1")
+                return {"id": "run-1"}
+
+        return Actor()
+
+    def run(self, run_id):
+        client = self
+
+        class Run:
+            async def wait_for_finish(self):
+                await asyncio.sleep(client.run_delay)
+                return {"id": run_id, "defaultDatasetId": "ds"}
+
+            async def abort(self):
+                client.aborted.append(run_id)
+
+        return Run()
+
+
+def run_and_cancel(client, after):
+    async def main():
+        task = asyncio.ensure_future(arun_actor(client, "actor", {}))
+        await asyncio.sleep(after)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(client.start_delay + 0.05)
+
+    asyncio.run(main())
+
+
+def test_finished_run_is_returned():
+    client = FakeClient()
+    assert asyncio.run(arun_actor(client, "actor", {}))["defaultDatasetId"] == "ds"
+    assert client.aborted == []
+
+
+def test_cancelled_wait_aborts_run():
+    client = FakeClient(run_delay=5)
+    run_and_cancel(client, after=0.02)
+    assert client.aborted == ["run-1"]
+
+
+def test_cancelled_start_aborts_run_once_created():
+    client = FakeClient(start_delay=0.1, run_delay=5)
+    run_and_cancel(client, after=0.02)
+    assert client.started == ["run-1"]
+    assert client.aborted == ["run-1"]
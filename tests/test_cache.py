@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from agent.utils.apify import ApifySearchError
+from agent.utils.cache import SearchCache, make_cache_key
+from agent.utils.disk_cache import DiskSearchCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return DiskSearchCache(str(tmp_path / "cache.sqlite3"))
+
+
+def _age(disk, seconds):
+    """Make every disk entry ``seconds`` older."""
+    disk._connection().execute("UPDATE search_cache SET created_at = created_at - ?", (seconds,))
+
+
+def test_cache_key_ignores_formatting_differences():
+    a = make_cache_key("flights", {"datefrom": "250707", "currency": "eur", "locale": "en_GB", "x": None})
+    b = make_cache_key("flights", {"locale": "en-gb", "currency": "EUR", "datefrom": "2025-07-07"})
+    assert a == b
+    assert a != make_cache_key("hotels", {"datefrom": "2025-07-07", "currency": "EUR", "locale": "en-gb"})
+
+
+def test_memory_entry_expires_after_ttl():
+    clock = Clock()
+    cache = SearchCache("test", ttl=60, timer=clock)
+    assert cache.get_or_fetch("k", lambda: [1]) == [1]
+    clock.now = 59
+    assert cache.get_or_fetch("k", lambda: [2]) == [1]
+    clock.now = 61
+    assert cache.get_or_fetch("k", lambda: [2]) == [2]
+
+
+def test_failed_fetch_is_not_cached():
+    cache = SearchCache("test", ttl=60)
+
+    def fail():
+        raise ApifySearchError("empty run")
+
+    with pytest.raises(ApifySearchError):
+        cache.get_or_fetch("k", fail)
+    assert cache.peek("k") is None
+    assert cache.get_or_fetch("k", lambda: [1]) == [1]
+
+
+def test_disk_hit_keeps_only_remaining_ttl(disk):
+    clock = Clock()
+    cache = SearchCache("test", ttl=600, stale_ttl=3600, disk=disk, timer=clock)
+    cache.put("k", [1])
+    _age(disk, 540)
+    cache.clear()
+
+    assert cache.lookup("k") == [1]
+    clock.now = 59
+    assert cache.peek("k") == [1]
+    clock.now = 61  # 601 s since the fetch: no longer fresh
+    assert cache.peek("k") is None
+
+
+def test_stale_entry_served_while_refreshed(disk):
+    cache = SearchCache("test", ttl=600, stale_ttl=3600, disk=disk)
+    cache.put("k", [1])
+    _age(disk, 900)
+    cache.clear()
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return [2]
+
+    assert cache.get_or_fetch("k", fetch) == [1]
+    assert refreshed.wait(5)
+    deadline = time.monotonic() + 5
+    while cache.peek("k") != [2] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.peek("k") == [2]
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_entry_past_stale_ttl_is_fetched_again(disk):
+    cache = SearchCache("test", ttl=600, stale_ttl=3600, disk=disk)
+    cache.put("k", [1])
+    _age(disk, 4000)
+    cache.clear()
+    assert cache.get_or_fetch("k", lambda: [2]) == [2]
+
+
+def test_disk_purge_drops_old_entries_of_one_namespace(disk):
+    disk.set("old", "flights", b"[1]")
+    disk.set("other", "hotels", b"[2]")
+    _age(disk, 100)
+    disk.set("new", "flights", b"[3]")
+
+    assert disk.purge("flights", max_age=50) == 1
+    assert disk.get("old") is None
+    assert disk.get("other")[0] == b"[2]"
+    payload, age = disk.get("new")
+    assert payload == b"[3]" and age < 50
@@ -0,0 +1,64 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent.utils.context import (
+    TRUNCATED_TOOL_TOKENS,
+    count_message_tokens,
+    prepare_context,
+    replace_superseded,
+)
+
+
+def tool_turn(n, tool="return_flights", size=50):
+    """One user turn: question, tool call, tool result, answer."""
+    call_id = f"call-{n}"
+    return [
+        HumanMessage(f"question {n}", id=f"h{n}"),
+        AIMessage("", tool_calls=[{"name": tool, "args": {}, "id": call_id}], id=f"a{n}"),
+        ToolMessage("result " * size, tool_call_id=call_id, name=tool, id=f"t{n}"),
+        AIMessage(f"answer {n}", id=f"r{n}"),
+    ]
+
+
+def test_older_listing_is_superseded():
+    messages = tool_turn(1) + tool_turn(2) + tool_turn(3, tool="return_hotels")
+    result = replace_superseded(messages)
+    assert "superseded" in result[2].content
+    assert result[6].content == messages[6].content
+    assert result[10].content == messages[10].content
+    assert len(result) == len(messages)
+
+
+def test_under_budget_is_unchanged():
+    state = {"messages": tool_turn(1), "origin_location": "ZAG"}
+    messages, block, update = prepare_context(state, "system", budget=10_000)
+    assert messages == state["messages"]
+    assert "origin_location=ZAG" in block
+    assert update == {}
+
+
+def test_old_turns_folded_into_summary():
+    history = tool_turn(1, size=400) + tool_turn(2, tool="return_hotels", size=400) + tool_turn(3, size=10)
+    state = {"messages": history, "destination_location": "LHR"}
+    budget = sum(count_message_tokens(m) for m in history[8:]) + 200
+
+    messages, block, update = prepare_context(state, "system", budget=budget)
+
+    assert messages == history[8:]  # the current turn is never folded
+    assert update["context_summary_until"] == "r2"
+    assert "question 1" in update["context_summary"]
+    assert "destination_location=LHR" in block
+
+
+def test_summary_until_skips_folded_messages():
+    history = tool_turn(1) + tool_turn(2)
+    state = {"messages": history, "context_summary": "- User: question 1", "context_summary_until": "r1"}
+    messages, block, _ = prepare_context(state, "system", budget=10_000)
+    assert messages == history[4:]
+    assert "question 1" in block
+
+
+def test_oversized_current_turn_truncates_tool_output():
+    history = tool_turn(1, size=5000)
+    messages, _, _ = prepare_context({"messages": history}, "system", budget=TRUNCATED_TOOL_TOKENS * 3)
+    assert messages[2].content.endswith("…[truncated]")
+    assert messages[-1] == history[-1]
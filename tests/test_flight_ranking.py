@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from agent.models.flights import FlightSummary, LegSummary
+from agent.utils.flight_ranking import (
+    RankingPreferences,
+    flight_arrays,
+    parse_departure_hours,
+    pareto_mask,
+    rank_flights,
+)
+
+
+def flight(price, minutes, stops=0, departure="2027-07-01T09:00"):
+    return FlightSummary(
+        price=price,
+        legs=(LegSummary(departure=departure, duration_minutes=minutes, stops=stops),),
+    )
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("6-12", (6, 12)), ("06:00-12:00", (6, 12)), ("22-6", (22, 6)), ("", None), ("6-6", None), ("late", None)],
+)
+def test_parse_departure_hours(value, expected):
+    assert parse_departure_hours(value) == expected
+
+
+def test_pareto_mask_drops_dominated_flights():
+    flights = [
+        flight(100, 120),  # cheapest
+        flight(150, 90),  # fastest
+        flight(160, 130),  # worse than the first on every column
+        flight(None, 60),  # unknown price counts as the worst price
+    ]
+    assert pareto_mask(flight_arrays(flights)).tolist() == [True, True, False, True]
+
+
+def test_pareto_mask_matches_brute_force_across_chunks():
+    rng = np.random.default_rng(0)
+    flights = [
+        flight(float(p), int(d), int(s))
+        for p, d, s in zip(rng.integers(50, 500, 600), rng.integers(60, 900, 600), rng.integers(0, 3, 600))
+    ]
+    rows = [(f.price, f.legs[0].duration_minutes, f.legs[0].stops) for f in flights]
+    expected = [
+        not any(all(o <= m for o, m in zip(other, mine)) and other != mine for other in rows)
+        for mine in rows
+    ]
+    assert pareto_mask(flight_arrays(flights)).tolist() == expected
+
+
+def test_rank_flights_best_first():
+    flights = [flight(300, 300, 2), flight(100, 120), flight(100, 120, 1)]
+    order, pareto = rank_flights(flights)
+    assert order == [1, 2, 0]
+    assert pareto.tolist() == [True, False, False]
+
+
+def test_departure_window_reorders_flights():
+    early = flight(100, 120, departure="2027-07-01T06:30")
+    evening = flight(110, 120, departure="2027-07-01T18:00")
+    pricey = flight(300, 120, departure="2027-07-01T12:00")
+    assert rank_flights([early, evening, pricey])[0][:2] == [0, 1]
+    prefs = RankingPreferences(departure_hours=(17, 21))
+    assert rank_flights([early, evening, pricey], prefs)[0][:2] == [1, 0]
+
+
+def test_rank_flights_empty():
+    order, pareto = rank_flights([])
+    assert order == [] and pareto.size == 0
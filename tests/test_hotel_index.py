@@ -0,0 +1,38 @@
+import pytest
+
+from agent.utils.hotel_index import get_hotel_index, to_float
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("8", 8.0),
+        ("€150", 150.0),
+        ("8,5", 8.5),
+        ("9.2 Superb", 9.2),
+        ("8/10", 8.0),
+        ("1,234.50", 1234.5),
+        ("1.234,50", 1234.5),
+        ("€1,234", 1234.0),
+        ("1.234.567", 1234567.0),
+        ("0,125", 0.125),
+        (150, 150.0),
+        (7.5, 7.5),
+    ],
+)
+def test_to_float_parses_first_number(value, expected):
+    assert to_float(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, True, "", "no rating"])
+def test_to_float_without_number(value):
+    assert to_float(value) is None
+
+
+def test_index_rebuilt_when_refresh_keeps_hotel_count():
+    old = [{"name": "A", "price": "100"}, {"name": "B", "price": "120"}]
+    assert get_hotel_index("ref", old) is get_hotel_index("ref", old)
+
+    refreshed = [{"name": "A", "price": "300"}, {"name": "B", "price": "120"}]
+    cheapest = get_hotel_index("ref", refreshed).query(None, None, "price")
+    assert [hotel["name"] for hotel in cheapest] == ["B", "A"]
@@ -0,0 +1,49 @@
+import io
+import logging
+
+import orjson
+
+from agent.utils.log import JsonFormatter, SamplingFilter, get_logger, lazy
+
+
+def record(msg="same message", **extra):
+    rec = logging.LogRecord("agent.test", logging.INFO, __file__, 1, msg, None, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_get_logger_lives_under_agent():
+    assert get_logger("agent.tools").name == "agent.tools"
+    assert get_logger("benchmarks.x").name == "agent.benchmarks.x"
+
+
+def test_sampling_filter_passes_burst_then_every_nth():
+    sampler = SamplingFilter(burst=2, every=3, window=60)
+    passed = [sampler.filter(record()) for _ in range(8)]
+    assert passed == [True, True, False, False, True, False, False, True]
+
+
+def test_suppressed_count_rides_on_next_record():
+    sampler = SamplingFilter(burst=1, every=3, window=60)
+    records = [record() for _ in range(4)]
+    for rec in records:
+        sampler.filter(rec)
+    assert records[3].suppressed == 2
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(record("run %s", run_input={"origin": "ZAG"}))
+    entry = orjson.loads(line)
+    assert entry["logger"] == "agent.test"
+    assert entry["run_input"] == {"origin": "ZAG"}
+
+
+def test_lazy_is_built_only_when_formatted():
+    calls = []
+    value = lazy(lambda: calls.append(1) or "payload")
+    logger = logging.getLogger("agent.test.lazy")
+    logger.addHandler(logging.StreamHandler(io.StringIO()))
+    logger.setLevel(logging.INFO)
+    logger.debug("skipped %s", value)
+    assert not calls
+    assert str(value) == "payload" and calls == [1]
@@ -0,0 +1,30 @@
+from agent.utils.metrics import MetricsRegistry, stage_breakdown, timed
+
+
+def test_render_prometheus():
+    registry = MetricsRegistry()
+    registry.describe("runs_total", "counter", "Actor runs.")
+    registry.inc("runs_total", actor="flights")
+    registry.inc("runs_total", 2, actor="flights")
+    registry.observe("wait_seconds", 0.3, stage="actor")
+    registry.add_collector(lambda: [("cache_size", {"cache": "hotels"}, 4)])
+
+    text = registry.render_prometheus()
+
+    assert "# TYPE runs_total counter" in text
+    assert 'runs_total{actor="flights"} 3' in text
+    assert 'wait_seconds_bucket{stage="actor",le="0.25"} 0' in text
+    assert 'wait_seconds_bucket{stage="actor",le="0.5"} 1' in text
+    assert 'wait_seconds_count{stage="actor"} 1' in text
+    assert 'cache_size{cache="hotels"} 4' in text
+    assert registry.histogram_summary("wait_seconds") == {(("stage", "actor"),): (1, 0.3)}
+
+
+def test_stage_breakdown_collects_timed_blocks():
+    with stage_breakdown() as stages:
+        with timed("parse"):
+            pass
+        with timed("parse"):
+            pass
+    assert set(stages) == {"parse"}
+    assert stages["parse"] >= 0
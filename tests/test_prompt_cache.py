@@ -0,0 +1,26 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.utils.prompt_cache import model_input, provider_of
+
+
+def test_provider_of():
+    assert provider_of("anthropic/claude-x") == "anthropic"
+    assert provider_of("openai/gpt-x") == "openai"
+
+
+def test_anthropic_gets_cache_breakpoints():
+    messages = [HumanMessage("hi"), AIMessage("hello"), HumanMessage("flights to London")]
+    system, *rest = model_input("anthropic/model", "STATIC", "trip details", messages)
+
+    assert system["content"][0] == {"type": "text", "text": "STATIC", "cache_control": {"type": "ephemeral"}}
+    assert system["content"][1]["text"] == "trip details"
+    assert rest[-1].content[0]["cache_control"] == {"type": "ephemeral"}
+    assert rest[:2] == messages[:2]
+    assert messages[-1].content == "flights to London"  # input is not modified
+
+
+def test_other_providers_keep_static_prefix_first():
+    system, message = model_input("openai/model", "STATIC", "trip details", [HumanMessage("hi")])
+    assert system == {"role": "system", "content": "STATIC\n\ntrip details"}
+    assert message.content == "hi"
+    assert model_input("openai/model", "STATIC", "", [])[0]["content"] == "STATIC"
@@ -0,0 +1,53 @@
+from langchain_core.messages import AIMessage, ToolMessage
+
+from agent.models.flights import FlightSummary, LegSummary
+from agent.utils.render import (
+    language_key,
+    merge_render_artifacts,
+    pending_render,
+    render_artifact,
+    render_reply,
+)
+
+
+def tool_result(call_id, artifact=None):
+    return ToolMessage("done", tool_call_id=call_id, artifact=artifact)
+
+
+def test_language_key():
+    assert language_key("hr") == "hr"
+    assert language_key("en_GB") == "en"
+    assert language_key("German") == "de"
+    assert language_key("klingon") == "en"
+    assert language_key(None) == "en"
+
+
+def test_merge_render_artifacts():
+    merged = merge_render_artifacts(
+        [render_artifact("flights", limit=3), None, render_artifact("hotels"), render_artifact("flights")]
+    )
+    assert merged == {"render": ["flights", "hotels"], "limit": 3}
+    assert merge_render_artifacts([None, {}]) is None
+
+
+def test_pending_render_only_when_every_result_renders():
+    call = AIMessage("", tool_calls=[{"name": "t", "args": {}, "id": "1"}, {"name": "t", "args": {}, "id": "2"}])
+    both = [call, tool_result("1", render_artifact("flights")), tool_result("2", render_artifact("hotels"))]
+    assert pending_render(both) == {"render": ["flights", "hotels"]}
+    assert pending_render([call, tool_result("1", render_artifact("flights")), tool_result("2")]) is None
+    assert pending_render([call]) is None
+
+
+def test_render_reply_marks_best_trade_off():
+    flights = [
+        FlightSummary(price=100, price_formatted="100 €", carrier="A", legs=(LegSummary(duration_minutes=120, stops=0),), link="https://x"),
+        FlightSummary(price=150, price_formatted="150 €", carrier="B", legs=(LegSummary(duration_minutes=200, stops=1),)),
+    ]
+    state = {"flights": flights, "hotels": [{"name": "Hotel Rab", "rating": 9.1}], "desired_language": "hr"}
+    text = render_reply(state, render_artifact("flights", "hotels"), flight_limit=5)
+
+    first, second = text.split("###")[1:3]
+    assert "100 €" in first and "🏅" in first
+    assert "150 €" in second and "🏅" not in second
+    assert "Hotel Rab" in text
+    assert text.startswith("Evo najboljih letova")
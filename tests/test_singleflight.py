@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent.utils.singleflight import SingleFlight
+
+
+def test_concurrent_sync_calls_share_one_run():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fn))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 3
+    assert not flight.in_flight("k")
+
+
+def test_error_reaches_caller_and_is_not_kept():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: "retried") == "retried"
+
+
+def test_async_callers_share_one_run():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def afn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("k", afn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test")
+    cancelled = []
+
+    async def afn():
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "result"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("k", afn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.ado("k", afn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader
+
+    result, leader = asyncio.run(main())
+    assert result == "result"
+    assert leader.cancelled()
+    assert not cancelled
+
+
+def test_run_cancelled_when_every_caller_left():
+    flight = SingleFlight("test")
+
+    async def main():
+        stopped = asyncio.Event()
+
+        async def afn():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        callers = [asyncio.ensure_future(flight.ado("k", afn)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.wait_for(stopped.wait(), 1)
+        return flight.in_flight("k")
+
+    assert asyncio.run(main()) is False
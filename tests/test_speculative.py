@@ -0,0 +1,76 @@
+import asyncio
+
+from agent.utils.cache import SearchCache
+from agent.utils.speculative import SpeculativeSearches
+
+
+def make_fetch(log, delay=0.05):
+    async def fetch():
+        log.append("started")
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append("cancelled")
+            raise
+        return ["result"]
+
+    return fetch
+
+
+def test_search_tool_joins_the_speculative_run():
+    cache = SearchCache("test", ttl=60)
+    speculation = SpeculativeSearches(cache)
+    log = []
+
+    async def main():
+        assert speculation.start("k", make_fetch(log))
+        await asyncio.sleep(0.01)
+        speculation.attach("k")
+        return await cache.aget_or_fetch("k", make_fetch(log))
+
+    assert asyncio.run(main()) == ["result"]
+    assert log == ["started"]
+
+
+def test_discard_cancels_the_run():
+    cache = SearchCache("test", ttl=60)
+    speculation = SpeculativeSearches(cache)
+    log = []
+
+    async def main():
+        speculation.start("k", make_fetch(log))
+        await asyncio.sleep(0.01)
+        speculation.discard("k")
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert log == ["started", "cancelled"]
+    assert cache.peek("k") is None
+
+
+def test_run_kept_until_every_owner_discards():
+    cache = SearchCache("test", ttl=60)
+    speculation = SpeculativeSearches(cache)
+    log = []
+
+    async def main():
+        assert speculation.start("k", make_fetch(log))
+        assert not speculation.start("k", make_fetch(log))
+        await asyncio.sleep(0.01)
+        speculation.discard("k")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert log == ["started"]
+    assert cache.peek("k") == ["result"]
+
+
+def test_cached_key_is_not_started():
+    cache = SearchCache("test", ttl=60)
+    cache.put("k", ["cached"])
+    speculation = SpeculativeSearches(cache)
+
+    async def main():
+        return speculation.start("k", make_fetch([]))
+
+    assert asyncio.run(main()) is False